@@ -0,0 +1,125 @@
+"""
+Compare fixed upload concurrency with the adaptive concurrency limit against a
+local TOD stand-in that handles a limited number of requests at a time.
+
+Beyond its capacity the stand-in slows down in proportion to the requests in
+flight, and beyond twice its capacity it answers 429 with Retry-After (see
+fake_tod.py). For each capacity the same builds are uploaded with every fixed
+concurrency and with the adaptive limit, which starts at --initial and may grow
+up to the largest fixed concurrency. Throughput, response time percentiles,
+throttled requests and the most requests TOD saw at a time are reported, and
+for the adaptive runs the limit it settled at.
+
+Usage:
+    python bench_adaptive_concurrency.py --capacities 4 16 --fixed 2 8 32 --uploads 400
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "xml_to_tod"))
+
+# pylint: disable=wrong-import-position
+from fake_tod import FakeTODServer
+from modules.tod_payload import TodPayload
+from tod_common.adaptive_limit import AdaptiveLimiter
+from tod_common.http_session import configure_http_client
+
+BUILD = {
+    "team": "DX",
+    "softwareName": "linodego",
+    "semanticVersion": "1.0.0",
+    "buildName": "benchmark",
+    "pass": True,
+    "xunitResults": None,
+}
+REPORT = b'<testsuites><testsuite name="bench" tests="1"/></testsuites>' * 20
+
+
+def run(capacity, concurrency, limiter, args):
+    """
+    Upload args.uploads builds with `concurrency` threads (and the limiter, if any).
+    """
+    server = FakeTODServer(
+        latency=args.latency, retry_after=args.retry_after, capacity=capacity
+    ).start()
+    client = configure_http_client(
+        retries=args.retries, backoff=0.05, pool_size=concurrency, max_per_host=None
+    )
+    payload = TodPayload(limiter=limiter)
+    durations = []
+    lock = threading.Lock()
+
+    def upload(_):
+        start = time.perf_counter()
+        response = payload.send(server.url, BUILD, [REPORT])
+        with lock:
+            durations.append(time.perf_counter() - start)
+        return response is not None and response.status_code == 201
+
+    try:
+        output = io.StringIO()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(output):
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                accepted = sum(executor.map(upload, range(args.uploads)))
+        seconds = time.perf_counter() - start
+    finally:
+        server.stop()
+
+    durations.sort()
+    return {
+        "uploads_per_second": args.uploads / seconds,
+        "accepted": accepted,
+        "p50_ms": statistics.median(durations) * 1000,
+        "p90_ms": durations[int(len(durations) * 0.9) - 1] * 1000,
+        "throttled": server.counters["throttled"],
+        "retries": client.stats["retries"],
+        "max_in_flight": server.max_in_flight,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--capacities", type=int, nargs="+", default=[4, 16])
+    parser.add_argument("--fixed", type=int, nargs="+", default=[2, 8, 32])
+    parser.add_argument("--initial", type=int, default=4)
+    parser.add_argument("--uploads", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--retries", type=int, default=5)
+    args = parser.parse_args()
+
+    maximum = max(args.fixed)
+    print(
+        f"{'capacity':>8} {'concurrency':<16} {'uploads/s':>9} {'p50 ms':>7} "
+        f"{'p90 ms':>7} {'429s':>5} {'retries':>7} {'in flight':>9}  limit"
+    )
+    for capacity in args.capacities:
+        runs = [(f"fixed {fixed}", fixed, None) for fixed in args.fixed]
+        limiter = AdaptiveLimiter(initial=args.initial, maximum=maximum)
+        runs.append((f"adaptive {args.initial}-{maximum}", maximum, limiter))
+
+        for name, concurrency, run_limiter in runs:
+            result = run(capacity, concurrency, run_limiter, args)
+            limit = "-" if run_limiter is None else str(run_limiter.limit)
+            print(
+                f"{capacity:>8} {name:<16} {result['uploads_per_second']:>9.1f} "
+                f"{result['p50_ms']:>7.0f} {result['p90_ms']:>7.0f} "
+                f"{result['throttled']:>5} {result['retries']:>7} "
+                f"{result['max_in_flight']:>9}  {limit}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Measure add_gha_info_to_xml.py: tagging the reports of a matrix workflow with
+one invocation per report compared to one bulk invocation, and the time to tag
+a single report by splicing the elements in compared to parsing and rewriting
+the whole report, for growing report sizes.
+
+Release versions are served by a local GitHub stand-in and no release cache is
+shared between the two flows, so both count the lookups they make.
+
+Usage:
+    python bench_add_gha_info.py --reports 24 --sizes-mb 1 10 50
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.join(BENCH_DIR, "..", "xml_to_obj_storage", "scripts")
+SCRIPT = os.path.join(SCRIPTS_DIR, "add_gha_info_to_xml.py")
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, SCRIPTS_DIR)
+
+# pylint: disable=wrong-import-position
+from add_gha_info_to_xml import (
+    fields_xml,
+    gha_fields,
+    rewrite_with_fields,
+    write_fields,
+)
+from fake_github import FakeGitHubServer
+from junit_corpus import CorpusOptions, write_report
+
+GHA_ARGS = ["--branch_name", "main", "--gha_run_id", "123", "--gha_run_number", "45"]
+
+# Product keywords of the report file names, see tod_common.release_resolver
+PRODUCTS = ["cli", "sdk", "linodego", "terraform", "packer", "ansible"]
+
+
+def write_reports(directory, count, testcases):
+    paths = []
+    for index in range(count):
+        product = PRODUCTS[index % len(PRODUCTS)]
+        path = os.path.join(directory, f"{index:04d}_{product}_test_report.xml")
+        write_report(
+            path,
+            CorpusOptions(shape="sdk", testcases=testcases, metadata=False),
+            index,
+        )
+        paths.append(path)
+    return paths
+
+
+def run_flow(paths, bulk, env):
+    """
+    Tag the reports with one process per report or one for all, in seconds.
+    """
+    start = time.perf_counter()
+    invocations = [paths] if bulk else [["--xmlfile", path] for path in paths]
+    for targets in invocations:
+        subprocess.run(
+            [sys.executable, SCRIPT] + GHA_ARGS + targets,
+            env=env,
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+    return time.perf_counter() - start
+
+
+def report_of_size(path, size_mb):
+    """
+    Write a report of about size_mb megabytes.
+    """
+    options = CorpusOptions(shape="sdk", testcases=1000, metadata=False)
+    write_report(path, options)
+    per_testcase = os.path.getsize(path) / 1000
+    options.testcases = max(1, int(size_mb * 1024 * 1024 / per_testcase))
+    write_report(path, options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--reports", type=int, default=24)
+    parser.add_argument("--testcases", type=int, default=500)
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 10, 50])
+    args = parser.parse_args()
+
+    server = FakeGitHubServer().start()
+    env = dict(os.environ, GITHUB_API_URL=server.base_url)
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench_add_gha_info_") as work_dir:
+            print(f"{'flow':<16} {'reports':>7} {'seconds':>8} {'lookups':>8}")
+            for name, bulk in (("per report", False), ("bulk", True)):
+                flow_dir = os.path.join(work_dir, name.replace(" ", "_"))
+                os.makedirs(flow_dir)
+                paths = write_reports(flow_dir, args.reports, args.testcases)
+                before = server.counters["requests"]
+                seconds = run_flow(paths, bulk, env)
+                print(
+                    f"{name:<16} {len(paths):>7} {seconds:>8.2f} "
+                    f"{server.counters['requests'] - before:>8}"
+                )
+
+            print()
+            print(f"{'report MB':>9} {'splice ms':>10} {'rewrite ms':>11}")
+            fields = gha_fields("main", "123", "45", "1.0.0")
+            for size_mb in args.sizes_mb:
+                original = os.path.join(work_dir, "0000_sdk_size_report.xml")
+                report_of_size(original, size_mb)
+                spliced = os.path.join(work_dir, "0000_sdk_spliced_report.xml")
+                shutil.copyfile(original, spliced)
+
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    write_fields(spliced, fields)
+                splice_ms = (time.perf_counter() - start) * 1000
+
+                start = time.perf_counter()
+                rewrite_with_fields(original, fields)
+                rewrite_ms = (time.perf_counter() - start) * 1000
+
+                with open(spliced, "rb") as f:
+                    assert f.read().endswith(fields_xml(fields) + b"</testsuites>")
+                print(f"{size_mb:>9.1f} {splice_ms:>10.2f} {rewrite_ms:>11.1f}")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
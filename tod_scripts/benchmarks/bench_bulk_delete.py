@@ -0,0 +1,96 @@
+"""
+Compare deleting reports one request per key with S3 multi-object deletes
+against a local stand-in S3 server.
+
+Usage:
+    python bench_bulk_delete.py --files 500 --workers 4
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "xml_to_tod"))
+
+# pylint: disable=wrong-import-position
+from fake_s3 import FakeS3Server
+from modules.obj_storage import LinodeCliObjectStorage, S3ObjectStorage
+
+BUCKET = "dx-test-results"
+
+
+def seed_keys(server, count):
+    keys = [f"{i:05d}_linodego_report.xml" for i in range(count)]
+    for key in keys:
+        server.put_object(BUCKET, key, b"<testsuites/>")
+    return keys
+
+
+def delete_per_key(storage, keys, workers):
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda key: storage.remove(BUCKET, key), keys))
+    return {}
+
+
+def delete_bulk(storage, keys, _workers):
+    return storage.remove_many(BUCKET, keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--cli-files",
+        type=int,
+        default=20,
+        help="Files deleted through fake_linode_cli.py, 0 to skip the CLI backend",
+    )
+    args = parser.parse_args()
+
+    server = FakeS3Server().start()
+    os.environ["OBJ_ENDPOINT_URL"] = server.endpoint_url
+    os.environ.setdefault("LINODE_CLI_OBJ_ACCESS_KEY", "fake")
+    os.environ.setdefault("LINODE_CLI_OBJ_SECRET_KEY", "fake")
+
+    s3 = S3ObjectStorage(
+        "us-east-1", endpoint_url=server.endpoint_url, max_connections=args.workers
+    )
+    runs = [
+        ("s3 per key", s3, delete_per_key, args.files),
+        ("s3 bulk", s3, delete_bulk, args.files),
+    ]
+    if args.cli_files:
+        cli = LinodeCliObjectStorage(
+            "local", cli_path=os.path.join(BENCH_DIR, "fake_linode_cli.py")
+        )
+        runs.insert(0, ("cli per key", cli, delete_per_key, args.cli_files))
+
+    print(f"{'mode':<12} {'files':>6} {'seconds':>9} {'files/s':>9} {'requests':>9}")
+    try:
+        for name, storage, delete, count in runs:
+            keys = seed_keys(server, count)
+            server.requests.clear()
+
+            start = time.perf_counter()
+            failed = delete(storage, keys, args.workers)
+            seconds = time.perf_counter() - start
+
+            requests = (
+                server.requests["DeleteObject"] + server.requests["DeleteObjects"]
+            )
+            print(
+                f"{name:<12} {count - len(failed):>6} {seconds:>9.2f} "
+                f"{count / seconds:>9.1f} {requests:>9}"
+            )
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
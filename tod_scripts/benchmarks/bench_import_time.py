@@ -0,0 +1,152 @@
+"""
+Measure the cold start of the report scripts: the time a fresh interpreter takes
+to import each of them and the heavy dependencies the import pulls in.
+
+Short CI steps (merging shards, adding the GHA information, uploading one file)
+pay this on every invocation, so an import should only load what the script
+needs and do no work. Each case runs --repeat times in a new interpreter and the
+median is reported after subtracting the start of an empty interpreter.
+
+Usage:
+    python bench_import_time.py --repeat 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+TOD_SCRIPTS_DIR = os.path.abspath(os.path.join(BENCH_DIR, ".."))
+OBJ_STORAGE_DIR = os.path.join(TOD_SCRIPTS_DIR, "xml_to_obj_storage")
+
+# Case name -> (directory put on sys.path, module imported)
+CASES = {
+    "tod_report_uploader": (
+        os.path.join(TOD_SCRIPTS_DIR, "xml_to_tod"),
+        "tod_report_uploader",
+    ),
+    "modules.setup": (os.path.join(TOD_SCRIPTS_DIR, "xml_to_tod"), "modules.setup"),
+    "xml_to_obj": (os.path.join(OBJ_STORAGE_DIR, "scripts"), "xml_to_obj"),
+    "merge_and_upload": (os.path.join(OBJ_STORAGE_DIR, "scripts"), "merge_and_upload"),
+    "add_gha_info_to_xml": (
+        os.path.join(OBJ_STORAGE_DIR, "scripts"),
+        "add_gha_info_to_xml",
+    ),
+    "merge_terraform_results": (
+        os.path.join(OBJ_STORAGE_DIR, "terraform_tests"),
+        "merge_terraform_results",
+    ),
+    "merge_ansible_results": (
+        os.path.join(OBJ_STORAGE_DIR, "ansible_tests"),
+        "merge_ansible_results",
+    ),
+    "generate_test_summary": (TOD_SCRIPTS_DIR, "generate_test_summary"),
+}
+
+HEAVY_MODULES = ("boto3", "botocore", "hvac", "dotenv", "requests", "urllib3")
+
+PROBE = """
+import json, os, sys, time
+sys.path[:0] = [{path!r}, {tod_scripts!r}]
+error = None
+start = time.perf_counter()
+try:
+    import {module}
+except Exception as e:
+    error = f"{{type(e).__name__}}: {{e}}"
+seconds = time.perf_counter() - start
+print(json.dumps({{
+    "import_seconds": seconds,
+    "error": error,
+    "heavy": [name for name in {heavy!r} if name in sys.modules],
+    "files": sorted(os.listdir(".")),
+}}))
+"""
+
+
+def run_python(code, cwd):
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=cwd,
+        check=True,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    return time.perf_counter() - start, process.stdout
+
+
+def measure(case, repeat):
+    """
+    Median wall time and import time of a case, and what its import left behind.
+    """
+    path, module = CASES[case]
+    code = PROBE.format(
+        path=path, tod_scripts=TOD_SCRIPTS_DIR, module=module, heavy=HEAVY_MODULES
+    )
+
+    wall_times = []
+    import_times = []
+    for _ in range(repeat):
+        # An empty directory shows files or directories created by the import
+        with tempfile.TemporaryDirectory(prefix="bench_import_") as work_dir:
+            seconds, output = run_python(code, work_dir)
+        probe = json.loads(output.strip().splitlines()[-1])
+        wall_times.append(seconds)
+        import_times.append(probe["import_seconds"])
+
+    return {
+        "wall_seconds": statistics.median(wall_times),
+        "import_seconds": statistics.median(import_times),
+        "heavy": probe["heavy"],
+        "files": probe["files"],
+        "error": probe["error"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument(
+        "--cases", nargs="+", choices=sorted(CASES), default=list(CASES)
+    )
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_import_") as work_dir:
+        interpreter = statistics.median(
+            run_python("pass", work_dir)[0] for _ in range(args.repeat)
+        )
+    print(f"Empty interpreter: {interpreter * 1000:.0f} ms")
+
+    results = {}
+    print(
+        f"{'case':<24} {'import ms':>10} {'startup ms':>11}  heavy modules / files created"
+    )
+    for case in args.cases:
+        result = measure(case, args.repeat)
+        result["startup_seconds"] = max(0.0, result["wall_seconds"] - interpreter)
+        results[case] = result
+        side_effects = ", ".join(result["heavy"] + result["files"]) or "-"
+        if result["error"]:
+            side_effects = f"import failed: {result['error']}"
+        print(
+            f"{case:<24} {result['import_seconds'] * 1000:>10.1f} "
+            f"{result['startup_seconds'] * 1000:>11.1f}  {side_effects}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(
+                {"interpreter_seconds": interpreter, "results": results}, f, indent=2
+            )
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Compare the three step CI flow (merge_terraform_results.py, add_gha_info_to_xml.py
+and xml_to_obj.py) with the fused merge_and_upload.py against a local stand-in
+S3 server.
+
+The release version is served from a pre-filled release cache, so neither flow
+talks to GitHub.
+
+Usage:
+    python bench_merge_and_upload.py --shards 200 --tests 200
+"""
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.join(BENCH_DIR, "..", "xml_to_obj_storage")
+sys.path.insert(0, BENCH_DIR)
+
+# pylint: disable=wrong-import-position
+from fake_s3 import FakeS3Server
+
+BUCKET = "dx-test-results"
+GHA_ARGS = ["--branch_name", "main", "--gha_run_id", "123", "--gha_run_number", "45"]
+
+
+def write_shards(shard_dir, shards, tests):
+    output = "<system-out>" + "resource created\n" * 20 + "</system-out>"
+    for shard in range(shards):
+        testcases = "".join(
+            f'<testcase name="TestAcc_{shard}_{i}" classname="linode" time="1.5">'
+            f"{output}</testcase>"
+            for i in range(tests)
+        )
+        with open(
+            os.path.join(shard_dir, f"shard_{shard:04d}.xml"), "w", encoding="utf-8"
+        ) as f:
+            f.write(
+                f'<testsuites tests="{tests}" failures="0" errors="0" skipped="0">'
+                f'<testsuite name="shard_{shard}">{testcases}</testsuite></testsuites>'
+            )
+
+
+def write_release_cache(directory):
+    with open(
+        os.path.join(directory, ".release_cache.json"), "w", encoding="utf-8"
+    ) as f:
+        json.dump(
+            {
+                "terraform": {
+                    "version": "2.0.0",
+                    "etag": None,
+                    "fetched_at": time.time(),
+                }
+            },
+            f,
+        )
+
+
+def run(args, cwd, env):
+    subprocess.run(
+        [sys.executable] + args,
+        cwd=cwd,
+        env=env,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def three_steps(shard_dir, env):
+    """
+    Run the three scripts and return the size of the merged file they wrote.
+    """
+    run(
+        [os.path.join(SCRIPTS_DIR, "terraform_tests", "merge_terraform_results.py")],
+        shard_dir,
+        env,
+    )
+    merged = glob.glob(os.path.join(shard_dir, "*_terraform_merged_report.xml"))[0]
+    run(
+        [os.path.join(SCRIPTS_DIR, "scripts", "add_gha_info_to_xml.py")]
+        + GHA_ARGS
+        + ["--xmlfile", merged],
+        shard_dir,
+        env,
+    )
+    run(
+        [
+            os.path.join(SCRIPTS_DIR, "scripts", "xml_to_obj.py"),
+            os.path.basename(merged),
+        ],
+        shard_dir,
+        env,
+    )
+    size = os.path.getsize(merged)
+    os.remove(merged)
+    return size
+
+
+def fused(shard_dir, env):
+    run(
+        [
+            os.path.join(SCRIPTS_DIR, "scripts", "merge_and_upload.py"),
+            "--style",
+            "terraform",
+            "--input-dir",
+            shard_dir,
+            "--key",
+            "fused_terraform_merged_report.xml",
+        ]
+        + GHA_ARGS,
+        shard_dir,
+        env,
+    )
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--shards", type=int, default=200)
+    parser.add_argument("--tests", type=int, default=200)
+    args = parser.parse_args()
+
+    server = FakeS3Server().start()
+    env = dict(
+        os.environ,
+        OBJ_ENDPOINT_URL=server.endpoint_url,
+        LINODE_CLI_OBJ_ACCESS_KEY="fake",
+        LINODE_CLI_OBJ_SECRET_KEY="fake",
+    )
+
+    work_dir = tempfile.mkdtemp(prefix="bench_merge_and_upload_")
+    shard_dir = os.path.join(work_dir, "shards")
+    os.makedirs(shard_dir)
+    write_shards(shard_dir, args.shards, args.tests)
+    write_release_cache(shard_dir)
+
+    print(
+        f"{'flow':<12} {'seconds':>9} {'MB stored':>10} {'parts':>6} {'MB on disk':>11}"
+    )
+    try:
+        for name, flow in (("three steps", three_steps), ("fused", fused)):
+            server.requests.clear()
+            start = time.perf_counter()
+            intermediate = flow(shard_dir, env)
+            seconds = time.perf_counter() - start
+
+            keys = server.list_keys(BUCKET)
+            stored = sum(len(server.get_object(BUCKET, key).body) for key in keys)
+            for key in keys:
+                server.delete_object(BUCKET, key)
+            print(
+                f"{name:<12} {seconds:>9.2f} {stored / 1024 / 1024:>10.1f} "
+                f"{server.requests['UploadPart']:>6} {intermediate / 1024 / 1024:>11.1f}"
+            )
+    finally:
+        server.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
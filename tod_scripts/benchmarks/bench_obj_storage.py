@@ -0,0 +1,111 @@
+"""
+Compare the object storage backends of the TOD report uploader against a local
+stand-in S3 server.
+
+Each backend lists the seeded reports, downloads every one of them and then
+deletes them, the same three operations the uploader performs per report. The
+`cli` backend is driven through fake_linode_cli.py, which pays the same
+per-call interpreter start-up and connection set-up as the real linode-cli.
+
+Usage:
+    python bench_obj_storage.py --files 50 --size-kb 64 --workers 4
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "xml_to_tod"))
+
+# pylint: disable=wrong-import-position
+from fake_s3 import FakeS3Server
+from modules.obj_storage import LinodeCliObjectStorage, S3ObjectStorage
+
+BUCKET = "dx-test-results"
+
+
+def seed_reports(server, count, size_kb):
+    """
+    Store `count` XML reports of roughly `size_kb` KB each in the fake bucket.
+    """
+    filler = "x" * 1024
+    body = (
+        "<testsuites><testsuite>"
+        + "".join(
+            f'<testcase name="case_{i}"><system-out>{filler}</system-out></testcase>'
+            for i in range(size_kb)
+        )
+        + "</testsuite></testsuites>"
+    ).encode("utf-8")
+
+    for i in range(count):
+        server.put_object(BUCKET, f"{i:05d}_linodego_report.xml", body)
+
+
+def run_backend(storage, workers, download_dir):
+    """
+    List, download and delete every report with the given backend.
+    """
+    keys = list(storage.list_objects(BUCKET, suffix=".xml"))
+
+    def process(key):
+        storage.download(BUCKET, key, os.path.join(download_dir, key))
+        storage.remove(BUCKET, key)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(process, keys))
+
+    return len(keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--size-kb", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--backends", nargs="+", default=["s3", "cli"])
+    args = parser.parse_args()
+
+    server = FakeS3Server().start()
+    os.environ["OBJ_ENDPOINT_URL"] = server.endpoint_url
+    os.environ.setdefault("LINODE_CLI_OBJ_ACCESS_KEY", "fake")
+    os.environ.setdefault("LINODE_CLI_OBJ_SECRET_KEY", "fake")
+
+    print(f"{'backend':<8} {'files':>6} {'seconds':>9} {'files/s':>9} {'conns':>6}")
+    try:
+        for backend in args.backends:
+            seed_reports(server, args.files, args.size_kb)
+            server.connections = 0
+
+            if backend == "s3":
+                storage = S3ObjectStorage(
+                    "local",
+                    endpoint_url=server.endpoint_url,
+                    max_connections=2 * args.workers,
+                )
+            else:
+                storage = LinodeCliObjectStorage(
+                    "local", cli_path=os.path.join(BENCH_DIR, "fake_linode_cli.py")
+                )
+
+            with tempfile.TemporaryDirectory() as download_dir:
+                start = time.perf_counter()
+                files = run_backend(storage, args.workers, download_dir)
+                elapsed = time.perf_counter() - start
+
+            print(
+                f"{backend:<8} {files:>6} {elapsed:>9.2f} "
+                f"{files / elapsed:>9.1f} {server.connections:>6}"
+            )
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
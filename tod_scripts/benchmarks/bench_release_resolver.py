@@ -0,0 +1,69 @@
+"""
+Show how many GitHub requests the release resolver makes against a local
+stand-in of the releases API.
+
+Every simulated run resolves the release of each report with a new resolver
+sharing one cache directory, like consecutive uploader runs do. With a TTL of
+0 every run revalidates its cache entries and gets 304 responses.
+
+Usage:
+    python bench_release_resolver.py --files 300 --runs 3 --ttl 0
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+
+# pylint: disable=wrong-import-position
+from fake_github import FakeGitHubServer
+from tod_common.release_resolver import LATEST_RELEASE_URLS, ReleaseResolver
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--ttl", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    server = FakeGitHubServer().start()
+    urls = {
+        product: url.replace("https://api.github.com", server.base_url)
+        for product, url in LATEST_RELEASE_URLS.items()
+    }
+    products = list(urls)
+    files = [
+        f"{i:05d}_{products[i % len(products)]}_report.xml" for i in range(args.files)
+    ]
+
+    print(f"{'run':>4} {'files':>6} {'seconds':>8} {'requests':>9} {'304s':>5}")
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for run in range(1, args.runs + 1):
+                server.reset_counters()
+                resolver = ReleaseResolver(cache_dir=cache_dir, ttl=args.ttl, urls=urls)
+
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=args.workers) as executor:
+                    versions = list(executor.map(resolver.resolve_for_file, files))
+                elapsed = time.perf_counter() - start
+
+                assert all(version == "1.0.0" for version in versions), versions
+                print(
+                    f"{run:>4} {len(files):>6} {elapsed:>8.3f} "
+                    f"{server.counters['requests']:>9} {server.counters['not_modified']:>5}"
+                )
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
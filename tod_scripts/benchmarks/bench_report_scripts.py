@@ -0,0 +1,291 @@
+"""
+Benchmark the report scripts on a synthetic JUnit corpus and compare the
+results with a saved baseline.
+
+Cases:
+- summary: generate_test_summary.parse_junit_xml on one pytest shaped report
+- merge_ansible: merge_ansible_results.merge_xml_files on ansible shards
+- merge_terraform: merge_terraform_results.merge_xml_files on terraform shards
+- tod_convert: change_xml_report_to_tod_acceptable_version on one multi-suite
+  terraform report
+
+Every case runs in a fresh interpreter, so the reported peak RSS is its own.
+Merges parse shards in worker processes; their peak RSS is reported separately.
+The corpus is generated with junit_corpus.py and reused while its options stay
+the same.
+
+Usage:
+    python bench_report_scripts.py --preset small --save-baseline baselines/small.json
+    python bench_report_scripts.py --preset small --baseline baselines/small.json
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+TOD_SCRIPTS_DIR = os.path.join(BENCH_DIR, "..")
+sys.path.insert(0, BENCH_DIR)
+
+# pylint: disable=wrong-import-position
+from junit_corpus import CorpusOptions, write_corpus, write_report
+
+# Corpus size per preset: shards, testcases per shard and KB of output per testcase
+PRESETS = {
+    "small": {"shards": 8, "testcases": 500, "system_out_kb": 0.5},
+    "medium": {"shards": 16, "testcases": 5000, "system_out_kb": 1.0},
+    "large": {"shards": 32, "testcases": 30000, "system_out_kb": 1.0},
+}
+
+CASES = ("summary", "merge_ansible", "merge_terraform", "tod_convert")
+
+# Relative slowdown or growth tolerated before a case counts as a regression, plus
+# absolute slack so tiny cases are not flagged for noise
+DEFAULT_TOLERANCE = 0.25
+SLACK_SECONDS = 0.05
+SLACK_RSS_MB = 5
+
+
+def prepare_corpus(corpus_dir, options):
+    """
+    Generate the inputs of all cases unless corpus_dir already holds them.
+    """
+    manifest_path = os.path.join(corpus_dir, "manifest.json")
+    manifest = options.as_dict()
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            if json.load(f) == manifest:
+                return
+        shutil.rmtree(corpus_dir)
+
+    for shape in ("ansible", "terraform"):
+        write_corpus(
+            os.path.join(corpus_dir, shape),
+            CorpusOptions(**dict(manifest, shape=shape)),
+        )
+
+    # One report holding as many testcases as all shards together
+    single = dict(manifest, shards=1, testcases=options.shards * options.testcases)
+    write_report(
+        os.path.join(corpus_dir, "sdk_test_report.xml"),
+        CorpusOptions(**dict(single, shape="sdk")),
+    )
+    write_report(
+        os.path.join(corpus_dir, "terraform_test_report.xml"),
+        CorpusOptions(**dict(single, shape="terraform")),
+    )
+
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+
+def case_input(corpus_dir, case):
+    return os.path.join(
+        corpus_dir,
+        {
+            "summary": "sdk_test_report.xml",
+            "merge_ansible": "ansible",
+            "merge_terraform": "terraform",
+            "tod_convert": "terraform_test_report.xml",
+        }[case],
+    )
+
+
+def input_size(path):
+    if os.path.isdir(path):
+        return sum(
+            os.path.getsize(os.path.join(path, name))
+            for name in os.listdir(path)
+            if name.endswith(".xml")
+        )
+    return os.path.getsize(path)
+
+
+def run_case(case, input_path, work_dir):
+    """
+    Run one case in this process and return its wall time in seconds.
+    """
+    # pylint: disable=import-outside-toplevel
+    sys.path.insert(0, TOD_SCRIPTS_DIR)
+    os.chdir(work_dir)
+
+    if case == "summary":
+        from generate_test_summary import parse_junit_xml
+
+        start = time.perf_counter()
+        parse_junit_xml(input_path)
+        return time.perf_counter() - start
+
+    if case == "merge_ansible":
+        sys.path.insert(
+            0, os.path.join(TOD_SCRIPTS_DIR, "xml_to_obj_storage", "ansible_tests")
+        )
+        from merge_ansible_results import merge_xml_files
+
+        start = time.perf_counter()
+        merge_xml_files(input_path, os.path.join(work_dir, "ansible_merged.xml"))
+        return time.perf_counter() - start
+
+    if case == "merge_terraform":
+        sys.path.insert(
+            0, os.path.join(TOD_SCRIPTS_DIR, "xml_to_obj_storage", "terraform_tests")
+        )
+        from merge_terraform_results import merge_xml_files
+
+        start = time.perf_counter()
+        merge_xml_files(input_path)
+        return time.perf_counter() - start
+
+    if case == "tod_convert":
+        sys.path.insert(0, os.path.join(TOD_SCRIPTS_DIR, "xml_to_tod"))
+        from tod_report_uploader import change_xml_report_to_tod_acceptable_version
+
+        report = os.path.join(work_dir, os.path.basename(input_path))
+        shutil.copyfile(input_path, report)
+
+        start = time.perf_counter()
+        change_xml_report_to_tod_acceptable_version(report)
+        return time.perf_counter() - start
+
+    raise ValueError(f"Unknown case '{case}'")
+
+
+def measure(case, corpus_dir):
+    """
+    Run a case in a fresh interpreter and return its measurements.
+    """
+    input_path = case_input(corpus_dir, case)
+    work_dir = tempfile.mkdtemp(prefix=f"bench_{case}_")
+    try:
+        process = subprocess.run(
+            [sys.executable, __file__, "--run-case", case, "--input", input_path],
+            cwd=work_dir,
+            check=True,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    size_mb = input_size(input_path) / 1024 / 1024
+    result["input_mb"] = round(size_mb, 2)
+    result["mb_per_second"] = round(size_mb / result["seconds"], 2)
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """
+    Names and messages of the cases that regressed against the baseline.
+    """
+    regressions = []
+    for case, result in results.items():
+        base = baseline.get("results", {}).get(case)
+        if base is None:
+            continue
+        for metric, slack in (
+            ("seconds", SLACK_SECONDS),
+            ("peak_rss_mb", SLACK_RSS_MB),
+        ):
+            limit = base[metric] * (1 + tolerance) + slack
+            if result[metric] > limit:
+                regressions.append(
+                    f"{case}: {metric} {result[metric]} > {base[metric]} "
+                    f"(+{tolerance:.0%} tolerance)"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--shards", type=int)
+    parser.add_argument("--testcases", type=int, help="Per shard")
+    parser.add_argument("--system-out-kb", type=float)
+    parser.add_argument("--failure-ratio", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument(
+        "--corpus-dir",
+        help="Directory to keep the generated corpus in between runs",
+    )
+    parser.add_argument("--baseline", help="Baseline JSON file to compare against")
+    parser.add_argument("--save-baseline", help="Write the results to this JSON file")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--run-case", choices=CASES, help=argparse.SUPPRESS)
+    parser.add_argument("--input", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        seconds = run_case(args.run_case, args.input, os.getcwd())
+        own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        workers = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        print(
+            json.dumps(
+                {
+                    "seconds": round(seconds, 3),
+                    "peak_rss_mb": round(own / 1024, 1),
+                    "workers_peak_rss_mb": round(workers / 1024, 1),
+                }
+            )
+        )
+        return
+
+    sizes = dict(PRESETS[args.preset])
+    for name in ("shards", "testcases", "system_out_kb"):
+        if getattr(args, name) is not None:
+            sizes[name] = getattr(args, name)
+    options = CorpusOptions(failure_ratio=args.failure_ratio, seed=args.seed, **sizes)
+
+    corpus_dir = args.corpus_dir or tempfile.mkdtemp(prefix="junit_corpus_")
+    start = time.perf_counter()
+    prepare_corpus(corpus_dir, options)
+    print(f"Corpus ready in {corpus_dir} after {time.perf_counter() - start:.1f}s")
+
+    results = {}
+    try:
+        for case in args.cases:
+            results[case] = measure(case, corpus_dir)
+    finally:
+        if not args.corpus_dir:
+            shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    print(
+        f"{'case':<16} {'input MB':>9} {'seconds':>9} {'MB/s':>8} "
+        f"{'peak RSS MB':>12} {'workers MB':>11}"
+    )
+    for case, result in results.items():
+        print(
+            f"{case:<16} {result['input_mb']:>9.1f} {result['seconds']:>9.2f} "
+            f"{result['mb_per_second']:>8.1f} {result['peak_rss_mb']:>12.1f} "
+            f"{result['workers_peak_rss_mb']:>11.1f}"
+        )
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({"corpus": options.as_dict(), "results": results}, f, indent=2)
+            f.write("\n")
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("corpus") != options.as_dict():
+            print("Warning: the baseline was measured on a different corpus")
+
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Measure the Parquet export of testcase results: how fast reports are exported,
+how much smaller the dataset is than the XML, and how fast history questions
+are answered by scanning it compared to parsing all the reports again.
+
+--runs reports of the same test module are generated, each with its own seeded
+outcomes. Both ways of answering count the failures and add up the time of
+every test over all runs, and their answers are compared.
+
+Usage:
+    python bench_results_export.py --runs 500 --testcases 500 --shape sdk
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "xml_to_tod"))
+
+# pylint: disable=wrong-import-position
+from junit_corpus import FILE_NAMES, CorpusOptions, write_report
+from modules.results_export import export_reports, import_pyarrow
+from tod_common.junit_stream import JUnitReader
+
+
+def by_parsing(paths):
+    """
+    Failures and total time of every test, found by parsing all reports.
+    """
+    failures = defaultdict(int)
+    times = defaultdict(float)
+    for path in paths:
+        for _, testcase in JUnitReader(path).testcases():
+            key = (testcase.get("classname", ""), testcase.get("name", ""))
+            times[key] += float(testcase.get("time") or 0)
+            if (
+                testcase.find("failure") is not None
+                or testcase.find("error") is not None
+            ):
+                failures[key] += 1
+    return failures, times
+
+
+def by_scanning(dataset_dir):
+    """
+    Failures and total time of every test, found by scanning the dataset.
+    """
+    pa, _ = import_pyarrow()
+    # pylint: disable=import-outside-toplevel
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+
+    table = ds.dataset(dataset_dir, format="parquet", partitioning="hive").to_table(
+        columns=["classname", "name", "status", "time"]
+    )
+    failed = pc.is_in(table["status"], value_set=pa.array(["failure", "error"]))
+    table = table.append_column("failed", pc.cast(failed, pa.int64()))
+    grouped = table.group_by(["classname", "name"]).aggregate(
+        [("failed", "sum"), ("time", "sum")]
+    )
+    failures = {}
+    times = {}
+    for row in grouped.to_pylist():
+        key = (row["classname"], row["name"])
+        times[key] = row["time_sum"]
+        if row["failed_sum"]:
+            failures[key] = row["failed_sum"]
+    return failures, times
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def same_answers(parsed, scanned):
+    failures, times = parsed
+    return dict(failures) == scanned[0] and all(
+        abs(times[key] - scanned[1].get(key, 0)) < 1e-6 for key in times
+    )
+
+
+def directory_size(path):
+    return sum(
+        os.path.getsize(os.path.join(directory, file))
+        for directory, _, files in os.walk(path)
+        for file in files
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=500)
+    parser.add_argument("--testcases", type=int, default=500)
+    parser.add_argument("--shape", choices=sorted(FILE_NAMES), default="sdk")
+    parser.add_argument("--failure-ratio", type=float, default=0.1)
+    parser.add_argument("--system-out-kb", type=float, default=1.0)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    import_pyarrow()
+
+    with tempfile.TemporaryDirectory(prefix="bench_results_export_") as work_dir:
+        reports_dir = os.path.join(work_dir, "reports")
+        os.makedirs(reports_dir)
+        paths = [
+            write_report(
+                os.path.join(reports_dir, FILE_NAMES[args.shape].format(index=seed)),
+                CorpusOptions(
+                    shape=args.shape,
+                    shards=1,
+                    testcases=args.testcases,
+                    failure_ratio=args.failure_ratio,
+                    system_out_kb=args.system_out_kb,
+                    seed=seed,
+                ),
+            )
+            for seed in range(args.runs)
+        ]
+        xml_size = directory_size(reports_dir)
+        dataset_dir = os.path.join(work_dir, "results")
+
+        start = time.perf_counter()
+        exporter = export_reports([reports_dir], dataset_dir, workers=args.workers)
+        export_seconds = time.perf_counter() - start
+        parquet_size = directory_size(dataset_dir)
+
+        print(
+            f"{exporter.reports} reports, {exporter.rows} testcases: "
+            f"{xml_size / 1024 / 1024:.1f} MB XML, "
+            f"{parquet_size / 1024 / 1024:.2f} MB Parquet in {len(exporter.files)} "
+            f"files ({xml_size / parquet_size:.0f}x smaller)"
+        )
+        print(
+            f"export: {export_seconds:.2f} s, {exporter.rows / export_seconds:.0f} "
+            f"testcases/s, {export_seconds * 1000 / exporter.reports:.2f} ms/report"
+        )
+
+        print()
+        print("Failures and total time of every test over all runs:")
+        parse_seconds, parsed = timed(by_parsing, paths)
+        scan_seconds, scanned = timed(by_scanning, dataset_dir)
+        print(f"  parsing the XML:      {parse_seconds * 1000:9.1f} ms")
+        print(
+            f"  scanning the Parquet: {scan_seconds * 1000:9.1f} ms "
+            f"({parse_seconds / scan_seconds:.0f}x faster)"
+        )
+        print(f"  same answers: {same_answers(parsed, scanned)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Measure the results index of the TOD uploader: what collecting and indexing the
+testcases adds to the transform stage, and how fast history questions are
+answered from the index compared to parsing the reports again.
+
+--runs reports of the same sdk test module are generated, each with its own
+seeded outcomes, so tests fail and pass across runs like flaky ones do. Every
+report goes through transform_report with and without collecting testcases and
+then into a ResultsIndex. The queries look at the last --window runs.
+
+Usage:
+    python bench_results_index.py --runs 200 --testcases 500 --window 20
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "xml_to_tod"))
+
+# pylint: disable=wrong-import-position
+from junit_corpus import CorpusOptions, write_report
+from modules.results_index import ResultsIndex
+from tod_common.junit_stream import JUnitReader
+from tod_report_uploader import ReportJob, index_report, transform_report
+
+
+def transform(content, collect_testcases):
+    job = ReportJob("0000_sdk_test_report.xml", os.devnull)
+    job.content = content
+    start = time.perf_counter()
+    transform_report(job, "DX", collect_testcases=collect_testcases)
+    return job, time.perf_counter() - start
+
+
+def failed_by_parsing(paths):
+    """
+    The failing tests of the given reports, found by parsing all of them.
+    """
+    failed = set()
+    for path in paths:
+        for _, testcase in JUnitReader(path).testcases():
+            if (
+                testcase.find("failure") is not None
+                or testcase.find("error") is not None
+            ):
+                failed.add((testcase.get("classname"), testcase.get("name")))
+    return failed
+
+
+def timed(func, repeat=5):
+    """
+    Median milliseconds of func and its last result.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--testcases", type=int, default=500)
+    parser.add_argument("--failure-ratio", type=float, default=0.1)
+    parser.add_argument("--system-out-kb", type=float, default=1.0)
+    parser.add_argument("--window", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_results_index_") as work_dir:
+        paths = [
+            write_report(
+                os.path.join(work_dir, f"run_{seed:04d}.xml"),
+                CorpusOptions(
+                    shape="sdk",
+                    testcases=args.testcases,
+                    failure_ratio=args.failure_ratio,
+                    system_out_kb=args.system_out_kb,
+                    seed=seed,
+                ),
+            )
+            for seed in range(args.runs)
+        ]
+        size = sum(os.path.getsize(path) for path in paths)
+
+        index = ResultsIndex(os.path.join(work_dir, "results_index.sqlite"))
+        plain = collecting = indexing = 0.0
+        for number, path in enumerate(paths):
+            with open(path, "rb") as f:
+                content = f.read()
+            plain += transform(content, False)[1]
+            job, seconds = transform(content, True)
+            collecting += seconds
+            job.file_name = os.path.basename(path)
+            job.version = str(number)
+            start = time.perf_counter()
+            index_report(job, index)
+            indexing += time.perf_counter() - start
+
+        testcases = args.runs * args.testcases
+        print(
+            f"{args.runs} reports, {testcases} testcases, {size / 1024 / 1024:.1f} MB, "
+            f"index {os.path.getsize(index.path) / 1024 / 1024:.1f} MB"
+        )
+        print(
+            f"transform: {plain * 1000 / args.runs:.2f} ms/report plain, "
+            f"{collecting * 1000 / args.runs:.2f} ms/report collecting testcases; "
+            f"indexing {indexing * 1000 / args.runs:.2f} ms/report "
+            f"({testcases / indexing:.0f} testcases/s)"
+        )
+
+        print()
+        print(f"Queries over the last {args.window} runs:")
+        parse_ms, failed = timed(
+            lambda: failed_by_parsing(paths[-args.window :]), repeat=1
+        )
+        query_ms, rows = timed(lambda: index.pass_rates(runs=args.window, failed=True))
+        print(
+            f"  failed tests: {query_ms:8.2f} ms from the index, "
+            f"{parse_ms:8.1f} ms parsing the reports ({len(rows)} / {len(failed)} tests)"
+        )
+        for name, func in (
+            ("pass rates", lambda: index.pass_rates(runs=args.window)),
+            ("flaky tests", lambda: index.flaky(runs=args.window)),
+            (
+                "duration trend",
+                lambda: index.durations("%test_case_7", runs=args.window),
+            ),
+            ("last runs", lambda: index.runs(runs=args.window)),
+        ):
+            query_ms, rows = timed(func)
+            print(f"  {name}: {query_ms:8.2f} ms from the index ({len(rows)} rows)")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
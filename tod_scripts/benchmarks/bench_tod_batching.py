@@ -0,0 +1,106 @@
+"""
+Compare one TOD submission per report with batched submissions, running the
+uploader pipeline against local stand-in S3 and TOD servers.
+
+The bucket is seeded with the shards of a single workflow run, like a parallel
+test job leaves them, and the run is repeated for every batch size. Requests,
+builds accepted by TOD and reports left in the bucket are reported.
+
+Usage:
+    python bench_tod_batching.py --files 60 --batch-sizes 1 10 30
+"""
+
+import argparse
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "xml_to_tod"))
+
+# pylint: disable=wrong-import-position
+from fake_s3 import FakeS3Server
+from fake_tod import FakeTODServer
+from tod_report_uploader import download_and_upload_xml_files
+
+BUCKET = "dx-test-results"
+
+
+def seed_reports(server, count, tests):
+    """
+    Store `count` shards of one linodego workflow run in the fake bucket.
+    """
+    testcases = "".join(
+        f'<testcase name="TestCase_{i}" classname="linodego" time="0.5"/>'
+        for i in range(tests)
+    )
+    for i in range(count):
+        body = (
+            f'<testsuites tests="{tests}" failures="0" errors="0" skipped="0">'
+            f'<testsuite name="shard_{i}" tests="{tests}" failures="0" errors="0" skipped="0">'
+            f"{testcases}</testsuite>"
+            "<branch_name>main</branch_name><gha_run_id>1234</gha_run_id>"
+            "<gha_run_number>56</gha_run_number><release_tag>1.2.3</release_tag>"
+            "</testsuites>"
+        ).encode("utf-8")
+        server.put_object(BUCKET, f"{i:05d}_linodego_test_report.xml", body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--files", type=int, default=60)
+    parser.add_argument("--tests", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 30])
+    args = parser.parse_args()
+
+    s3_server = FakeS3Server().start()
+    tod_server = FakeTODServer(latency=args.latency).start()
+    os.environ["OBJ_ENDPOINT_URL"] = s3_server.endpoint_url
+    os.environ.setdefault("LINODE_CLI_OBJ_ACCESS_KEY", "fake")
+    os.environ.setdefault("LINODE_CLI_OBJ_SECRET_KEY", "fake")
+
+    rows = []
+    try:
+        for batch_size in args.batch_sizes:
+            seed_reports(s3_server, args.files, args.tests)
+            tod_server.reset_counters()
+
+            start = time.perf_counter()
+            done = download_and_upload_xml_files(
+                "us-east-1",
+                BUCKET,
+                tod_server.url,
+                workers=args.workers,
+                batch_size=batch_size,
+            )
+            seconds = time.perf_counter() - start
+
+            rows.append(
+                (
+                    batch_size,
+                    len(done),
+                    seconds,
+                    tod_server.counters["requests"],
+                    tod_server.counters["accepted"],
+                    len(s3_server.list_keys(BUCKET)),
+                )
+            )
+    finally:
+        s3_server.stop()
+        tod_server.stop()
+
+    print(
+        f"{'batch':>6} {'reports':>8} {'seconds':>9} {'requests':>9} {'builds':>7} {'left':>5}"
+    )
+    for batch_size, reports, seconds, requests, builds, left in rows:
+        print(
+            f"{batch_size:>6} {reports:>8} {seconds:>9.2f} {requests:>9} {builds:>7} {left:>5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
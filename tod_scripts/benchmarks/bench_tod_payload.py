@@ -0,0 +1,114 @@
+"""
+Compare bytes on the wire and upload time of the TOD payload compression modes
+against a local TOD stand-in.
+
+A terraform-shaped report with captured system-out is uploaded repeatedly with
+each compression mode of modules.tod_payload.TodPayload. One more upload per mode
+is traced with tracemalloc to report the peak memory it allocates on top of the
+report, as a multiple of the report size. That upload goes to a stand-in in a
+separate process, so the memory the server needs to decode it is not counted.
+
+Usage:
+    python bench_tod_payload.py --testcases 2000 --uploads 20
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "xml_to_tod"))
+
+# pylint: disable=wrong-import-position
+from fake_tod import FakeTODServer
+from modules.tod_payload import COMPRESSION_MODES, TodPayload
+
+
+def terraform_report(testcases):
+    """
+    A terraform-like report with verbose system-out for every testcase.
+    """
+    output = (
+        "=== RUN   TestAccResourceInstance_basic\n    provider_test.go:42: creating linode\n"
+        * 20
+    )
+    cases = "".join(
+        f'<testcase classname="linode/instance" name="TestAccResourceInstance_{i}" time="{i % 97}.5">'
+        f"<system-out>{output}</system-out></testcase>"
+        for i in range(testcases)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f'<testsuites tests="{testcases}" failures="0"><testsuite name="linode">'
+        f"{cases}</testsuite></testsuites>"
+    ).encode("utf-8")
+
+
+def serve(connection):
+    server = FakeTODServer()
+    connection.send(server.url)
+    server.serve_forever()
+
+
+def peak_allocated(payload, url, data, report):
+    """
+    Peak bytes allocated while a report is uploaded once.
+    """
+    tracemalloc.start()
+    try:
+        payload.send(url, data, [report])
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--testcases", type=int, default=2000)
+    parser.add_argument("--uploads", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    report = terraform_report(args.testcases)
+    data = {"team": "DX", "softwareName": "linode-terraform", "pass": True}
+    server = FakeTODServer(latency=args.latency).start()
+    parent, child = multiprocessing.Pipe()
+    remote_server = multiprocessing.Process(target=serve, args=(child,), daemon=True)
+    remote_server.start()
+    remote_url = parent.recv()
+
+    print(f"report size: {len(report) / 1024:.0f} KB")
+    print(
+        f"{'mode':<6} {'KB/upload':>10} {'ms/upload':>10} {'accepted':>9} {'peak x report':>14}"
+    )
+    try:
+        for mode in COMPRESSION_MODES:
+            server.reset_counters()
+            payload = TodPayload(mode)
+
+            start = time.perf_counter()
+            for _ in range(args.uploads):
+                payload.send(server.url, data, [report])
+            elapsed = time.perf_counter() - start
+            received = server.counters["bytes_received"]
+            accepted = server.counters["accepted"]
+
+            peak = peak_allocated(payload, remote_url, data, report)
+
+            print(
+                f"{mode:<6} {received / args.uploads / 1024:>10.1f} "
+                f"{elapsed / args.uploads * 1000:>10.1f} {accepted:>9} "
+                f"{peak / len(report):>14.2f}"
+            )
+    finally:
+        server.stop()
+        remote_server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Compare plain requests.post uploads with the shared HttpClient against a local
+flaky TOD stand-in.
+
+The baseline sends each build like the uploader used to: a new connection per
+POST and no retries. The session client reuses pooled connections and retries
+503 and 429 responses with jittered backoff.
+
+Usage:
+    python bench_tod_uploads.py --uploads 200 --error-rate 0.1 --workers 4
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+
+# pylint: disable=wrong-import-position
+from fake_tod import FakeTODServer
+from tod_common.http_session import HttpClient
+
+
+def upload_plain(url, payload):
+    try:
+        response = requests.post(
+            url,
+            data=payload,
+            headers={"Content-Type": "application/json"},
+            timeout=10,
+        )
+        return response.status_code == 201
+    except requests.exceptions.RequestException:
+        return False
+
+
+def run(server, uploads, workers, client=None):
+    """
+    Send `uploads` builds and return (seconds, accepted uploads).
+    """
+    payload = json.dumps({"team": "DX", "xunitResults": ["PHRlc3RzdWl0ZXM+"]})
+
+    def upload(_):
+        if client is None:
+            return upload_plain(server.url, payload)
+        try:
+            response = client.post(
+                server.url,
+                data=payload,
+                headers={"Content-Type": "application/json"},
+            )
+            return response.status_code == 201
+        except requests.exceptions.RequestException:
+            return False
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        accepted = sum(executor.map(upload, range(uploads)))
+    return time.perf_counter() - start, accepted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--uploads", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    parser.add_argument("--throttle-rate", type=float, default=0.02)
+    parser.add_argument("--retries", type=int, default=3)
+    args = parser.parse_args()
+
+    server = FakeTODServer(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+    ).start()
+
+    print(
+        f"{'client':<8} {'uploads':>7} {'accepted':>8} {'seconds':>8} "
+        f"{'requests':>8} {'conns':>6}"
+    )
+    try:
+        for name in ("plain", "session"):
+            server.reset_counters()
+            client = (
+                HttpClient(
+                    retries=args.retries,
+                    backoff=0.05,
+                    pool_size=args.workers,
+                    max_per_host=args.workers,
+                )
+                if name == "session"
+                else None
+            )
+            elapsed, accepted = run(server, args.uploads, args.workers, client)
+            print(
+                f"{name:<8} {args.uploads:>7} {accepted:>8} {elapsed:>8.2f} "
+                f"{server.counters['requests']:>8} {server.counters['connections']:>6}"
+            )
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Show how fast the watch mode of the TOD uploader picks up new reports, and how
+little it polls an idle bucket, against local stand-in S3 and TOD servers.
+
+Reports arrive in bursts with idle gaps in between. For every report the time
+from its upload to the bucket until it was deleted after TOD accepted it is
+measured, along with the listing requests made during the gaps.
+
+Usage:
+    python bench_watch_mode.py --bursts 4 --reports 10 --gap 20
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "xml_to_tod"))
+
+# The watch state and release cache are kept below the working directory
+os.chdir(tempfile.mkdtemp(prefix="bench_watch_mode_"))
+
+# pylint: disable=wrong-import-position
+from fake_s3 import FakeS3Server
+from fake_tod import FakeTODServer
+from tod_report_uploader import watch_and_upload
+
+BUCKET = "dx-test-results"
+
+REPORT = (
+    '<testsuites tests="1" failures="0" errors="0" skipped="0">'
+    '<testsuite name="watch" tests="1" failures="0" errors="0" skipped="0">'
+    '<testcase name="TestCase" classname="linodego" time="0.5"/></testsuite>'
+    "<branch_name>main</branch_name><gha_run_id>1</gha_run_id>"
+    "<gha_run_number>1</gha_run_number><release_tag>1.0.0</release_tag>"
+    "</testsuites>"
+).encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--bursts", type=int, default=4)
+    parser.add_argument("--reports", type=int, default=10, help="Per burst")
+    parser.add_argument("--gap", type=float, default=20, help="Idle seconds")
+    parser.add_argument("--poll-min", type=float, default=0.5)
+    parser.add_argument("--poll-max", type=float, default=8)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    s3_server = FakeS3Server().start()
+    tod_server = FakeTODServer(latency=0.01).start()
+    os.environ["OBJ_ENDPOINT_URL"] = s3_server.endpoint_url
+    os.environ.setdefault("LINODE_CLI_OBJ_ACCESS_KEY", "fake")
+    os.environ.setdefault("LINODE_CLI_OBJ_SECRET_KEY", "fake")
+
+    stop_event = threading.Event()
+    watcher = threading.Thread(
+        target=watch_and_upload,
+        args=("us-east-1", BUCKET, tod_server.url),
+        kwargs={
+            "workers": args.workers,
+            "state_path": os.path.join(os.getcwd(), "watch_state.json"),
+            "poll_min": args.poll_min,
+            "poll_max": args.poll_max,
+            "stop_event": stop_event,
+        },
+    )
+
+    uploaded_at = {}
+    latencies = []
+    idle_lists = []
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            watcher.start()
+            for burst in range(args.bursts):
+                for number in range(args.reports):
+                    key = f"{burst:03d}_{number:03d}_linodego_test_report.xml"
+                    s3_server.put_object(BUCKET, key, REPORT)
+                    uploaded_at[key] = time.perf_counter()
+
+                # Wait until the burst is drained, noting when each report left
+                pending = set(uploaded_at)
+                while pending:
+                    remaining = set(s3_server.list_keys(BUCKET))
+                    now = time.perf_counter()
+                    for key in pending - remaining:
+                        latencies.append(now - uploaded_at.pop(key))
+                    pending &= remaining
+                    time.sleep(0.05)
+
+                lists = s3_server.requests["ListObjectsV2"]
+                time.sleep(args.gap)
+                idle_lists.append(s3_server.requests["ListObjectsV2"] - lists)
+    finally:
+        stop_event.set()
+        watcher.join()
+        s3_server.stop()
+        tod_server.stop()
+
+    latencies.sort()
+    print(
+        f"{len(latencies)} reports in {args.bursts} bursts, "
+        f"{tod_server.counters['accepted']} accepted by TOD"
+    )
+    print(
+        f"Arrival to deletion: median {statistics.median(latencies):.2f}s, "
+        f"max {latencies[-1]:.2f}s"
+    )
+    print(
+        f"Listing requests per {args.gap:.0f}s idle gap: "
+        + ", ".join(str(count) for count in idle_lists)
+        + f" (a fixed {args.poll_min}s interval would make "
+        f"{int(args.gap / args.poll_min)})"
+    )
+
+
+if __name__ == "__main__":
+    main()
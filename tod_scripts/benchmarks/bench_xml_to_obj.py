@@ -0,0 +1,139 @@
+"""
+Compare uploading report shards with one xml_to_obj.py process per file against
+the directory mode of xml_to_obj.py, using a local stand-in S3 server.
+
+The directory is uploaded a second time to show that unchanged files are
+skipped, and a large merged report is uploaded to show the multipart transfer.
+
+Usage:
+    python bench_xml_to_obj.py --files 40 --size-kb 64 --large-mb 48 --workers 8
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPT_DIR = os.path.join(BENCH_DIR, "..", "xml_to_obj_storage", "scripts")
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, SCRIPT_DIR)
+
+# pylint: disable=wrong-import-position
+from fake_s3 import FakeS3Server
+
+BUCKET = "dx-test-results"
+
+
+def write_report(path, size_kb):
+    filler = "x" * 1024
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<testsuites><testsuite>")
+        for i in range(size_kb):
+            f.write(
+                f'<testcase name="case_{i}"><system-out>{filler}</system-out></testcase>'
+            )
+        f.write("</testsuite></testsuites>")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--files", type=int, default=40)
+    parser.add_argument("--size-kb", type=int, default=64)
+    parser.add_argument("--large-mb", type=int, default=48)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    server = FakeS3Server().start()
+    os.environ["OBJ_ENDPOINT_URL"] = server.endpoint_url
+    os.environ.setdefault("LINODE_CLI_OBJ_ACCESS_KEY", "fake")
+    os.environ.setdefault("LINODE_CLI_OBJ_SECRET_KEY", "fake")
+
+    # Reads the endpoint from the environment at import time
+    import xml_to_obj  # pylint: disable=import-outside-toplevel
+
+    work_dir = tempfile.mkdtemp(prefix="bench_xml_to_obj_")
+    shard_dir = os.path.join(work_dir, "shards")
+    os.makedirs(shard_dir)
+    for i in range(args.files):
+        write_report(
+            os.path.join(shard_dir, f"{i:05d}_linodego_report.xml"), args.size_kb
+        )
+    large_report = os.path.join(work_dir, "merged_terraform_report.xml")
+    write_report(large_report, args.large_mb * 1024)
+
+    def clear_bucket():
+        for key in server.list_keys(BUCKET):
+            server.delete_object(BUCKET, key)
+        server.requests.clear()
+
+    rows = []
+    try:
+        clear_bucket()
+        connections = server.connections
+        start = time.perf_counter()
+        for file_name in sorted(os.listdir(shard_dir)):
+            subprocess.run(
+                [
+                    sys.executable,
+                    os.path.join(SCRIPT_DIR, "xml_to_obj.py"),
+                    file_name,
+                    "--force",
+                ],
+                cwd=shard_dir,
+                check=True,
+                stdout=subprocess.DEVNULL,
+            )
+        rows.append(
+            (
+                "process per file",
+                args.files,
+                time.perf_counter() - start,
+                server.connections - connections,
+                sum(server.requests.values()),
+            )
+        )
+
+        for name in ("directory", "directory again"):
+            if name == "directory":
+                clear_bucket()
+            else:
+                server.requests.clear()
+            connections = server.connections
+            start = time.perf_counter()
+            counts = xml_to_obj.upload_files([shard_dir], args.workers)
+            rows.append(
+                (
+                    f"{name} ({counts['skipped']} skipped)",
+                    args.files,
+                    time.perf_counter() - start,
+                    server.connections - connections,
+                    sum(server.requests.values()),
+                )
+            )
+
+        server.requests.clear()
+        connections = server.connections
+        start = time.perf_counter()
+        xml_to_obj.upload_files([large_report], args.workers, skip_existing=False)
+        rows.append(
+            (
+                f"{args.large_mb} MB report ({server.requests['UploadPart']} parts)",
+                1,
+                time.perf_counter() - start,
+                server.connections - connections,
+                sum(server.requests.values()),
+            )
+        )
+    finally:
+        server.stop()
+
+    print(f"{'mode':<32} {'files':>6} {'seconds':>9} {'conns':>6} {'requests':>9}")
+    for name, files, seconds, connections, requests in rows:
+        print(f"{name:<32} {files:>6} {seconds:>9.2f} {connections:>6} {requests:>9}")
+
+
+if __name__ == "__main__":
+    main()
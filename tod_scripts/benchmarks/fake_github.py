@@ -0,0 +1,101 @@
+"""
+Minimal stand-in for the GitHub releases API.
+
+GET /repos/<owner>/<repo>/releases/latest returns {"tag_name": ...} with an ETag
+and answers 304 Not Modified when If-None-Match matches. Connections, requests
+and 304 responses are counted so benchmarks can show how many lookups reached
+GitHub.
+"""
+
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    """
+    Request handler for the latest release endpoint.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Keep-alive clients would otherwise wait on delayed ACKs between small writes
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.count("connections")
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self.server.count("requests")
+
+        parts = self.path.strip("/").split("/")
+        if (
+            len(parts) != 5
+            or parts[0] != "repos"
+            or parts[3:] != ["releases", "latest"]
+        ):
+            self._send(404, b'{"message": "Not Found"}')
+            return
+
+        tag = self.server.releases.get(parts[2], self.server.default_tag)
+        body = json.dumps({"tag_name": tag}).encode("utf-8")
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+
+        if self.headers.get("If-None-Match") == etag:
+            self.server.count("not_modified")
+            self._send(304, headers={"ETag": etag})
+            return
+
+        self._send(200, body, {"ETag": etag, "Content-Type": "application/json"})
+
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+
+class FakeGitHubServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server returning the configured release tag per repository.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), releases=None, default_tag="v1.0.0"):
+        """
+        Initialize FakeGitHubServer with a mapping of repository name to tag.
+        """
+        super().__init__(address, FakeGitHubHandler)
+        self.releases = dict(releases or {})
+        self.default_tag = default_tag
+        self.counters = {}
+        self.reset_counters()
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reset_counters(self):
+        self.counters = {"connections": 0, "requests": 0, "not_modified": 0}
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Stand-in for `linode-cli obj` that talks to the fake S3 server.
+
+It supports the `la`, `get` and `rm` commands with the same arguments the
+LinodeCommands class generates. Like the real CLI, every invocation starts a new
+interpreter, builds a new client and opens a new connection, so it reproduces
+the per-operation cost of the subprocess backend. The endpoint is taken from
+the OBJ_ENDPOINT_URL environment variable.
+"""
+
+import argparse
+import os
+import sys
+
+import boto3
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="linode-cli")
+    parser.add_argument("plugin", choices=["obj"])
+    parser.add_argument("command", choices=["la", "get", "rm"])
+    parser.add_argument("--cluster", required=True)
+    parser.add_argument("args", nargs="*")
+    args = parser.parse_intermixed_args(argv)
+
+    s3 = boto3.client(
+        "s3",
+        aws_access_key_id=os.environ.get("LINODE_CLI_OBJ_ACCESS_KEY", "fake"),
+        aws_secret_access_key=os.environ.get("LINODE_CLI_OBJ_SECRET_KEY", "fake"),
+        endpoint_url=os.environ["OBJ_ENDPOINT_URL"],
+    )
+
+    if args.command == "la":
+        for bucket in os.environ.get("FAKE_BUCKETS", "dx-test-results").split(","):
+            paginator = s3.get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=bucket):
+                for obj in page.get("Contents", []):
+                    modified = obj["LastModified"].strftime("%Y-%m-%d %H:%M")
+                    print(f"{modified}  {obj['Size']}  {bucket}/{obj['Key']}")
+    elif args.command == "get":
+        bucket, key, destination = args.args
+        s3.download_file(Bucket=bucket, Key=key, Filename=destination)
+    else:
+        bucket, key = args.args
+        s3.delete_object(Bucket=bucket, Key=key)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
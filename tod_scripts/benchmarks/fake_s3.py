@@ -0,0 +1,377 @@
+"""
+Minimal in-memory stand-in for the S3 compatible API of Linode Object Storage.
+
+Only the calls the report scripts make are implemented, using path-style
+addressing (http://127.0.0.1:<port>/<bucket>/<key>):
+- ListObjectsV2 with prefix, max-keys and continuation tokens
+- GetObject, HeadObject, PutObject and DeleteObject
+- DeleteObjects (POST /<bucket>?delete), keys listed in fail_deletes are
+  answered with an AccessDenied error entry
+- multipart uploads: CreateMultipartUpload, UploadPart,
+  CompleteMultipartUpload and AbortMultipartUpload
+
+The server speaks HTTP/1.1 keep-alive and counts accepted connections and
+requests per operation so benchmarks can show how many TCP connections and
+round trips a client needed.
+"""
+
+import datetime
+import hashlib
+import itertools
+import threading
+import xml.etree.ElementTree as ET
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.sax.saxutils import escape
+
+
+class FakeObject:
+    """
+    A stored object with the metadata S3 reports for it.
+    """
+
+    def __init__(self, body, etag=None):
+        """
+        Initialize FakeObject with its content and the ETag of a multipart upload.
+        """
+        self.body = body
+        self.etag = etag or f'"{hashlib.md5(body).hexdigest()}"'
+        self.last_modified = datetime.datetime.now(datetime.timezone.utc)
+
+
+class FakeS3Handler(BaseHTTPRequestHandler):
+    """
+    Request handler implementing the subset of the S3 API described above.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Keep-alive clients would otherwise wait on delayed ACKs between small writes
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.count_connection()
+
+    def _split_path(self):
+        parts = urlsplit(self.path)
+        path = unquote(parts.path).lstrip("/")
+        bucket, _, key = path.partition("/")
+        query = {
+            name: values[0]
+            for name, values in parse_qs(parts.query, keep_blank_values=True).items()
+        }
+        return bucket, key, query
+
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _send_error(self, status, code, message):
+        body = (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            f"<Error><Code>{code}</Code><Message>{escape(message)}</Message></Error>"
+        ).encode("utf-8")
+        self._send(status, body, {"Content-Type": "application/xml"})
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+
+    def _object_headers(self, obj):
+        return {
+            "ETag": obj.etag,
+            "Last-Modified": obj.last_modified.strftime("%a, %d %b %Y %H:%M:%S GMT"),
+            "Content-Type": "application/octet-stream",
+        }
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        bucket, key, query = self._split_path()
+        if bucket not in self.server.buckets:
+            self._send_error(404, "NoSuchBucket", bucket)
+            return
+
+        if not key:
+            self.server.count_request("ListObjectsV2")
+            self._list_objects(bucket, query)
+            return
+
+        self.server.count_request("GetObject")
+        obj = self.server.get_object(bucket, key)
+        if obj is None:
+            self._send_error(404, "NoSuchKey", key)
+            return
+
+        self._send(200, obj.body, self._object_headers(obj))
+
+    def do_HEAD(self):  # pylint: disable=invalid-name
+        bucket, key, _ = self._split_path()
+        self.server.count_request("HeadObject")
+        obj = self.server.get_object(bucket, key)
+        if obj is None:
+            self._send(404)
+            return
+
+        headers = self._object_headers(obj)
+        headers["Content-Length"] = str(len(obj.body))
+        self.send_response(200)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+
+    def do_PUT(self):  # pylint: disable=invalid-name
+        bucket, key, query = self._split_path()
+        body = self._read_body()
+        if bucket not in self.server.buckets:
+            self._send_error(404, "NoSuchBucket", bucket)
+            return
+
+        if "uploadId" in query:
+            self.server.count_request("UploadPart")
+            etag = self.server.put_part(
+                query["uploadId"], int(query["partNumber"]), body
+            )
+            if etag is None:
+                self._send_error(404, "NoSuchUpload", query["uploadId"])
+            else:
+                self._send(200, headers={"ETag": etag})
+            return
+
+        self.server.count_request("PutObject")
+        obj = self.server.put_object(bucket, key, body)
+        self._send(200, headers={"ETag": obj.etag})
+
+    def do_DELETE(self):  # pylint: disable=invalid-name
+        bucket, key, query = self._split_path()
+        if "uploadId" in query:
+            self.server.count_request("AbortMultipartUpload")
+            self.server.abort_upload(query["uploadId"])
+            self._send(204)
+            return
+
+        self.server.count_request("DeleteObject")
+        self.server.delete_object(bucket, key)
+        self._send(204)
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        bucket, key, query = self._split_path()
+        body = self._read_body()
+        if "uploads" in query:
+            self.server.count_request("CreateMultipartUpload")
+            upload_id = self.server.create_upload(bucket, key)
+            self._send_xml(
+                "<InitiateMultipartUploadResult>"
+                f"<Bucket>{escape(bucket)}</Bucket><Key>{escape(key)}</Key>"
+                f"<UploadId>{upload_id}</UploadId>"
+                "</InitiateMultipartUploadResult>"
+            )
+            return
+        if "uploadId" in query:
+            self.server.count_request("CompleteMultipartUpload")
+            obj = self.server.complete_upload(query["uploadId"])
+            if obj is None:
+                self._send_error(404, "NoSuchUpload", query["uploadId"])
+                return
+            self._send_xml(
+                "<CompleteMultipartUploadResult>"
+                f"<Bucket>{escape(bucket)}</Bucket><Key>{escape(key)}</Key>"
+                f"<ETag>{escape(obj.etag)}</ETag>"
+                "</CompleteMultipartUploadResult>"
+            )
+            return
+        if "delete" not in query:
+            self._send_error(501, "NotImplemented", self.path)
+            return
+
+        self.server.count_request("DeleteObjects")
+        request = ET.fromstring(body)
+        namespace = (
+            request.tag[: request.tag.index("}") + 1] if "}" in request.tag else ""
+        )
+        quiet = (request.findtext(f"{namespace}Quiet") or "").lower() == "true"
+
+        results = []
+        for element in request.iter(f"{namespace}Object"):
+            key = element.findtext(f"{namespace}Key")
+            if key in self.server.fail_deletes:
+                results.append(
+                    f"<Error><Key>{escape(key)}</Key><Code>AccessDenied</Code>"
+                    "<Message>Access Denied</Message></Error>"
+                )
+                continue
+            self.server.delete_object(bucket, key)
+            if not quiet:
+                results.append(f"<Deleted><Key>{escape(key)}</Key></Deleted>")
+
+        self._send_xml(f"<DeleteResult>{''.join(results)}</DeleteResult>")
+
+    def _send_xml(self, document):
+        # Add the S3 namespace to the root element
+        tag_end = document.index(">")
+        body = (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            f"{document[:tag_end]} "
+            'xmlns="http://s3.amazonaws.com/doc/2006-03-01/"'
+            f"{document[tag_end:]}"
+        ).encode("utf-8")
+        self._send(200, body, {"Content-Type": "application/xml"})
+
+    def _list_objects(self, bucket, query):
+        prefix = query.get("prefix", "")
+        max_keys = int(query.get("max-keys", 1000))
+        start_after = query.get("continuation-token") or query.get("start-after", "")
+
+        keys = sorted(
+            key
+            for key in self.server.list_keys(bucket)
+            if key.startswith(prefix) and key > start_after
+        )
+        page = keys[:max_keys]
+        truncated = len(keys) > max_keys
+
+        contents = []
+        for key in page:
+            obj = self.server.get_object(bucket, key)
+            if obj is None:
+                continue
+            contents.append(
+                "<Contents>"
+                f"<Key>{escape(key)}</Key>"
+                f"<LastModified>{obj.last_modified.strftime('%Y-%m-%dT%H:%M:%S.000Z')}</LastModified>"
+                f"<ETag>{escape(obj.etag)}</ETag>"
+                f"<Size>{len(obj.body)}</Size>"
+                "<StorageClass>STANDARD</StorageClass>"
+                "</Contents>"
+            )
+
+        next_token = (
+            f"<NextContinuationToken>{escape(page[-1])}</NextContinuationToken>"
+            if truncated
+            else ""
+        )
+        body = (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+            f"<Name>{escape(bucket)}</Name>"
+            f"<Prefix>{escape(prefix)}</Prefix>"
+            f"<KeyCount>{len(contents)}</KeyCount>"
+            f"<MaxKeys>{max_keys}</MaxKeys>"
+            f"<IsTruncated>{'true' if truncated else 'false'}</IsTruncated>"
+            f"{''.join(contents)}{next_token}"
+            "</ListBucketResult>"
+        ).encode("utf-8")
+        self._send(200, body, {"Content-Type": "application/xml"})
+
+
+class FakeS3Server(ThreadingHTTPServer):
+    """
+    Threaded HTTP server holding the buckets and objects in memory.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), buckets=("dx-test-results",)):
+        """
+        Initialize FakeS3Server listening on the given address with empty buckets.
+        """
+        super().__init__(address, FakeS3Handler)
+        self.buckets = {bucket: {} for bucket in buckets}
+        self.connections = 0
+        self.requests = Counter()
+        # Keys DeleteObjects reports as failed
+        self.fail_deletes = set()
+        # Upload ID -> (bucket, key, {part number: body})
+        self.uploads = {}
+        self._upload_ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def endpoint_url(self):
+        """
+        Base URL to pass to boto3 as endpoint_url.
+        """
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count_connection(self):
+        with self.lock:
+            self.connections += 1
+
+    def count_request(self, operation):
+        with self.lock:
+            self.requests[operation] += 1
+
+    def put_object(self, bucket, key, body):
+        obj = FakeObject(body)
+        with self.lock:
+            self.buckets.setdefault(bucket, {})[key] = obj
+        return obj
+
+    def get_object(self, bucket, key):
+        with self.lock:
+            return self.buckets.get(bucket, {}).get(key)
+
+    def delete_object(self, bucket, key):
+        with self.lock:
+            self.buckets.get(bucket, {}).pop(key, None)
+
+    def create_upload(self, bucket, key):
+        with self.lock:
+            upload_id = f"upload-{next(self._upload_ids)}"
+            self.uploads[upload_id] = (bucket, key, {})
+        return upload_id
+
+    def put_part(self, upload_id, part_number, body):
+        with self.lock:
+            if upload_id not in self.uploads:
+                return None
+            self.uploads[upload_id][2][part_number] = body
+        return f'"{hashlib.md5(body).hexdigest()}"'
+
+    def complete_upload(self, upload_id):
+        """
+        Assemble the parts of an upload in part number order into an object.
+        """
+        with self.lock:
+            if upload_id not in self.uploads:
+                return None
+            bucket, key, parts = self.uploads.pop(upload_id)
+
+        bodies = [parts[number] for number in sorted(parts)]
+        digest = hashlib.md5(b"".join(hashlib.md5(body).digest() for body in bodies))
+        obj = FakeObject(b"".join(bodies), f'"{digest.hexdigest()}-{len(bodies)}"')
+        with self.lock:
+            self.buckets.setdefault(bucket, {})[key] = obj
+        return obj
+
+    def abort_upload(self, upload_id):
+        with self.lock:
+            self.uploads.pop(upload_id, None)
+
+    def list_keys(self, bucket):
+        with self.lock:
+            return list(self.buckets.get(bucket, {}))
+
+    def start(self):
+        """
+        Serve requests from a background thread.
+        """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop serving and close the listening socket.
+        """
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,217 @@
+"""
+Stand-in for the TOD (Test Outcome Database) builds endpoint.
+
+POST /builds/ accepts a JSON build and answers 201 Created. Gzip request bodies
+(Content-Encoding: gzip) are accepted unless disabled, in which case they get a
+415 like a server without support for them. Latency, a share of
+503 errors and a share of 429 responses with Retry-After can be injected from a
+seeded random generator, so runs are reproducible. Connections, requests and
+accepted builds are counted.
+
+With a capacity the server behaves like one that handles that many requests at a
+time: the latency of a request grows with the requests in flight beyond the
+capacity, and beyond OVERLOAD times the capacity requests get a 429 response
+with Retry-After.
+
+With a reject_marker every build with a report containing it gets a 422, like
+TOD refusing an invalid report, and none of the reports of the build are kept.
+"""
+
+import base64
+import gzip
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Requests in flight, as a multiple of the capacity, beyond which requests get a 429
+OVERLOAD = 2
+
+
+class FakeTODHandler(BaseHTTPRequestHandler):
+    """
+    Request handler for the builds endpoint.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Keep-alive clients would otherwise wait on delayed ACKs between small writes
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.count("connections")
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        self.server.count("requests")
+        self.server.count("bytes_received", length)
+
+        in_flight = self.server.enter()
+        try:
+            outcome, delay = self.server.next_outcome(in_flight)
+            if delay:
+                time.sleep(delay)
+        finally:
+            self.server.leave()
+
+        if outcome == "throttle":
+            self.server.count("throttled")
+            self._send(429, b"{}", {"Retry-After": str(self.server.retry_after)})
+            return
+        if outcome == "error":
+            self.server.count("errors")
+            self._send(503, b"{}")
+            return
+
+        if self.headers.get("Content-Encoding") == "gzip":
+            if not self.server.accept_gzip:
+                self._send(415, b'{"error": "unsupported content encoding"}')
+                return
+            body = gzip.decompress(body)
+
+        try:
+            build = json.loads(body)
+        except ValueError:
+            self._send(400, b'{"error": "invalid JSON"}')
+            return
+
+        if self.server.rejects(build):
+            self.server.count("rejected")
+            self._send(422, b'{"error": "invalid report"}')
+            return
+
+        self.server.accept(build)
+        self._send(201, b'{"status": "created"}')
+
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+
+class FakeTODServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server recording accepted builds.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address=("127.0.0.1", 0),
+        latency=0.0,
+        error_rate=0.0,
+        throttle_rate=0.0,
+        retry_after=0,
+        seed=0,
+        accept_gzip=True,
+        capacity=None,
+        reject_marker=None,
+    ):
+        """
+        Initialize FakeTODServer with latency in seconds, error and 429 rates (0-1)
+        and the number of requests it handles at a time (None for no limit).
+        """
+        super().__init__(address, FakeTODHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.accept_gzip = accept_gzip
+        self.capacity = capacity
+        self.reject_marker = reject_marker
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.random = random.Random(seed)
+        self.builds = []
+        self.counters = {}
+        self.reset_counters()
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/builds/"
+
+    def reset_counters(self):
+        self.counters = {
+            "connections": 0,
+            "requests": 0,
+            "errors": 0,
+            "throttled": 0,
+            "accepted": 0,
+            "rejected": 0,
+            "bytes_received": 0,
+        }
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def enter(self):
+        """
+        Count a request in flight and return the number of requests in flight.
+        """
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            return self.in_flight
+
+    def leave(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def next_outcome(self, in_flight=1):
+        """
+        Draw the outcome ("ok", "error" or "throttle") and latency of a request
+        arriving with in_flight requests in flight (itself included).
+        """
+        with self.lock:
+            draw = self.random.random()
+            delay = self.random.uniform(0.5, 1.5) * self.latency
+        if self.capacity:
+            if in_flight > OVERLOAD * self.capacity:
+                return "throttle", 0.0
+            delay *= max(1.0, in_flight / self.capacity)
+        if draw < self.throttle_rate:
+            return "throttle", delay
+        if draw < self.throttle_rate + self.error_rate:
+            return "error", delay
+        return "ok", delay
+
+    def rejects(self, build):
+        """
+        Whether a build has a report containing the reject_marker.
+        """
+        if self.reject_marker is None:
+            return False
+        for encoded in build.get("xunitResults", []):
+            report = base64.b64decode(encoded)
+            if report.startswith(b"\x1f\x8b"):
+                report = gzip.decompress(report)
+            if self.reject_marker in report:
+                return True
+        return False
+
+    def accept(self, build):
+        with self.lock:
+            self.builds.append(build)
+            self.counters["accepted"] += 1
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,297 @@
+"""
+Seeded generator of synthetic JUnit XML reports shaped like the ones DX projects
+produce:
+- ansible: ansible-test junit output, one <testsuite> per shard with
+  "[testhost] testhost: ..." testcase names and failure messages
+- terraform: go-junit-report output, one <testsuite> per Go package with the
+  totals declared on <testsuites>
+- sdk: pytest output, a single "pytest" <testsuite> with skipped testcases
+
+Reports are written testcase by testcase, so any size from kilobytes to
+gigabytes can be generated with constant memory. The same seed and options
+always produce byte-identical files.
+
+Usage:
+    python junit_corpus.py --shape terraform --shards 8 --testcases 1000 \
+        --failure-ratio 0.05 --system-out-kb 2 --output-dir corpus
+"""
+
+import argparse
+import os
+import random
+from xml.sax.saxutils import escape, quoteattr
+
+SHAPES = ("ansible", "terraform", "sdk")
+
+# File names the report scripts recognize the product from
+FILE_NAMES = {
+    "ansible": "{index:04d}_ansible_linode_test_report.xml",
+    "terraform": "{index:04d}_terraform_test_report.xml",
+    "sdk": "{index:04d}_sdk_test_report.xml",
+}
+
+GO_PACKAGES = [
+    "instance",
+    "lke",
+    "nodebalancer",
+    "firewall",
+    "domain",
+    "volume",
+    "objbucket",
+    "vpc",
+]
+
+WORDS = (
+    "linode instance created waiting for status running volume attached "
+    "firewall rules applied request id response status 200 config booted "
+    "label region us-east type g6-standard-1 image linode/debian12 retry "
+    "<ok> & done"
+).split()
+
+
+class CorpusOptions:
+    """
+    Size and content knobs of a generated corpus.
+    """
+
+    def __init__(
+        self,
+        shape="terraform",
+        shards=4,
+        testcases=500,
+        failure_ratio=0.05,
+        skip_ratio=0.05,
+        system_out_kb=1.0,
+        suites=4,
+        seed=0,
+        metadata=True,
+    ):
+        """
+        Initialize CorpusOptions.
+
+        testcases is per shard, system_out_kb the average size of the output of a
+        testcase and suites the number of <testsuite> elements per terraform shard.
+        With metadata the GHA fields added by add_gha_info_to_xml.py are appended.
+        """
+        if shape not in SHAPES:
+            raise ValueError(
+                f"Unknown shape '{shape}', expected one of: {', '.join(SHAPES)}"
+            )
+        self.shape = shape
+        self.shards = shards
+        self.testcases = testcases
+        self.failure_ratio = failure_ratio
+        self.skip_ratio = skip_ratio
+        self.system_out_kb = system_out_kb
+        self.suites = suites
+        self.seed = seed
+        self.metadata = metadata
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+class _ReportGenerator:
+    def __init__(self, options, index):
+        self.options = options
+        self.index = index
+        seed = f"{options.seed}:{options.shape}:{index}"
+        # Outcomes have their own stream so they can be drawn before any content
+        self.outcome_random = random.Random(f"{seed}:outcomes")
+        self.random = random.Random(seed)
+        self.lines = [
+            " ".join(self.random.choice(WORDS) for _ in range(12)) for _ in range(64)
+        ]
+
+    def system_out(self):
+        target = int(self.options.system_out_kb * 1024 * self.random.uniform(0.5, 1.5))
+        lines = []
+        size = 0
+        while size < target:
+            line = self.random.choice(self.lines)
+            lines.append(line)
+            size += len(line) + 1
+        return escape("\n".join(lines))
+
+    def outcomes(self, count):
+        """
+        Outcomes of count testcases and their totals, drawn up front so the totals
+        can be written before the testcases.
+        """
+        failure_ratio = self.options.failure_ratio
+        skip_ratio = self.options.skip_ratio
+        outcomes = bytearray(count)
+        totals = {"tests": count, "failures": 0, "errors": 0, "skipped": 0}
+        for number in range(count):
+            draw = self.outcome_random.random()
+            if draw < failure_ratio:
+                outcomes[number] = 1
+                totals["failures"] += 1
+            elif draw < failure_ratio + skip_ratio:
+                outcomes[number] = 2
+                totals["skipped"] += 1
+        return outcomes, totals
+
+    def write_testcases(self, f, outcomes, make_name, classname, message):
+        for number, outcome in enumerate(outcomes):
+            f.write(
+                f"<testcase name={quoteattr(make_name(number))} "
+                f"classname={quoteattr(classname)} "
+                f'time="{self.random.uniform(0.01, 30):.3f}">'
+            )
+            if outcome == 1:
+                f.write(
+                    f'<failure message={quoteattr(message)} type="failure">'
+                    f"{escape(self.random.choice(self.lines))}</failure>"
+                )
+            elif outcome == 2:
+                f.write('<skipped message="skipped by marker" type="pytest.skip"/>')
+            if self.options.system_out_kb:
+                f.write(f"<system-out>{self.system_out()}</system-out>")
+            f.write("</testcase>")
+
+    def metadata(self):
+        if not self.options.metadata:
+            return ""
+        return (
+            "<branch_name>main</branch_name>"
+            f"<gha_run_id>{1000 + self.options.seed}</gha_run_id>"
+            f"<gha_run_number>{self.options.seed}</gha_run_number>"
+            "<release_tag>1.0.0</release_tag>"
+        )
+
+    def write(self, f):
+        getattr(self, f"write_{self.options.shape}")(f)
+
+    def write_ansible(self, f):
+        target = f"instance_{self.index}"
+        outcomes, totals = self.outcomes(self.options.testcases)
+        attrib = _attrib(totals)
+        f.write(
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            f'<testsuites disabled="0" {attrib} time="0.0">'
+            f'<testsuite disabled="0" {attrib} hostname="testhost" id="0" '
+            f'name="{target}" package="{target}" time="0.0">'
+        )
+        self.write_testcases(
+            f,
+            outcomes,
+            lambda number: f"[testhost] testhost: Assert that {target}_{number} = created",
+            target,
+            "Assertion failed",
+        )
+        f.write(f"</testsuite>{self.metadata()}</testsuites>")
+
+    def write_terraform(self, f):
+        suites = max(1, self.options.suites)
+        per_suite = [self.options.testcases // suites] * suites
+        per_suite[0] += self.options.testcases - sum(per_suite)
+
+        # go-junit-report declares the totals of all suites on the root
+        suite_outcomes = [self.outcomes(count) for count in per_suite]
+        root_totals = {"tests": 0, "failures": 0, "errors": 0, "skipped": 0}
+        for _, totals in suite_outcomes:
+            for name, value in totals.items():
+                root_totals[name] += value
+
+        f.write(f"<testsuites {_attrib(root_totals)}>")
+        for number, (outcomes, totals) in enumerate(suite_outcomes):
+            package = GO_PACKAGES[(self.index + number) % len(GO_PACKAGES)]
+            classname = (
+                f"github.com/linode/terraform-provider-linode/v2/linode/{package}"
+            )
+            f.write(
+                f'<testsuite name="{classname}" {_attrib(totals)} time="0.0" '
+                'timestamp="2024-01-01T00:00:00Z">'
+                '<properties><property name="go.version" value="go1.22.0"/></properties>'
+            )
+            self.write_testcases(
+                f,
+                outcomes,
+                lambda case, package=package: f"TestAccResource_{package}_{self.index}_{case}",
+                classname,
+                "Failed",
+            )
+            f.write("</testsuite>")
+        f.write(f"{self.metadata()}</testsuites>")
+
+    def write_sdk(self, f):
+        module = f"test.integration.models.test_module_{self.index}"
+        outcomes, totals = self.outcomes(self.options.testcases)
+        f.write(
+            '<?xml version="1.0" encoding="utf-8"?>'
+            f'<testsuites><testsuite name="pytest" {_attrib(totals)} time="0.0" '
+            'timestamp="2024-01-01T00:00:00" hostname="runner">'
+        )
+        self.write_testcases(
+            f,
+            outcomes,
+            lambda number: f"test_case_{number}",
+            module,
+            "AssertionError: assert 404 == 200",
+        )
+        f.write(f"</testsuite>{self.metadata()}</testsuites>")
+
+
+def _attrib(totals):
+    return " ".join(f'{name}="{value}"' for name, value in totals.items())
+
+
+def write_report(path, options, index=0):
+    """
+    Write one report of the corpus; the content depends only on options and index.
+    """
+    with open(path, "w", encoding="utf-8", buffering=1024 * 1024) as f:
+        _ReportGenerator(options, index).write(f)
+    return path
+
+
+def write_corpus(output_dir, options):
+    """
+    Write options.shards reports into output_dir and return their paths.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    return [
+        write_report(
+            os.path.join(output_dir, FILE_NAMES[options.shape].format(index=index)),
+            options,
+            index,
+        )
+        for index in range(options.shards)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--shape", choices=SHAPES, default="terraform")
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--testcases", type=int, default=500, help="Per shard")
+    parser.add_argument("--failure-ratio", type=float, default=0.05)
+    parser.add_argument("--skip-ratio", type=float, default=0.05)
+    parser.add_argument("--system-out-kb", type=float, default=1.0)
+    parser.add_argument("--suites", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-metadata", action="store_true")
+    parser.add_argument("--output-dir", required=True)
+    args = parser.parse_args()
+
+    options = CorpusOptions(
+        shape=args.shape,
+        shards=args.shards,
+        testcases=args.testcases,
+        failure_ratio=args.failure_ratio,
+        skip_ratio=args.skip_ratio,
+        system_out_kb=args.system_out_kb,
+        suites=args.suites,
+        seed=args.seed,
+        metadata=not args.no_metadata,
+    )
+    paths = write_corpus(args.output_dir, options)
+    size = sum(os.path.getsize(path) for path in paths)
+    print(
+        f"Wrote {len(paths)} reports ({size / 1024 / 1024:.1f} MB) to {args.output_dir}"
+    )
+
+
+if __name__ == "__main__":
+    main()
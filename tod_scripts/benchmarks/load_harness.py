@@ -0,0 +1,300 @@
+"""
+End-to-end load harness for the TOD uploader.
+
+Starts local stand-ins for every service the uploader talks to:
+- an S3-compatible store seeded with synthetic reports (junit_corpus.py)
+- a TOD builds endpoint with configurable latency, error rate, 429 responses and
+  capacity (requests it handles at a time before it slows down and throttles)
+- the GitHub releases API, used for the reports without a release_tag
+
+and drives download_and_upload_xml_files against them. Throughput in files per
+second, latency percentiles of every pipeline stage, connection and request
+counts per service and the reports left in the bucket are reported, so changes
+to the uploader can be measured offline and reproducibly: the corpus and the
+outcomes drawn by the fake TOD server only depend on --seed.
+
+With --max-concurrency the uploads use the adaptive concurrency limit, and the
+limit it ended at and the most requests TOD saw at a time are reported.
+
+Usage:
+    python load_harness.py --files 200 --workers 8 --latency 0.05 \
+        --error-rate 0.02 --throttle-rate 0.05 [--json results.json]
+    python load_harness.py --files 400 --tod-capacity 6 --max-concurrency 32
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "xml_to_tod"))
+
+LAUNCH_DIR = os.getcwd()
+
+# Release versions are cached below the working directory, start from an empty cache
+os.chdir(tempfile.mkdtemp(prefix="load_harness_"))
+
+# pylint: disable=wrong-import-position
+from fake_github import FakeGitHubServer
+from fake_s3 import FakeS3Server
+from fake_tod import FakeTODServer
+from junit_corpus import FILE_NAMES, SHAPES, CorpusOptions, write_report
+from modules.run_metrics import get_run_metrics
+from tod_common.http_session import configure_http_client
+from tod_report_uploader import download_and_upload_xml_files
+
+BUCKET = "dx-test-results"
+PERCENTILES = (50, 90, 99)
+
+
+class StageTimings:
+    """
+    Pipeline observer collecting the duration of every stage call.
+    """
+
+    def __init__(self):
+        self.durations = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, stage, item, seconds, error):
+        with self.lock:
+            self.durations.setdefault(stage.name, []).append(seconds)
+            if error is not None:
+                self.errors[stage.name] = self.errors.get(stage.name, 0) + 1
+
+    def summary(self):
+        """
+        Calls, errors and latency percentiles in milliseconds per stage.
+        """
+        summary = {}
+        for name, durations in self.durations.items():
+            durations = sorted(durations)
+            row = {"calls": len(durations), "errors": self.errors.get(name, 0)}
+            for percentile in PERCENTILES:
+                row[f"p{percentile}_ms"] = round(
+                    percentile_of(durations, percentile) * 1000, 2
+                )
+            row["max_ms"] = round(durations[-1] * 1000, 2)
+            summary[name] = row
+        return summary
+
+
+def percentile_of(sorted_values, percentile):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    rank = max(1, -(-percentile * len(sorted_values) // 100))
+    return sorted_values[rank - 1]
+
+
+def seed_bucket(server, options, files, metadata_ratio):
+    """
+    Store `files` reports spread over the corpus shapes and return their total size.
+
+    metadata_ratio of the reports, spread evenly, carry the GHA metadata and the
+    others need a release lookup.
+    """
+    size = 0
+    with tempfile.TemporaryDirectory(prefix="load_harness_corpus_") as corpus_dir:
+        for index in range(files):
+            shape = SHAPES[index % len(SHAPES)]
+            metadata = int((index + 1) * metadata_ratio) > int(index * metadata_ratio)
+            report_options = CorpusOptions(
+                **dict(options.as_dict(), shape=shape, metadata=metadata)
+            )
+            file_name = FILE_NAMES[shape].format(index=index)
+            path = write_report(
+                os.path.join(corpus_dir, file_name), report_options, index
+            )
+            with open(path, "rb") as f:
+                body = f.read()
+            server.put_object(BUCKET, file_name, body)
+            size += len(body)
+    return size
+
+
+def run(args):
+    """
+    Seed the fakes, run the uploader once and return the measurements.
+    """
+    s3_server = FakeS3Server().start()
+    tod_server = FakeTODServer(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+        capacity=args.tod_capacity,
+    ).start()
+    github_server = FakeGitHubServer().start()
+
+    os.environ["OBJ_ENDPOINT_URL"] = s3_server.endpoint_url
+    os.environ["GITHUB_API_URL"] = github_server.base_url
+    os.environ.setdefault("LINODE_CLI_OBJ_ACCESS_KEY", "fake")
+    os.environ.setdefault("LINODE_CLI_OBJ_SECRET_KEY", "fake")
+
+    options = CorpusOptions(
+        testcases=args.testcases,
+        failure_ratio=args.failure_ratio,
+        system_out_kb=args.system_out_kb,
+        suites=2,
+        seed=args.seed,
+    )
+    try:
+        size = seed_bucket(s3_server, options, args.files, args.metadata_ratio)
+        s3_server.requests.clear()
+        s3_connections = s3_server.connections
+
+        client = configure_http_client(
+            retries=args.retries,
+            backoff=args.backoff,
+            max_per_host=max(args.workers, args.max_concurrency or 0),
+        )
+        timings = StageTimings()
+
+        # The uploader reports every file on stdout
+        output = io.StringIO()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(output):
+            done = download_and_upload_xml_files(
+                "us-east-1",
+                BUCKET,
+                tod_server.url,
+                workers=args.workers,
+                compression=args.compression,
+                batch_size=args.batch_size,
+                max_concurrency=args.max_concurrency,
+                observer=timings,
+            )
+        seconds = time.perf_counter() - start
+
+        return {
+            "files": args.files,
+            "input_mb": round(size / 1024 / 1024, 2),
+            "seconds": round(seconds, 3),
+            "files_per_second": round(args.files / seconds, 2),
+            "completed": len(done),
+            "left_in_bucket": len(s3_server.list_keys(BUCKET)),
+            "stages": timings.summary(),
+            "http_client": dict(client.stats),
+            "s3": {
+                "connections": s3_server.connections - s3_connections,
+                "requests": dict(s3_server.requests),
+            },
+            "tod": dict(tod_server.counters, max_in_flight=tod_server.max_in_flight),
+            "concurrency_limit": get_run_metrics().gauges.get(
+                "upload_concurrency_limit"
+            ),
+            "github": dict(github_server.counters),
+        }
+    finally:
+        s3_server.stop()
+        tod_server.stop()
+        github_server.stop()
+
+
+def print_results(results):
+    print(
+        f"{results['files']} reports ({results['input_mb']} MB) in {results['seconds']:.2f}s: "
+        f"{results['files_per_second']:.1f} files/s, {results['completed']} completed, "
+        f"{results['left_in_bucket']} left in the bucket"
+    )
+    print()
+    print(
+        f"{'stage':<14} {'calls':>6} {'errors':>7} "
+        + " ".join(f"{f'p{p} ms':>9}" for p in PERCENTILES)
+        + f" {'max ms':>9}"
+    )
+    for name, row in results["stages"].items():
+        print(
+            f"{name:<14} {row['calls']:>6} {row['errors']:>7} "
+            + " ".join(f"{row[f'p{p}_ms']:>9.1f}" for p in PERCENTILES)
+            + f" {row['max_ms']:>9.1f}"
+        )
+    print()
+    print(f"{'service':<8} {'conns':>6} {'requests':>9}  details")
+    s3 = results["s3"]
+    print(
+        f"{'s3':<8} {s3['connections']:>6} {sum(s3['requests'].values()):>9}  "
+        + ", ".join(f"{name} {count}" for name, count in sorted(s3["requests"].items()))
+    )
+    tod = results["tod"]
+    print(
+        f"{'tod':<8} {tod['connections']:>6} {tod['requests']:>9}  "
+        f"{tod['accepted']} accepted, {tod['throttled']} throttled, "
+        f"{tod['errors']} errors, {tod['bytes_received'] / 1024 / 1024:.1f} MB received, "
+        f"at most {tod['max_in_flight']} in flight"
+    )
+    github = results["github"]
+    print(
+        f"{'github':<8} {github['connections']:>6} {github['requests']:>9}  "
+        f"{github['not_modified']} not modified"
+    )
+    print()
+    print(
+        f"HTTP client: {results['http_client']['requests']} requests, "
+        f"{results['http_client']['retries']} retries"
+    )
+    if results["concurrency_limit"] is not None:
+        print(
+            f"Adaptive upload concurrency limit at the end: {results['concurrency_limit']}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--testcases", type=int, default=200, help="Per report")
+    parser.add_argument("--system-out-kb", type=float, default=0.5)
+    parser.add_argument("--failure-ratio", type=float, default=0.05)
+    parser.add_argument(
+        "--metadata-ratio",
+        type=float,
+        default=0.5,
+        help="Share of the reports carrying a release_tag, the rest is looked up",
+    )
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument(
+        "--compression", choices=("none", "xml", "body", "both"), default="none"
+    )
+    parser.add_argument("--latency", type=float, default=0.02, help="TOD, seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=0)
+    parser.add_argument(
+        "--tod-capacity",
+        type=int,
+        help="Requests TOD handles at a time before it slows down and throttles",
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        help="Adapt the concurrent uploads up to this many instead of --workers",
+    )
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--backoff", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = run(args)
+    print_results(results)
+
+    if args.json:
+        with open(os.path.join(LAUNCH_DIR, args.json), "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
-import xml.etree.ElementTree as ET
 import sys
 import os
+from array import array
+
+from tod_common.junit_records import ERROR, FAILURE, TestcaseRecord, status_totals
+from tod_common.junit_stream import JUnitReader, SuiteTotals
 
 
 def parse_junit_xml(xml_file):
@@ -9,43 +12,34 @@ def parse_junit_xml(xml_file):
         print(f"Error: File '{xml_file}' not found.")
         sys.exit(1)
 
-    tree = ET.parse(xml_file)
-    root = tree.getroot()
-
-    # Extract statistics from <testsuite> attributes
-    testsuite = root.find(".//testsuite")
-    total_tests = int(testsuite.get("tests", 0))
-    total_failures = int(testsuite.get("failures", 0))
-    total_errors = int(testsuite.get("errors", 0))
-    total_skipped = int(testsuite.get("skipped", 0))
-
-    passed_tests = total_tests - (total_failures + total_errors + total_skipped)
+    reader = JUnitReader(xml_file)
 
     failures = []
     errors = []
+    # Only the failing testcases are kept, the others are counted by status
+    statuses = array("b")
+
+    for _, testcase in reader.testcases():
+        record = TestcaseRecord.from_element(testcase)
+        statuses.append(record.status)
+        if record.status == FAILURE:
+            failures.append(f"• `{record.name or 'Unknown Test'}`")
+        elif record.status == ERROR:
+            errors.append(f"• `{record.name or 'Unknown Test'}`")
+
+    # Extract statistics from <testsuite> attributes, or count them if there is none
+    testsuite = reader.first_suite()
+    totals = (
+        SuiteTotals.from_attrib(testsuite.attrib)
+        if testsuite is not None
+        else status_totals(statuses)
+    )
+    total_tests = totals.tests
+    total_failures = totals.failures
+    total_errors = totals.errors
+    total_skipped = totals.skipped
 
-    for testcase in root.findall(".//testcase"):
-        name = testcase.get("name", "Unknown Test")
-
-        failure = testcase.find("failure")
-        error = testcase.find("error")
-        # system_out = testcase.find("system-out")  # Fallback log output
-
-        # Extract failure details
-        if failure is not None:
-            failures.append(f"• `{name}`")
-
-        # Extract error details (fallback to system-out if error is missing)
-        # error_text = None
-        # if error is not None:
-        #     error_text = error.text.strip()
-        # elif system_out is not None and system_out.text:
-        #     error_text = system_out.text.strip()
-        #
-        # if error_text:
-        #     errors.append(f"• `{name}`")
-        if error is not None:
-            errors.append(f"• `{name}`")
+    passed_tests = total_tests - (total_failures + total_errors + total_skipped)
 
     # Summary
     summary = f"""
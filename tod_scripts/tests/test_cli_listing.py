@@ -0,0 +1,57 @@
+"""
+Parsing of the `linode-cli obj la` listing by the CLI object storage backend.
+"""
+
+import os
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "xml_to_tod"))
+
+# pylint: disable=wrong-import-position
+from modules import obj_storage
+from modules.obj_storage import LinodeCliObjectStorage
+
+# `obj la` lists every object of every bucket in the cluster, keys under a
+# prefix included, with the bucket name in front of each key
+LISTING = [
+    "2024-05-01 10:00  120  dx-test-results/00001_linodego_test_report.xml",
+    "2024-05-01 10:01  120  dx-test-results/nightly/00002_linodego_test_report.xml",
+    "2024-05-01 10:02  120  dx-test-results/notes.txt",
+    "",
+    "2024-05-01 10:03  120  dx-test-results-old/00003_linodego_test_report.xml",
+    "2024-05-01 10:04  120  other-bucket/dx-test-results/00004_report.xml",
+    "2024-05-01 10:05  120  dx-test-results/nightly/00005 retry report.xml",
+]
+
+
+def storage(monkeypatch, commands):
+    def stream_command_lines(command):
+        commands.append(command)
+        return iter(LISTING)
+
+    monkeypatch.setattr(obj_storage, "stream_command_lines", stream_command_lines)
+    return LinodeCliObjectStorage("us-east-1", cli_path="linode-cli")
+
+
+def test_only_objects_of_the_bucket_are_listed(monkeypatch):
+    commands = []
+    keys = list(storage(monkeypatch, commands).list_objects("dx-test-results"))
+
+    assert keys == [
+        "00001_linodego_test_report.xml",
+        "nightly/00002_linodego_test_report.xml",
+        "nightly/00005 retry report.xml",
+    ]
+    assert commands == [["linode-cli", "obj", "la", "--cluster", "us-east-1"]]
+
+
+def test_prefix_and_modification_time(monkeypatch):
+    entries = list(
+        storage(monkeypatch, []).list_modified("dx-test-results", prefix="nightly/")
+    )
+
+    assert entries == [
+        ("nightly/00002_linodego_test_report.xml", None, 1714557660.0),
+        ("nightly/00005 retry report.xml", None, 1714557900.0),
+    ]
@@ -0,0 +1,48 @@
+"""
+Release of delete batches by count and by the age of their first report.
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "xml_to_tod"))
+
+# pylint: disable=wrong-import-position
+from modules import batching
+from modules.batching import DeleteBatcher
+
+
+def job(name):
+    return SimpleNamespace(file_name=name, content=b"")
+
+
+def test_full_batch_is_released():
+    batcher = DeleteBatcher(3, max_age=60)
+
+    assert batcher.add(job("a")) is None
+    assert batcher.add(job("b")) is None
+    batch = batcher.add(job("c"))
+
+    assert [item.file_name for item in batch.jobs] == ["a", "b", "c"]
+    assert batcher.flush() is None
+
+
+def test_old_batch_is_released_before_it_is_full(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(batching.time, "monotonic", lambda: now[0])
+    batcher = DeleteBatcher(1000, max_age=5)
+
+    assert batcher.add(job("a")) is None
+    now[0] += 4
+    assert batcher.add(job("b")) is None
+    now[0] += 1
+    batch = batcher.add(job("c"))
+
+    assert [item.file_name for item in batch.jobs] == ["a", "b", "c"]
+
+    # The age of the next batch counts from its own first report
+    assert batcher.add(job("d")) is None
+    now[0] += 4
+    assert batcher.add(job("e")) is None
@@ -0,0 +1,73 @@
+"""
+Batched TOD submissions that TOD rejects, against local stand-in S3 and TOD servers.
+"""
+
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "benchmarks"))
+sys.path.insert(0, os.path.join(TESTS_DIR, ".."))
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "xml_to_tod"))
+
+# pylint: disable=wrong-import-position
+from fake_s3 import FakeS3Server
+from fake_tod import FakeTODServer
+from tod_common.http_session import configure_http_client
+from tod_report_uploader import download_and_upload_xml_files
+
+BUCKET = "dx-test-results"
+BAD_REPORT = "00002_linodego_test_report.xml"
+
+
+def report(index, name):
+    return (
+        '<testsuites tests="1" failures="0" errors="0" skipped="0">'
+        f'<testsuite name="shard_{index}" tests="1" failures="0" errors="0" skipped="0">'
+        f'<testcase name="{name}" classname="linodego" time="0.5"/></testsuite>'
+        "<branch_name>main</branch_name><gha_run_id>1234</gha_run_id>"
+        "<gha_run_number>56</gha_run_number><release_tag>1.2.3</release_tag>"
+        "</testsuites>"
+    ).encode("utf-8")
+
+
+@pytest.fixture
+def servers(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    s3_server = FakeS3Server().start()
+    tod_server = FakeTODServer(reject_marker=b"TestInvalid").start()
+    monkeypatch.setenv("OBJ_ENDPOINT_URL", s3_server.endpoint_url)
+    monkeypatch.setenv("LINODE_CLI_OBJ_ACCESS_KEY", "fake")
+    monkeypatch.setenv("LINODE_CLI_OBJ_SECRET_KEY", "fake")
+    configure_http_client(retries=0)
+    yield s3_server, tod_server
+    s3_server.stop()
+    tod_server.stop()
+
+
+@pytest.mark.parametrize("compression", ["none", "xml", "body", "both"])
+def test_rejected_batch_is_uploaded_report_by_report(servers, compression):
+    s3_server, tod_server = servers
+    for index in range(5):
+        key = f"{index:05d}_linodego_test_report.xml"
+        name = "TestInvalid" if key == BAD_REPORT else f"TestCase_{index}"
+        s3_server.put_object(BUCKET, key, report(index, name))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        download_and_upload_xml_files(
+            "us-east-1",
+            BUCKET,
+            tod_server.url,
+            workers=1,
+            compression=compression,
+            batch_size=5,
+            journal_path=None,
+        )
+
+    assert tod_server.counters["accepted"] == 4
+    assert all(len(build["xunitResults"]) == 1 for build in tod_server.builds)
+    assert s3_server.list_keys(BUCKET) == [BAD_REPORT]
@@ -0,0 +1,6 @@
+"""
+Code shared by the report scripts in tod_scripts.
+
+Scripts outside of tod_scripts/ add the tod_scripts directory to sys.path
+before importing from this package.
+"""
@@ -0,0 +1,163 @@
+"""
+Adaptive limit on the number of requests in flight to one service.
+
+A fixed number of parallel uploads either leaves throughput unused or overloads
+TOD during large drains. AdaptiveLimiter adjusts the number of requests allowed
+in flight from the outcome of every request (additive increase, multiplicative
+decrease):
+- while responses come back about as fast as they did when they were fastest,
+  the limit grows by one for every `limit` responses (about once per round
+  trip), as long as all allowed requests were actually in use
+- when the smoothed response time rises above `tolerance` times that baseline
+  the server is queueing requests, and the limit shrinks by latency_decrease
+- 429 and 5xx responses and requests without a response shrink it by
+  backoff_ratio, and a Retry-After header holds back all new requests until the
+  requested time has passed
+
+The baseline is the lowest smoothed response time seen, so single fast
+responses do not set it, and it slowly follows slower response times so it
+recovers when the service got slower for good.
+
+The limit shrinks at most once per smoothed response time, so the responses to
+requests sent before a decrease do not shrink it again.
+"""
+
+import threading
+import time
+
+OVERLOAD_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+DEFAULT_MIN_LIMIT = 1
+DEFAULT_MAX_LIMIT = 16
+DEFAULT_TOLERANCE = 1.5
+DEFAULT_BACKOFF_RATIO = 0.5
+DEFAULT_LATENCY_DECREASE = 0.9
+
+# Weight of the newest response time in the smoothed response time
+SMOOTHING = 0.2
+# Share of the difference by which the baseline follows slower response times
+BASELINE_DRIFT = 0.001
+
+
+class AdaptiveLimiter:
+    """
+    Thread-safe limit on concurrent requests, adjusted from their outcomes.
+    """
+
+    def __init__(
+        self,
+        initial=DEFAULT_MIN_LIMIT,
+        minimum=DEFAULT_MIN_LIMIT,
+        maximum=DEFAULT_MAX_LIMIT,
+        tolerance=DEFAULT_TOLERANCE,
+        backoff_ratio=DEFAULT_BACKOFF_RATIO,
+        latency_decrease=DEFAULT_LATENCY_DECREASE,
+        on_change=None,
+    ):
+        """
+        Initialize AdaptiveLimiter allowing `initial` requests in flight, kept
+        between minimum and maximum.
+
+        on_change is called with the old limit, the new limit and the reason
+        ("increase", "latency", "throttled", "error" or a status code) whenever
+        the number of allowed requests changes.
+        """
+        self.minimum = max(1, int(minimum))
+        self.maximum = max(self.minimum, int(maximum))
+        self.tolerance = tolerance
+        self.backoff_ratio = backoff_ratio
+        self.latency_decrease = latency_decrease
+        self.on_change = on_change
+
+        self._limit = float(min(max(initial, self.minimum), self.maximum))
+        self.in_flight = 0
+        self.baseline = None
+        self.latency = None
+        self.paused_until = 0.0
+        self.stats = {"increases": 0, "decreases": 0, "throttled": 0, "errors": 0}
+        self._last_decrease = float("-inf")
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self):
+        """
+        Number of requests currently allowed in flight.
+        """
+        return int(self._limit)
+
+    def acquire(self):
+        """
+        Wait until a request may be sent.
+        """
+        with self._condition:
+            while True:
+                pause = self.paused_until - time.monotonic()
+                if pause <= 0 and self.in_flight < int(self._limit):
+                    break
+                self._condition.wait(pause if pause > 0 else None)
+            self.in_flight += 1
+
+    def release(self, seconds=None, status=None, retry_after=None):
+        """
+        Give back the slot of a request with its outcome: the seconds it took and
+        the status of its response, or no status if it got no response.
+        """
+        with self._condition:
+            saturated = self.in_flight >= int(self._limit)
+            self.in_flight -= 1
+            now = time.monotonic()
+
+            if status is None or status in OVERLOAD_STATUSES:
+                if status == 429:
+                    self.stats["throttled"] += 1
+                    reason = "throttled"
+                elif status is None:
+                    self.stats["errors"] += 1
+                    reason = "error"
+                else:
+                    reason = str(status)
+                if retry_after:
+                    self.paused_until = max(self.paused_until, now + retry_after)
+                change = self._decrease(now, self.backoff_ratio, reason)
+            else:
+                self._observe(seconds)
+                if self.latency > self.tolerance * self.baseline:
+                    change = self._decrease(now, self.latency_decrease, "latency")
+                elif saturated:
+                    change = self._increase()
+                else:
+                    change = None
+
+            self._condition.notify_all()
+
+        if change is not None and self.on_change is not None:
+            self.on_change(*change)
+
+    def _observe(self, seconds):
+        if self.latency is None:
+            self.latency = self.baseline = seconds
+            return
+        self.latency += SMOOTHING * (seconds - self.latency)
+        if self.latency < self.baseline:
+            self.baseline = self.latency
+        else:
+            self.baseline += BASELINE_DRIFT * (self.latency - self.baseline)
+
+    def _increase(self):
+        old = int(self._limit)
+        self._limit = min(self.maximum, self._limit + 1 / self._limit)
+        if int(self._limit) == old:
+            return None
+        self.stats["increases"] += 1
+        return old, int(self._limit), "increase"
+
+    def _decrease(self, now, ratio, reason):
+        if now - self._last_decrease < (self.latency or 0):
+            return None
+        self._last_decrease = now
+        old = int(self._limit)
+        self._limit = max(self.minimum, self._limit * ratio)
+        if int(self._limit) == old:
+            return None
+        self.stats["decreases"] += 1
+        return old, int(self._limit), reason
@@ -0,0 +1,248 @@
+"""
+Shared HTTP client with connection pooling, retries and per-host concurrency limits.
+
+All requests of a process go through one requests.Session, so connections to TOD
+and GitHub are kept alive and reused instead of opening a new TCP+TLS connection
+for every call.
+
+Failed requests are retried with jittered exponential backoff, but only for
+failure classes where the server did not process the request or where repeating
+it is harmless:
+- connection errors: for idempotent methods any of them, for other methods
+  (POST) only failures to connect, as a connection dropped after the request
+  was sent may still have been processed
+- 429 Too Many Requests and 503 Service Unavailable (the server turned the
+  request away), honouring a Retry-After header
+- timeouts and 500/502/504 responses, for idempotent methods only (GET, HEAD, ...)
+
+Requests can additionally be passed an AdaptiveLimiter (tod_common.adaptive_limit)
+that every attempt waits for and reports its outcome to.
+"""
+
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE"])
+RETRY_ALWAYS_STATUSES = frozenset([429, 503])
+RETRY_IDEMPOTENT_STATUSES = frozenset([500, 502, 504])
+
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_BACKOFF_MAX = 30
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TIMEOUT = 10
+
+
+class HttpClient:
+    """
+    Thread-safe wrapper around a pooled requests.Session adding retries and host limits.
+    """
+
+    def __init__(
+        self,
+        retries=DEFAULT_RETRIES,
+        backoff=DEFAULT_BACKOFF,
+        backoff_max=DEFAULT_BACKOFF_MAX,
+        pool_size=DEFAULT_POOL_SIZE,
+        max_per_host=None,
+        timeout=DEFAULT_TIMEOUT,
+    ):
+        """
+        Initialize HttpClient.
+
+        retries is the number of extra attempts after the first one, backoff the base
+        delay in seconds that doubles with every attempt (capped at backoff_max) and
+        max_per_host the number of requests allowed in flight per host (None for no
+        limit).
+        """
+        # pylint: disable=import-outside-toplevel
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.exceptions import NewConnectionError
+
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.stats = {"requests": 0, "retries": 0}
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._exceptions = requests.exceptions
+        self._new_connection_error = NewConnectionError
+        self._lock = threading.Lock()
+        self._host_limits = {}
+
+    def _host_limit(self, url):
+        if not self.max_per_host:
+            return None
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_limits[host]
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def reset_stats(self):
+        """
+        Start counting requests and retries from zero, e.g. for a new run.
+        """
+        with self._lock:
+            self.stats = {"requests": 0, "retries": 0}
+
+    def backoff_delay(self, attempt, retry_after=None):
+        """
+        Seconds to wait before retry number `attempt` (starting at 1).
+
+        Uses "full jitter": a random delay between 0 and the exponential backoff,
+        unless the server asked for a specific delay with Retry-After.
+        """
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(
+            0, min(self.backoff_max, self.backoff * 2 ** (attempt - 1))
+        )
+
+    def _connect_failed(self, error):
+        """
+        Whether a request failed before a connection was made, so it was never sent.
+        """
+        if isinstance(error, self._exceptions.ConnectTimeout):
+            return True
+        if not isinstance(error, self._exceptions.ConnectionError) or not error.args:
+            return False
+        # requests wraps urllib3's MaxRetryError, whose reason is the actual error
+        cause = error.args[0]
+        return isinstance(getattr(cause, "reason", cause), self._new_connection_error)
+
+    def _should_retry(self, method, response=None, error=None):
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        if error is not None:
+            if not idempotent:
+                return self._connect_failed(error)
+            return isinstance(
+                error, (self._exceptions.ConnectionError, self._exceptions.Timeout)
+            )
+        if response.status_code in RETRY_ALWAYS_STATUSES:
+            return True
+        return idempotent and response.status_code in RETRY_IDEMPOTENT_STATUSES
+
+    def _send(self, method, url, limit, limiter, kwargs):
+        if limiter is None:
+            if limit is None:
+                return self.session.request(method, url, **kwargs)
+            with limit:
+                return self.session.request(method, url, **kwargs)
+
+        limiter.acquire()
+        try:
+            if limit is not None:
+                limit.acquire()
+            # The limiter adapts to the time the server takes, not to the wait above
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            finally:
+                if limit is not None:
+                    limit.release()
+        except BaseException:
+            limiter.release()
+            raise
+        limiter.release(
+            time.perf_counter() - start,
+            response.status_code,
+            parse_retry_after(response),
+        )
+        return response
+
+    def request(self, method, url, limiter=None, **kwargs):
+        """
+        Send a request, retrying retryable failures. Returns the last response.
+
+        Exceptions of the last attempt are raised, HTTP error statuses are not.
+        With a limiter every attempt waits for a slot of it.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        limit = self._host_limit(url)
+
+        attempt = 0
+        while True:
+            self._count("requests")
+            response = None
+            try:
+                response = self._send(method, url, limit, limiter, kwargs)
+            except self._exceptions.RequestException as e:
+                if attempt >= self.retries or not self._should_retry(method, error=e):
+                    raise
+                delay = self.backoff_delay(attempt + 1)
+            else:
+                if attempt >= self.retries or not self._should_retry(
+                    method, response=response
+                ):
+                    return response
+                delay = self.backoff_delay(attempt + 1, parse_retry_after(response))
+                response.close()
+
+            attempt += 1
+            self._count("retries")
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+
+def parse_retry_after(response):
+    """
+    Delay in seconds requested by a Retry-After header, or None.
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        # HTTP-date form
+        # pylint: disable=import-outside-toplevel
+        from email.utils import parsedate_to_datetime
+
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """
+    Process wide HttpClient shared by all callers.
+    """
+    global _default_client  # pylint: disable=global-statement
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
+
+
+def configure_http_client(**kwargs):
+    """
+    Replace the process wide HttpClient with one built from the given options.
+    """
+    global _default_client  # pylint: disable=global-statement
+    with _default_client_lock:
+        _default_client = HttpClient(**kwargs)
+        return _default_client
@@ -0,0 +1,213 @@
+"""
+Merge engine for JUnit XML shards.
+
+Shards are parsed in a process pool, each worker streams one shard with
+JUnitReader and sends back its testcases serialized from TestcaseRecords. The
+results are written to the merged report in shard filename order as they
+arrive, so the output is deterministic and no process ever holds the whole
+merged tree.
+
+Usage:
+    python junit_merge.py --style terraform --input-dir . --output merged.xml
+"""
+
+import argparse
+import os
+import sys
+from collections import deque
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# pylint: disable=wrong-import-position
+from tod_common.junit_records import ERROR, FAILURE, PASSED, TestcaseRecord
+from tod_common.junit_stream import JUnitReader, JUnitWriter, SuiteTotals
+
+
+def clean_up_test_output(test_output):
+    # Find the index of '='
+    test_output = test_output.replace("[testhost] testhost: ", "")
+
+    index = test_output.find("=")
+
+    # If '=' is found
+    if index != -1:
+        # Extract the substring before '='
+        cleaned_output = test_output[:index].strip().replace("that", "")
+    else:
+        # If '=' is not found, return the original string
+        cleaned_output = test_output.strip()
+
+    return cleaned_output
+
+
+def merge_ansible_shard(filepath):
+    """
+    Serialized testcases and declared totals of the first <testsuite> of an ansible shard.
+
+    Only the cleaned up name and the failure or error message of a testcase are kept.
+    """
+    reader = JUnitReader(filepath)
+    testsuite = None
+    chunks = []
+
+    for suite, testcase in reader.testcases():
+        if testsuite is None and suite is not None and suite.depth == 1:
+            testsuite = suite
+        if suite is not testsuite:
+            continue
+
+        record = TestcaseRecord.from_element(testcase)
+        chunks.append(
+            TestcaseRecord(
+                clean_up_test_output(record.name),
+                # The merged report does not mark skipped testcases
+                status=record.status if record.status in (FAILURE, ERROR) else PASSED,
+                message=record.message,
+            ).to_xml()
+        )
+
+    totals = (
+        SuiteTotals.from_attrib(testsuite.attrib)
+        if testsuite is not None
+        else SuiteTotals()
+    )
+    return b"".join(chunks), len(chunks), totals
+
+
+def merge_terraform_shard(filepath):
+    """
+    Serialized testcases of a terraform shard and the totals declared on its root.
+    """
+    reader = JUnitReader(filepath)
+    chunks = [
+        TestcaseRecord.from_element(testcase, keep_xml=True).to_xml()
+        for _, testcase in reader.testcases()
+    ]
+    return b"".join(chunks), len(chunks), SuiteTotals.from_attrib(reader.root_attrib)
+
+
+def ansible_suite_attrib(totals):
+    return {
+        "failures": str(totals.failures),
+        "skipped": str(totals.skipped),
+        "errors": str(totals.errors),
+        "tests": str(totals.tests),
+        "name": "Ansible Merged XML",
+    }
+
+
+def terraform_suite_attrib(totals):
+    return totals.as_attrib()
+
+
+# Shard function, suite attributes and whether to write an XML declaration per style
+MERGE_STYLES = {
+    "ansible": (merge_ansible_shard, ansible_suite_attrib, False),
+    "terraform": (merge_terraform_shard, terraform_suite_attrib, True),
+}
+
+
+def list_shards(input_dir):
+    """
+    XML shards of a directory sorted by filename.
+    """
+    return [
+        os.path.join(input_dir, filename)
+        for filename in sorted(os.listdir(input_dir))
+        if filename.endswith(".xml")
+    ]
+
+
+def _merged_shards(shard_function, shards, workers):
+    if workers <= 1 or len(shards) <= 1:
+        for shard in shards:
+            yield shard_function(shard)
+        return
+
+    # pylint: disable=import-outside-toplevel
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Keep a bounded window of shards in flight and yield them in submission order
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        shards = iter(shards)
+        for shard in shards:
+            pending.append(executor.submit(shard_function, shard))
+            if len(pending) >= 2 * workers:
+                break
+
+        while pending:
+            result = pending.popleft().result()
+            for shard in shards:
+                pending.append(executor.submit(shard_function, shard))
+                break
+            yield result
+
+
+def spool_shards(writer, input_dir, style, workers=None):
+    """
+    Parse the XML shards of input_dir once and spool their testcases into writer.
+
+    Returns the aggregated SuiteTotals.
+    """
+    shard_function = MERGE_STYLES[style][0]
+    workers = workers or os.cpu_count() or 1
+    totals = SuiteTotals()
+
+    for chunk, count, shard_totals in _merged_shards(
+        shard_function, list_shards(input_dir), workers
+    ):
+        writer.write_raw(chunk, count)
+        totals.add(shard_totals)
+
+    return totals
+
+
+def iter_merged_document(writer, style, totals, trailer=None):
+    """
+    Yield the merged document of a writer filled by spool_shards as UTF-8 chunks.
+    """
+    _, suite_attrib, xml_declaration = MERGE_STYLES[style]
+    return writer.iter_document(
+        suite_attrib(totals), trailer=trailer, xml_declaration=xml_declaration
+    )
+
+
+def merge_junit_files(input_dir, output, style, workers=None):
+    """
+    Merge the XML shards of input_dir into a single suite written to output.
+
+    Returns the aggregated SuiteTotals.
+    """
+    _, suite_attrib, xml_declaration = MERGE_STYLES[style]
+
+    with JUnitWriter() as writer:
+        totals = spool_shards(writer, input_dir, style, workers)
+        writer.write_to(output, suite_attrib(totals), xml_declaration=xml_declaration)
+
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge JUnit XML shards")
+    parser.add_argument("--style", choices=sorted(MERGE_STYLES), required=True)
+    parser.add_argument("--input-dir", default=os.getcwd())
+    parser.add_argument("--output", required=True)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of shard parsing processes, defaults to the number of CPUs",
+    )
+    args = parser.parse_args()
+
+    totals = merge_junit_files(args.input_dir, args.output, args.style, args.workers)
+    print(
+        f"Merged {totals.tests} tests ({totals.failures} failures, {totals.errors} errors, "
+        f"{totals.skipped} skipped) into {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Compact testcase records shared by the report scripts.
+
+JUnitReader yields complete ElementTree testcases: an Element, an attribute dict
+and a text for every node. The scripts only look at a few parts of a testcase,
+so they turn it into a TestcaseRecord as soon as it is read:
+- the name, classname and time attributes
+- the status, an index into STATUSES
+- the message of a failure or error, interned because the failing tests of a run
+  tend to share their messages
+- with keep_xml, the whole testcase serialized as it is, for scripts that write
+  it out unchanged
+
+TestcaseRecord.to_xml() serializes a record back to JUnit XML, the same XML
+ET.tostring produces for the testcase. TestcaseTable keeps the testcases of a
+report column-wise, with times and statuses in typed arrays, and counts its
+totals from the status array in one pass.
+"""
+
+import math
+import sys
+import xml.etree.ElementTree as ET
+from array import array
+
+from tod_common.junit_stream import JUnitReader, SuiteTotals, _escape_attrib
+
+STATUSES = ("passed", "failure", "error", "skipped")
+PASSED, FAILURE, ERROR, SKIPPED = range(len(STATUSES))
+
+_STATUS_BY_TAG = {"failure": FAILURE, "error": ERROR, "skipped": SKIPPED}
+
+
+def _intern(value):
+    return sys.intern(value) if value is not None else None
+
+
+def status_totals(statuses):
+    """
+    SuiteTotals of the testcases with the given array of statuses.
+    """
+    return SuiteTotals(
+        len(statuses),
+        statuses.count(FAILURE),
+        statuses.count(ERROR),
+        statuses.count(SKIPPED),
+    )
+
+
+def testcase_status(testcase):
+    """
+    Status of a <testcase> element and the message of its failure or error.
+
+    The first failure, error or skipped child decides the status. The message is
+    the message attribute of a failure or error, or its text if it has none.
+    """
+    for child in testcase:
+        status = _STATUS_BY_TAG.get(child.tag)
+        if status is not None:
+            if status == SKIPPED:
+                return status, None
+            return status, child.get("message") or child.text
+    return PASSED, None
+
+
+class TestcaseRecord:
+    """
+    The parts of a <testcase> the report scripts use.
+    """
+
+    __slots__ = ("name", "classname", "time", "status", "message", "xml")
+
+    def __init__(
+        self,
+        name,
+        classname=None,
+        time=None,
+        status=PASSED,
+        message=None,
+        xml=None,
+    ):
+        self.name = name
+        self.classname = classname
+        # The time attribute as written, see seconds
+        self.time = time
+        self.status = status
+        self.message = message
+        # The serialized testcase, kept with keep_xml
+        self.xml = xml
+
+    @classmethod
+    def from_element(cls, testcase, keep_xml=False):
+        """
+        Record of a <testcase> element, which can be cleared afterwards.
+
+        With keep_xml to_xml() returns the testcase with all its attributes and
+        children (but not the whitespace around them), otherwise it is written
+        with only its name, classname, time and status.
+        """
+        status, message = testcase_status(testcase)
+        attrib = testcase.attrib
+        record = cls(
+            _intern(attrib.get("name", "")),
+            _intern(attrib.get("classname")),
+            attrib.get("time"),
+            status,
+            _intern(message),
+        )
+        if keep_xml:
+            testcase.text = testcase.tail = None
+            record.xml = ET.tostring(testcase, encoding="utf-8")
+        return record
+
+    @property
+    def seconds(self):
+        """
+        The time as a float, 0 if it is missing and NaN if it is not a number.
+        """
+        try:
+            return float(self.time or 0)
+        except ValueError:
+            return math.nan
+
+    def _outcome_xml(self):
+        if self.status == PASSED:
+            return b""
+        tag = STATUSES[self.status]
+        if self.status == SKIPPED or self.message is None:
+            return f"<{tag} />".encode("utf-8")
+        return f'<{tag} message="{_escape_attrib(self.message)}" />'.encode("utf-8")
+
+    def to_xml(self):
+        """
+        The testcase as UTF-8 JUnit XML.
+        """
+        if self.xml is not None:
+            return self.xml
+
+        attrib = {"name": self.name}
+        if self.classname is not None:
+            attrib["classname"] = self.classname
+        if self.time is not None:
+            attrib["time"] = self.time
+
+        head = "<testcase" + "".join(
+            f' {key}="{_escape_attrib(value)}"' for key, value in attrib.items()
+        )
+        outcome = self._outcome_xml()
+        if not outcome:
+            return (head + " />").encode("utf-8")
+        return (head + ">").encode("utf-8") + outcome + b"</testcase>"
+
+
+class TestcaseTable:
+    """
+    Testcases kept column-wise.
+
+    Names, classnames, suites and messages are lists of shared strings, times
+    and statuses are typed arrays of 8 bytes and 1 byte per testcase.
+    """
+
+    __slots__ = ("names", "classnames", "suites", "times", "statuses", "messages")
+
+    def __init__(self):
+        self.names = []
+        self.classnames = []
+        self.suites = []
+        self.times = array("d")
+        self.statuses = array("b")
+        self.messages = []
+
+    def __len__(self):
+        return len(self.statuses)
+
+    def append(self, record, suite=None):
+        """
+        Add a TestcaseRecord, with the name of the suite it belongs to.
+        """
+        self.names.append(record.name)
+        self.classnames.append(record.classname or "")
+        self.suites.append(_intern(suite))
+        self.times.append(record.seconds)
+        self.statuses.append(record.status)
+        self.messages.append(record.message)
+
+    def rows(self):
+        """
+        Iterate over (classname, name, seconds, status, message) of every testcase.
+        """
+        return zip(
+            self.classnames, self.names, self.times, self.statuses, self.messages
+        )
+
+    def names_with_status(self, status):
+        """
+        Names of the testcases with the given status, in order.
+        """
+        return [
+            name
+            for name, name_status in zip(self.names, self.statuses)
+            if name_status == status
+        ]
+
+    def totals(self):
+        """
+        SuiteTotals of the testcases.
+        """
+        return status_totals(self.statuses)
+
+
+def read_testcases(source):
+    """
+    Read a report into a TestcaseTable.
+
+    Returns the JUnitReader, for the suites and metadata of the report, and the table.
+    """
+    reader = JUnitReader(source)
+    table = TestcaseTable()
+    for suite, testcase in reader.testcases():
+        table.append(
+            TestcaseRecord.from_element(testcase),
+            suite.attrib.get("name") if suite is not None else None,
+        )
+    return reader, table
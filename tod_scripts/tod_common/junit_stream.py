@@ -0,0 +1,287 @@
+"""
+Streaming reader and writer for JUnit XML reports.
+
+JUnitReader parses a report incrementally with ElementTree.iterparse and yields
+one <testcase> at a time. Every testcase is detached and cleared once it has been
+consumed, so memory stays bounded by the largest single testcase instead of the
+size of the report. junit_records turns the testcases into compact records.
+
+JUnitWriter is the counterpart for scripts producing a single merged suite:
+testcases are spooled as they are written and the enclosing <testsuites> and
+<testsuite> elements are emitted at the end, when the totals are known.
+"""
+
+import tempfile
+import xml.etree.ElementTree as ET
+
+# Reports smaller than this are spooled in memory, bigger ones in a temporary file
+SPOOL_MAX_SIZE = 16 * 1024 * 1024
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class SuiteTotals:
+    """
+    Test, failure, error and skipped counts of a suite.
+    """
+
+    __slots__ = ("tests", "failures", "errors", "skipped")
+
+    def __init__(self, tests=0, failures=0, errors=0, skipped=0):
+        self.tests = tests
+        self.failures = failures
+        self.errors = errors
+        self.skipped = skipped
+
+    @classmethod
+    def from_attrib(cls, attrib):
+        """
+        Read the totals declared in the attributes of a suite, missing ones count as 0.
+        """
+        return cls(
+            int(attrib.get("tests") or 0),
+            int(attrib.get("failures") or 0),
+            int(attrib.get("errors") or 0),
+            int(attrib.get("skipped") or 0),
+        )
+
+    def add(self, other):
+        """
+        Add the counts of another SuiteTotals to these.
+        """
+        self.tests += other.tests
+        self.failures += other.failures
+        self.errors += other.errors
+        self.skipped += other.skipped
+
+    def as_attrib(self):
+        """
+        Totals as a dict of XML attribute values.
+        """
+        return {
+            "tests": str(self.tests),
+            "failures": str(self.failures),
+            "errors": str(self.errors),
+            "skipped": str(self.skipped),
+        }
+
+
+class SuiteInfo:
+    """
+    Attributes and position of a <testsuite> element seen by JUnitReader.
+    """
+
+    __slots__ = ("attrib", "depth")
+
+    def __init__(self, attrib, depth):
+        self.attrib = attrib
+        # 0 for a <testsuite> root, 1 for a direct child of <testsuites>, ...
+        self.depth = depth
+
+
+class JUnitReader:
+    """
+    Incremental reader for a JUnit XML report.
+
+    After (or while) iterating over testcases() the reader exposes:
+    - root_tag and root_attrib of the document element
+    - suites, a SuiteInfo for every <testsuite> in document order
+    - metadata, the text of every other direct child of the root by tag
+      (e.g. branch_name, gha_run_id, ...), first occurrence wins
+    """
+
+    def __init__(self, source):
+        """
+        Initialize JUnitReader with a file path or a binary file object.
+        """
+        self.source = source
+        self.root_tag = None
+        self.root_attrib = {}
+        self.suites = []
+        self.metadata = {}
+
+    def testcases(self):
+        """
+        Yield (SuiteInfo, testcase element) pairs in document order.
+
+        The yielded element is complete, including its children, but it is cleared
+        as soon as the caller asks for the next one. Callers that need to keep a
+        testcase must copy what they need.
+        """
+        stack = []
+        suite_stack = []
+
+        for event, elem in ET.iterparse(self.source, events=("start", "end")):
+            if event == "start":
+                if not stack:
+                    self.root_tag = elem.tag
+                    self.root_attrib = dict(elem.attrib)
+                if elem.tag == "testsuite":
+                    suite = SuiteInfo(dict(elem.attrib), len(stack))
+                    self.suites.append(suite)
+                    suite_stack.append(suite)
+                stack.append(elem)
+                continue
+
+            stack.pop()
+            parent = stack[-1] if stack else None
+
+            if elem.tag == "testcase":
+                yield (suite_stack[-1] if suite_stack else None), elem
+            elif elem.tag == "testsuite":
+                suite_stack.pop()
+            elif len(stack) == 1:
+                self.metadata.setdefault(elem.tag, elem.text)
+            elif parent is None or parent.tag not in ("testsuite", "testsuites"):
+                # Children of a testcase are released together with the testcase
+                continue
+
+            # Release everything that has been consumed
+            elem.clear()
+            if parent is not None:
+                parent.remove(elem)
+
+    def read(self):
+        """
+        Consume the whole report without looking at individual testcases.
+        """
+        for _ in self.testcases():
+            pass
+        return self
+
+    def first_suite(self, min_depth=1):
+        """
+        The first suite at min_depth or deeper, or None if there is none.
+        """
+        for suite in self.suites:
+            if suite.depth >= min_depth:
+                return suite
+        return None
+
+
+# Escapes applied to attribute values on top of &, < and >
+_ATTRIB_ENTITIES = {'"': "&quot;", "\n": "&#10;", "\r": "&#13;", "\t": "&#9;"}
+
+
+def _escape_attrib(value):
+    # Same result as xml.sax.saxutils.quoteattr without importing it, saxutils
+    # pulls in urllib.request and with it most of the http stack
+    value = value.replace("&", "&amp;").replace(">", "&gt;").replace("<", "&lt;")
+    for char, entity in _ATTRIB_ENTITIES.items():
+        if char in value:
+            value = value.replace(char, entity)
+    return value
+
+
+def _start_tag(tag, attrib):
+    attributes = "".join(
+        f' {name}="{_escape_attrib(str(value))}"' for name, value in attrib.items()
+    )
+    return f"<{tag}{attributes}>"
+
+
+def document_head(suite_attrib, root_attrib=None, xml_declaration=True):
+    """
+    The XML declaration and start tags of a single suite <testsuites> document.
+    """
+    head = b""
+    if xml_declaration:
+        head += b"<?xml version='1.0' encoding='UTF-8'?>\n"
+    head += _start_tag("testsuites", root_attrib or {}).encode("utf-8")
+    head += _start_tag("testsuite", suite_attrib).encode("utf-8")
+    return head
+
+
+def document_tail(trailer=None):
+    """
+    The end tags of a document started by document_head, with the trailer
+    (tag, text) pairs as children of <testsuites> after the suite.
+    """
+    tail = [b"</testsuite>"]
+    for tag, text in trailer or []:
+        element = ET.Element(tag)
+        element.text = text
+        tail.append(ET.tostring(element, encoding="utf-8"))
+    tail.append(b"</testsuites>")
+    return b"".join(tail)
+
+
+class JUnitWriter:
+    """
+    Writer producing a <testsuites> document with a single merged <testsuite>.
+
+    Testcases are serialized into a spool as they are written, so they can be
+    dropped from memory immediately. write_to() emits the document once the suite
+    attributes (usually the totals) are known.
+    """
+
+    def __init__(self, spool_max_size=SPOOL_MAX_SIZE):
+        """
+        Initialize JUnitWriter with an empty spool.
+        """
+        self.spool = tempfile.SpooledTemporaryFile(max_size=spool_max_size)
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write_raw(self, data, count=1):
+        """
+        Append already serialized (UTF-8) testcases to the spool.
+        """
+        self.spool.write(data)
+        self.count += count
+
+    def write_to(
+        self,
+        output,
+        suite_attrib,
+        root_attrib=None,
+        trailer=None,
+        xml_declaration=True,
+    ):
+        """
+        Write the full document to a path or a binary file object.
+
+        trailer is a list of (tag, text) pairs appended after the suite as children
+        of <testsuites>, e.g. the GHA metadata elements.
+        """
+        if isinstance(output, str):
+            with open(output, "wb") as f:
+                self.write_to(f, suite_attrib, root_attrib, trailer, xml_declaration)
+            return
+
+        for chunk in self.iter_document(
+            suite_attrib, root_attrib, trailer, xml_declaration
+        ):
+            output.write(chunk)
+
+    def iter_document(
+        self,
+        suite_attrib,
+        root_attrib=None,
+        trailer=None,
+        xml_declaration=True,
+        chunk_size=COPY_CHUNK_SIZE,
+    ):
+        """
+        Yield the full document as UTF-8 chunks of at most chunk_size spooled bytes.
+
+        Lets a consumer such as a streaming upload read the document without it
+        ever being written out as a whole.
+        """
+        yield document_head(suite_attrib, root_attrib, xml_declaration)
+
+        self.spool.seek(0)
+        for chunk in iter(lambda: self.spool.read(chunk_size), b""):
+            yield chunk
+
+        yield document_tail(trailer)
+
+    def close(self):
+        """
+        Release the spool.
+        """
+        self.spool.close()
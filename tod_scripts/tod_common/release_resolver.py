@@ -0,0 +1,212 @@
+"""
+Resolver for the latest release tag of the Linode projects tested by DX.
+
+Lookups go through three layers so every project is fetched at most once per run
+and usually not at all across runs:
+- an in-process memo
+- a JSON cache file with a TTL, kept next to the reports
+- conditional GitHub API requests (If-None-Match) that revalidate an expired
+  cache entry, GitHub answers 304 Not Modified when the release did not change
+"""
+
+import json
+import os
+import threading
+import time
+
+GITHUB_API_URL = "https://api.github.com"
+
+# Dictionary mapping file keywords to GitHub API URLs
+LATEST_RELEASE_URLS = {
+    "cli": "https://api.github.com/repos/linode/linode-cli/releases/latest",
+    "sdk": "https://api.github.com/repos/linode/linode_api4-python/releases/latest",
+    "linodego": "https://api.github.com/repos/linode/linodego/releases/latest",
+    "terraform": "https://api.github.com/repos/linode/terraform-provider-linode/releases/latest",
+    "packer": "https://api.github.com/repos/linode/packer-plugin-linode/releases/latest",
+    "ansible": "https://api.github.com/repos/linode/ansible_linode/releases/latest",
+    "py_metadata": "https://api.github.com/repos/linode/py-metadata/releases/latest",
+    "go_metadata": "https://api.github.com/repos/linode/go-metadata/releases/latest",
+}
+
+CACHE_FILE_NAME = ".release_cache.json"
+DEFAULT_TTL = 3600
+DEFAULT_TIMEOUT = 10
+
+
+def release_urls(api_url=None):
+    """
+    LATEST_RELEASE_URLS against another GitHub API base URL.
+
+    Defaults to the GITHUB_API_URL environment variable, which GitHub Actions sets
+    on GitHub Enterprise runners and benchmarks point at a local stub.
+    """
+    api_url = api_url or os.environ.get("GITHUB_API_URL") or GITHUB_API_URL
+    api_url = api_url.rstrip("/")
+    return {
+        product: url.replace(GITHUB_API_URL, api_url, 1)
+        for product, url in LATEST_RELEASE_URLS.items()
+    }
+
+
+def find_product(file_name, urls=None):
+    """
+    Find the product keyword contained in a report file name, or None.
+    """
+    # Accept both py_metadata and py-metadata style names
+    normalized = file_name.replace("-", "_")
+    for product in urls or LATEST_RELEASE_URLS:
+        if product in normalized:
+            return product
+    return None
+
+
+class ReleaseResolver:
+    """
+    Cached, thread-safe lookup of the latest release version of each product.
+    """
+
+    def __init__(
+        self,
+        cache_dir=None,
+        ttl=DEFAULT_TTL,
+        timeout=DEFAULT_TIMEOUT,
+        urls=None,
+        session=None,
+    ):
+        """
+        Initialize ReleaseResolver with an optional cache directory for the cache file.
+        """
+        self.cache_path = (
+            os.path.join(cache_dir, CACHE_FILE_NAME) if cache_dir is not None else None
+        )
+        self.ttl = ttl
+        self.timeout = timeout
+        self.urls = urls or release_urls()
+        self._session = session
+        self._memo = {}
+        self._lock = threading.Lock()
+        self._product_locks = {}
+        self._disk_cache = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            # pylint: disable=import-outside-toplevel
+            from tod_common.http_session import get_http_client
+
+            self._session = get_http_client()
+        return self._session
+
+    def resolve_for_file(self, file_name):
+        """
+        Latest release version of the product a report file name belongs to.
+        """
+        product = find_product(file_name, self.urls)
+        if product is None:
+            return None
+        return self.resolve(product)
+
+    def forget(self):
+        """
+        Drop the in-process memo, so the next lookups go through the cache TTL again.
+
+        Long running processes call this between runs to pick up new releases.
+        """
+        with self._lock:
+            self._memo = {}
+
+    def resolve(self, product):
+        """
+        Latest release version of a product without the 'v' prefix, or None on errors.
+        """
+        if product in self._memo:
+            return self._memo[product]
+
+        with self._lock:
+            product_lock = self._product_locks.setdefault(product, threading.Lock())
+
+        # Only one thread fetches a product, the others wait for its result
+        with product_lock:
+            if product not in self._memo:
+                self._memo[product] = self._fetch(product)
+        return self._memo[product]
+
+    def _fetch(self, product):
+        import requests  # pylint: disable=import-outside-toplevel
+
+        url = self.urls.get(product)
+        if not url:
+            print(f"Error: Unknown product '{product}'.")
+            return None
+
+        entry = self._load_disk_cache().get(product)
+        if entry and time.time() - entry.get("fetched_at", 0) < self.ttl:
+            return entry["version"]
+
+        headers = {"Accept": "application/vnd.github+json"}
+        if os.environ.get("GITHUB_TOKEN"):
+            headers["Authorization"] = f"Bearer {os.environ['GITHUB_TOKEN']}"
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+
+            if response.status_code == 304 and entry:
+                version = entry["version"]
+            else:
+                response.raise_for_status()  # Check for HTTP errors
+                version = response.json()["tag_name"]
+
+                # Remove 'v' prefix if it exists
+                if version.startswith("v"):
+                    version = version[1:]
+
+            self._store(product, version, response.headers.get("ETag"))
+            return version
+
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching {product} release information:", e)
+        except (KeyError, ValueError):
+            print(
+                f"Error: Unable to fetch release information from GitHub API for {product}."
+            )
+
+        # Fall back to an expired entry rather than no version at all
+        return entry["version"] if entry else None
+
+    def _load_disk_cache(self):
+        with self._lock:
+            if self._disk_cache is None:
+                self._disk_cache = {}
+                if self.cache_path and os.path.exists(self.cache_path):
+                    try:
+                        with open(self.cache_path, "r", encoding="utf-8") as f:
+                            self._disk_cache = json.load(f)
+                    except (OSError, ValueError) as e:
+                        print(
+                            f"Ignoring unreadable release cache {self.cache_path}:", e
+                        )
+            return self._disk_cache
+
+    def _store(self, product, version, etag):
+        with self._lock:
+            previous = self._disk_cache.get(product, {})
+            self._disk_cache[product] = {
+                "version": version,
+                "etag": etag or previous.get("etag"),
+                "fetched_at": time.time(),
+            }
+
+            if not self.cache_path:
+                return
+
+            # Write atomically, parallel jobs may share the cache file
+            try:
+                os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+                tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(self._disk_cache, f)
+                os.replace(tmp_path, self.cache_path)
+            except OSError as e:
+                print(f"Unable to write release cache {self.cache_path}:", e)
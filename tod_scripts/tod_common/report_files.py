@@ -0,0 +1,31 @@
+"""
+Selection of the report files a script is run on.
+
+Scripts taking reports on the command line accept files, directories (every XML
+file directly in them) and glob patterns, expanded here so they all select the
+same files.
+"""
+
+import glob
+import os
+
+
+def expand_targets(targets):
+    """
+    (file, key) pairs for the files, directories and glob patterns given.
+
+    The key of a file found in a directory is its name, files and glob matches
+    keep the path as given.
+    """
+    files = []
+    for target in targets:
+        if os.path.isdir(target):
+            for file_name in sorted(os.listdir(target)):
+                path = os.path.join(target, file_name)
+                if file_name.endswith(".xml") and os.path.isfile(path):
+                    files.append((path, file_name))
+        elif any(char in target for char in "*?["):
+            files.extend((path, path) for path in sorted(glob.glob(target)))
+        else:
+            files.append((target, target))
+    return files
@@ -1,103 +1,234 @@
+"""
+Add the GHA information to JUnit XML reports.
+
+The branch name, GHA run id, run number and release tag of the tested project
+are appended to the root element of every report. Reports are given with
+--xmlfile or as files, directories (every XML file in them) and glob patterns,
+which are all tagged in one process: the release of each product is looked up
+once, and the elements are spliced in before the closing root tag without
+parsing the report, so tagging takes the same time for any report size.
+
+Usage:
+    python add_gha_info_to_xml.py --branch_name <branch_name> \
+        --gha_run_id <gha_run_id> --gha_run_number <gha_run_number> \
+        [--release_tag <release_tag>] --xmlfile <file_name>
+    python add_gha_info_to_xml.py --branch_name <branch_name> \
+        --gha_run_id <gha_run_id> --gha_run_number <gha_run_number> \
+        <file, directory or glob> [...]
+"""
+
 import argparse
+import os
+import re
 import sys
 import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 
-import requests
-
-latest_release_urls = {
-    "cli": "https://api.github.com/repos/linode/linode-cli/releases/latest",
-    "sdk": "https://api.github.com/repos/linode/linode_api4-python/releases/latest",
-    "linodego": "https://api.github.com/repos/linode/linodego/releases/latest",
-    "terraform": "https://api.github.com/repos/linode/terraform-provider-linode/releases/latest",
-    "packer": "https://api.github.com/repos/linode/packer-plugin-linode/releases/latest",
-    "ansible": "https://api.github.com/repos/linode/ansible_linode/releases/latest",
-    "py_metadata": "https://api.github.com/repos/linode/py-metadata/releases/latest",
-    "go_metadata": "https://api.github.com/repos/linode/go-metadata/releases/latest",
-}
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
 
+# pylint: disable=wrong-import-position
+from tod_common.release_resolver import ReleaseResolver, find_product
+from tod_common.report_files import expand_targets
 
-def get_release_version(file_name):
-    for key, url in latest_release_urls.items():
-        if key in file_name:
-            try:
-                response = requests.get(url)
-                response.raise_for_status()  # Check for HTTP errors
+UNKNOWN_RELEASE = "unknown log type"
 
-                release_info = response.json()
-                version = release_info["tag_name"]
+# Bytes read from the end of a report to find the closing root tag
+TAIL_SIZE = 4096
 
-                # Remove 'v' prefix if it exists
-                if version.startswith("v"):
-                    version = version[1:]
+# The closing root tag at the very end of a report, only whitespace may follow
+_ROOT_END = re.compile(rb"</[^\s<>/]+\s*>\s*\Z")
 
-                return str(version)
+# Encodings the spliced ASCII bytes are valid in when a report declares one
+_ASCII_COMPATIBLE = re.compile(
+    rb"""encoding\s*=\s*["'](utf-?8|us-ascii|ascii|iso-8859-\d+|latin-?1)["']""",
+    re.IGNORECASE,
+)
 
-            except requests.exceptions.RequestException as e:
-                print("Error:", e)
-            except KeyError:
-                print("Error: Unable to fetch release information from GitHub API.")
-    return "unknown log type"
 
-
-def add_fields_to_xml(branch_name, gha_run_id, gha_run_number, xml_file_path):
-    # Open and parse the XML file
+def get_release_version(file_name):
+    resolver = ReleaseResolver(cache_dir=os.path.dirname(os.path.abspath(file_name)))
+    version = resolver.resolve_for_file(file_name)
+    return str(version) if version is not None else UNKNOWN_RELEASE
+
+
+def resolve_release_versions(paths, release_tag=None):
+    """
+    Release version of the product of every report path.
+
+    Every product is looked up once, concurrently, with the release cache next
+    to the first report. A given release_tag is used for all reports instead.
+    """
+    if release_tag:
+        return {path: release_tag for path in paths}
+    if not paths:
+        return {}
+
+    resolver = ReleaseResolver(cache_dir=os.path.dirname(os.path.abspath(paths[0])))
+    products = {path: find_product(path) for path in paths}
+    unique_products = sorted({product for product in products.values() if product})
+
+    versions = {}
+    if unique_products:
+        with ThreadPoolExecutor(max_workers=len(unique_products)) as executor:
+            versions = dict(
+                zip(unique_products, executor.map(resolver.resolve, unique_products))
+            )
+
+    return {
+        path: (
+            str(versions[product])
+            if versions.get(product) is not None
+            else UNKNOWN_RELEASE
+        )
+        for path, product in products.items()
+    }
+
+
+def gha_fields(branch_name, gha_run_id, gha_run_number, release_tag):
+    """
+    The (tag, text) pairs appended to a report, in order.
+    """
+    return [
+        ("branch_name", branch_name),
+        ("gha_run_id", gha_run_id),
+        ("gha_run_number", gha_run_number),
+        ("release_tag", release_tag),
+    ]
+
+
+def fields_xml(fields):
+    """
+    The fields serialized as elements, in ASCII with character references.
+    """
+    chunks = []
+    for tag, text in fields:
+        element = ET.Element(tag)
+        element.text = text
+        chunks.append(ET.tostring(element, encoding="us-ascii"))
+    return b"".join(chunks)
+
+
+def splice_before_root_end(xml_file_path, data):
+    """
+    Insert data right before the closing tag of the root element of a report.
+
+    Only the end of the file is read and rewritten. Returns False, leaving the
+    file untouched, if the report does not end with a closing root tag (e.g. a
+    self-closing root or a trailing comment) or is not in an ASCII compatible
+    encoding.
+    """
+    with open(xml_file_path, "r+b") as f:
+        head = f.read(256)
+        if head.startswith((b"\xfe\xff", b"\xff\xfe")) or b"\x00" in head:
+            return False
+        if head.startswith(b"<?xml") and b"encoding" in head.split(b"?>", 1)[0]:
+            if not _ASCII_COMPATIBLE.search(head.split(b"?>", 1)[0]):
+                return False
+
+        size = f.seek(0, os.SEEK_END)
+        start = max(0, size - TAIL_SIZE)
+        f.seek(start)
+        tail = f.read()
+
+        position = tail.rfind(b"</")
+        if position == -1 or not _ROOT_END.match(tail, position):
+            return False
+
+        f.seek(start + position)
+        f.write(data + tail[position:])
+    return True
+
+
+def rewrite_with_fields(xml_file_path, fields):
+    """
+    Append the fields to the root element by parsing and writing the whole report.
+    """
     tree = ET.parse(xml_file_path)
     root = tree.getroot()
+    for tag, text in fields:
+        element = ET.Element(tag)
+        element.text = text
+        root.append(element)
+    tree.write(xml_file_path)
+
+
+def write_fields(xml_file_path, fields):
+    """
+    Append the fields to a report, spliced in if possible.
+    """
+    if not splice_before_root_end(xml_file_path, fields_xml(fields)):
+        rewrite_with_fields(xml_file_path, fields)
+    print(f"Modified XML saved to {xml_file_path}")
+
+
+def add_fields_to_xml(
+    branch_name, gha_run_id, gha_run_number, xml_file_path, release_tag=None
+):
+    write_fields(
+        xml_file_path,
+        gha_fields(
+            branch_name,
+            gha_run_id,
+            gha_run_number,
+            release_tag or get_release_version(xml_file_path),
+        ),
+    )
 
-    # Create new elements for the information
-    branch_name_element = ET.Element("branch_name")
-    branch_name_element.text = branch_name
-
-    gha_run_id_element = ET.Element("gha_run_id")
-    gha_run_id_element.text = gha_run_id
-
-    gha_run_number_element = ET.Element("gha_run_number")
-    gha_run_number_element.text = gha_run_number
-
-    gha_release_tag_element = ET.Element("release_tag")
-    gha_release_tag_element.text = get_release_version(xml_file_path)
-
-    # Add the new elements to the root of the XML
-    root.append(branch_name_element)
-    root.append(gha_run_id_element)
-    root.append(gha_run_number_element)
-    root.append(gha_release_tag_element)
-
-    # Save the modified XML
-    modified_xml_file_path = xml_file_path  # Overwrite it
-    tree.write(modified_xml_file_path)
-
-    print(f"Modified XML saved to {modified_xml_file_path}")
-
-
-if __name__ == "__main__":
-
-    if len(sys.argv) < 3:
-        print(
-            "Usage: python add_gha_info_to_xml.py \
-         --branch_name <branch_name> \
-         --gha_run_id <gha_run_id> \
-         --gha_run_number <gha_run_number> \
-         --xmlfile <file_name>"
-        )
-        sys.exit(1)
-
-    file_name = sys.argv[3]
 
-    if not file_name:
-        print("Error: The provided file name is empty or invalid.")
-        sys.exit(1)
-
-    # Parse command-line arguments
+def add_fields_to_files(
+    branch_name, gha_run_id, gha_run_number, paths, release_tag=None
+):
+    """
+    Append the GHA information to every report in paths.
+
+    Returns the paths that could not be modified.
+    """
+    versions = resolve_release_versions(paths, release_tag)
+    failed = []
+    for path in paths:
+        try:
+            write_fields(
+                path,
+                gha_fields(branch_name, gha_run_id, gha_run_number, versions[path]),
+            )
+        except (OSError, ET.ParseError) as e:
+            print(f"Error: could not modify '{path}': {e}")
+            failed.append(path)
+    return failed
+
+
+def main():
     parser = argparse.ArgumentParser(description="Modify XML with workflow information")
+    parser.add_argument(
+        "targets", nargs="*", help="XML files, directories of XML files or globs"
+    )
     parser.add_argument("--branch_name", required=True)
     parser.add_argument("--gha_run_id", required=True)
     parser.add_argument("--gha_run_number", required=True)
-    parser.add_argument("--release_tag", required=False)
-    parser.add_argument("--xmlfile", required=True)  # Added argument for XML file path
-
+    parser.add_argument(
+        "--release_tag",
+        required=False,
+        help="Release version, looked up from GitHub by the file name if not given",
+    )
+    parser.add_argument("--xmlfile", help="XML file path")
     args = parser.parse_args()
 
-    add_fields_to_xml(
-        args.branch_name, args.gha_run_id, args.gha_run_number, args.xmlfile
+    targets = args.targets + ([args.xmlfile] if args.xmlfile is not None else [])
+    if not targets or not all(targets):
+        print("Error: The provided file name is empty or invalid.")
+        sys.exit(1)
+
+    # A report matched by several targets must only be tagged once
+    paths = list(dict.fromkeys(path for path, _ in expand_targets(targets)))
+    if not paths:
+        print(f"Error: No XML files found in {', '.join(targets)}.")
+        sys.exit(1)
+    failed = add_fields_to_files(
+        args.branch_name, args.gha_run_id, args.gha_run_number, paths, args.release_tag
     )
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Merge JUnit XML shards, add the GHA information and upload the result in one step.
+
+Replaces running merge_<style>_results.py, add_gha_info_to_xml.py and
+xml_to_obj.py one after another: every shard is parsed once, the GHA metadata
+is written as the trailer of the merged document and the document is streamed
+straight into a multipart upload. No merged file is written to the working
+directory.
+
+Usage:
+    python merge_and_upload.py --style terraform \
+        --branch_name <branch_name> \
+        --gha_run_id <gha_run_id> \
+        --gha_run_number <gha_run_number> \
+        [--release_tag <release_tag>] [--input-dir <shard_dir>] [--key <object_key>]
+"""
+
+import argparse
+import datetime
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+# pylint: disable=wrong-import-position
+from tod_common.junit_merge import MERGE_STYLES, iter_merged_document, spool_shards
+from tod_common.junit_stream import JUnitWriter
+from tod_common.release_resolver import ReleaseResolver
+from xml_to_obj import upload_stream
+
+# Object keys matching the file names written by the merge scripts
+DEFAULT_KEYS = {
+    "ansible": "{timestamp}_ansible_merged.xml",
+    "terraform": "{timestamp}_terraform_merged_report.xml",
+}
+
+# Shard directories used by the merge scripts
+DEFAULT_INPUT_DIRS = {
+    "ansible": os.path.join("tests", "output", "junit"),
+    "terraform": ".",
+}
+
+
+def get_release_version(key):
+    resolver = ReleaseResolver(cache_dir=os.getcwd())
+    version = resolver.resolve_for_file(key)
+    return str(version) if version is not None else "unknown log type"
+
+
+def merge_and_upload(
+    input_dir,
+    key,
+    style,
+    branch_name,
+    gha_run_id,
+    gha_run_number,
+    release_tag=None,
+    workers=None,
+):
+    """
+    Merge the shards of input_dir and stream the result with GHA metadata to key.
+
+    Returns the aggregated SuiteTotals.
+    """
+    trailer = [
+        ("branch_name", branch_name),
+        ("gha_run_id", gha_run_id),
+        ("gha_run_number", gha_run_number),
+        ("release_tag", release_tag or get_release_version(key)),
+    ]
+
+    with JUnitWriter() as writer:
+        totals = spool_shards(writer, input_dir, style, workers)
+        upload_stream(iter_merged_document(writer, style, totals, trailer), key)
+
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Merge JUnit XML shards, add GHA information and upload the result"
+    )
+    parser.add_argument("--style", choices=sorted(MERGE_STYLES), required=True)
+    parser.add_argument("--branch_name", required=True)
+    parser.add_argument("--gha_run_id", required=True)
+    parser.add_argument("--gha_run_number", required=True)
+    parser.add_argument(
+        "--release_tag",
+        required=False,
+        help="Release version, looked up from GitHub by the object key if not given",
+    )
+    parser.add_argument(
+        "--input-dir",
+        help="Directory of the XML shards, defaults to the one the merge scripts use",
+    )
+    parser.add_argument(
+        "--key", help="Object key, defaults to the file name of the merge scripts"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of shard parsing processes, defaults to the number of CPUs",
+    )
+    args = parser.parse_args()
+
+    timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M")
+    key = args.key or DEFAULT_KEYS[args.style].format(timestamp=timestamp)
+    input_dir = args.input_dir or os.path.join(
+        os.getcwd(), DEFAULT_INPUT_DIRS[args.style]
+    )
+
+    totals = merge_and_upload(
+        input_dir,
+        key,
+        args.style,
+        args.branch_name,
+        args.gha_run_id,
+        args.gha_run_number,
+        args.release_tag,
+        args.workers,
+    )
+    print(
+        f"Merged {totals.tests} tests ({totals.failures} failures, {totals.errors} errors, "
+        f"{totals.skipped} skipped) into {key}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,43 +1,262 @@
+"""
+Upload XML test reports to Linode Object Storage.
+
+Usage:
+    python xml_to_obj.py <file_name>
+    python xml_to_obj.py <file, directory or glob> [...] [--workers N] [--force]
+
+A directory uploads every XML file in it under its name relative to the
+directory; files and glob matches are uploaded under the path as given. All
+files share one S3 client and are uploaded concurrently, large files in
+parallel multipart chunks. Files whose content is already stored under the
+same key are skipped.
+
+boto3 is only imported once the first upload needs a client, so importing this
+module (e.g. from merge_and_upload.py) stays cheap.
+"""
+
+import argparse
+import hashlib
+import io
 import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
 
-import boto3
-from botocore.exceptions import NoCredentialsError
+# pylint: disable=wrong-import-position
+from tod_common.report_files import expand_targets
 
 ACCESS_KEY = os.environ.get("LINODE_CLI_OBJ_ACCESS_KEY")
 SECRET_KEY = os.environ.get("LINODE_CLI_OBJ_SECRET_KEY")
-os.environ["AWS_REQUEST_CHECKSUM_CALCULATION"] = "when_required"
-os.environ["AWS_RESPONSE_CHECKSUM_VALIDATION"] = "when_required"
 BUCKET_NAME = "dx-test-results"
 
 linode_obj_config = {
     "aws_access_key_id": ACCESS_KEY,
     "aws_secret_access_key": SECRET_KEY,
-    "endpoint_url": "https://us-southeast-1.linodeobjects.com",
+    "endpoint_url": os.environ.get(
+        "OBJ_ENDPOINT_URL", "https://us-southeast-1.linodeobjects.com"
+    ),
 }
 
+MB = 1024 * 1024
+DEFAULT_WORKERS = 8
+
+_client = None
+_client_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def get_transfer_config():
+    """
+    Transfer settings of all uploads; merged reports can be tens of MB, so they are
+    uploaded in parallel chunks.
+    """
+    # pylint: disable=import-outside-toplevel
+    from boto3.s3.transfer import TransferConfig
+
+    return TransferConfig(
+        multipart_threshold=int(os.environ.get("OBJ_MULTIPART_THRESHOLD_MB", 16)) * MB,
+        multipart_chunksize=int(os.environ.get("OBJ_MULTIPART_CHUNKSIZE_MB", 16)) * MB,
+        max_concurrency=int(os.environ.get("OBJ_MULTIPART_CONCURRENCY", 4)),
+        use_threads=True,
+    )
+
+
+def get_s3_client(workers=1):
+    """
+    S3 client shared by all uploads of the process.
+    """
+    global _client  # pylint: disable=global-statement
+    with _client_lock:
+        if _client is None:
+            # pylint: disable=import-outside-toplevel
+            import boto3
+            from botocore.config import Config
+
+            os.environ["AWS_REQUEST_CHECKSUM_CALCULATION"] = "when_required"
+            os.environ["AWS_RESPONSE_CHECKSUM_VALIDATION"] = "when_required"
+            config = Config(
+                max_pool_connections=max(
+                    10, workers * get_transfer_config().max_concurrency
+                ),
+                retries={"max_attempts": 3, "mode": "standard"},
+            )
+            _client = boto3.client("s3", config=config, **linode_obj_config)
+        return _client
+
+
+def local_etag(file_name, transfer_config=None):
+    """
+    ETag S3 reports for the file once uploaded with the given transfer config.
+
+    Single part uploads get the MD5 of the content, multipart uploads the MD5 of
+    the concatenated part MD5s followed by the number of parts.
+    """
+    transfer_config = transfer_config or get_transfer_config()
+    size = os.path.getsize(file_name)
+    chunk_size = transfer_config.multipart_chunksize
+
+    content_digest = hashlib.md5()
+    part_digests = []
+    with open(file_name, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            content_digest.update(chunk)
+            part_digests.append(hashlib.md5(chunk).digest())
+
+    if size < transfer_config.multipart_threshold:
+        return content_digest.hexdigest()
+
+    combined = hashlib.md5(b"".join(part_digests)).hexdigest()
+    return f"{combined}-{len(part_digests)}"
+
+
+def is_already_uploaded(s3, file_name, key):
+    """
+    Check whether the content of a file is already stored under key.
+    """
+    # pylint: disable=import-outside-toplevel
+    from botocore.exceptions import ClientError
+
+    try:
+        response = s3.head_object(Bucket=BUCKET_NAME, Key=key)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return False
+        raise
+
+    if response.get("ContentLength") != os.path.getsize(file_name):
+        return False
+    return response.get("ETag", "").strip('"') == local_etag(file_name)
+
 
-def upload_to_linode_object_storage(file_name):
+def upload_to_linode_object_storage(file_name, key=None, skip_existing=False):
+    """
+    Upload a file to Linode Object Storage, returns "uploaded", "skipped" or "failed".
+    """
+    # pylint: disable=import-outside-toplevel
+    from botocore.exceptions import NoCredentialsError
+
+    key = key or file_name
     try:
-        s3 = boto3.client("s3", **linode_obj_config)
+        s3 = get_s3_client()
+
+        if skip_existing and is_already_uploaded(s3, file_name, key):
+            print(f"Skipped {file_name}, it is already in Linode Object Storage.")
+            return "skipped"
 
-        s3.upload_file(Filename=file_name, Bucket=BUCKET_NAME, Key=file_name)
+        s3.upload_file(
+            Filename=file_name,
+            Bucket=BUCKET_NAME,
+            Key=key,
+            Config=get_transfer_config(),
+        )
 
         print(f"Successfully uploaded {file_name} to Linode Object Storage.")
+        return "uploaded"
 
     except NoCredentialsError:
         print("Credentials not available. Ensure you have set your AWS credentials.")
+    except Exception as e:
+        print(f"Error uploading {file_name} to Linode Object Storage: {e}")
+    return "failed"
 
 
-if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python upload_to_linode.py <file_name>")
-        sys.exit(1)
+class ChunkStream(io.RawIOBase):
+    """
+    Readable binary stream over an iterable of bytes chunks.
+    """
+
+    def __init__(self, chunks):
+        """
+        Initialize ChunkStream with the chunks to read.
+        """
+        super().__init__()
+        self._chunks = iter(chunks)
+        self._buffer = memoryview(b"")
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._buffer:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._buffer = memoryview(chunk)
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
 
-    file_name = sys.argv[1]
+def upload_stream(chunks, key):
+    """
+    Stream an iterable of bytes chunks to Linode Object Storage under key.
 
-    if not file_name:
+    Parts are uploaded while later chunks are still being produced, so the
+    content never has to exist as a whole, neither in memory nor on disk.
+    """
+    s3 = get_s3_client()
+    transfer_config = get_transfer_config()
+    s3.upload_fileobj(
+        Fileobj=io.BufferedReader(ChunkStream(chunks), transfer_config.io_chunksize),
+        Bucket=BUCKET_NAME,
+        Key=key,
+        Config=transfer_config,
+    )
+    print(f"Successfully uploaded {key} to Linode Object Storage.")
+
+
+def upload_files(targets, workers=DEFAULT_WORKERS, skip_existing=True):
+    """
+    Upload all files matched by targets concurrently and count the outcomes.
+    """
+    files = expand_targets(targets)
+    get_s3_client(workers)
+
+    counts = {"uploaded": 0, "skipped": 0, "failed": 0}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        outcomes = executor.map(
+            lambda file: upload_to_linode_object_storage(
+                file[0], key=file[1], skip_existing=skip_existing
+            ),
+            files,
+        )
+        for outcome in outcomes:
+            counts[outcome] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Upload XML test reports to Linode Object Storage"
+    )
+    parser.add_argument(
+        "targets", nargs="+", help="XML files, directories of XML files or globs"
+    )
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Upload files even if the same content is already stored",
+    )
+    args = parser.parse_args()
+
+    if not all(args.targets):
         print("Error: The provided file name is empty or invalid.")
         sys.exit(1)
 
-    upload_to_linode_object_storage(file_name)
+    counts = upload_files(args.targets, args.workers, skip_existing=not args.force)
+    print(
+        f"Uploaded {counts['uploaded']}, skipped {counts['skipped']} and "
+        f"failed {counts['failed']} files."
+    )
+    if counts["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
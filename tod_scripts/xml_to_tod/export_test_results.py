@@ -0,0 +1,84 @@
+"""
+Export the testcases of JUnit reports to a Parquet dataset for trend analysis.
+
+Reports are given as files, e.g. single or merged reports, or as directories that
+are searched for .xml files. The rows are partitioned by software and month of
+the run below the output directory, see modules/results_export.py for the
+columns. Every export adds new files, so exporting the same reports twice
+duplicates their rows. Requires pyarrow (pip install pyarrow).
+
+Usage:
+    python export_test_results.py --output results reports/
+    python export_test_results.py --output results --software linode-terraform merged.xml
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# pylint: disable=wrong-import-position
+from modules.results_export import (
+    DEFAULT_COMPRESSION,
+    DEFAULT_ROW_GROUP_SIZE,
+    export_reports,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("paths", nargs="+", help="Report files or directories")
+    parser.add_argument("--output", required=True, help="Dataset directory")
+    parser.add_argument(
+        "--software",
+        help="Software of all reports, detected from each file name by default",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of report parsing processes, defaults to the number of CPUs",
+    )
+    parser.add_argument("--row-group-size", type=int, default=DEFAULT_ROW_GROUP_SIZE)
+    parser.add_argument(
+        "--compression",
+        default=DEFAULT_COMPRESSION,
+        help="Parquet compression codec, e.g. zstd, snappy or none",
+    )
+    args = parser.parse_args()
+
+    failed = []
+
+    def on_error(path, error):
+        print(f"Error: could not read '{path}': {error}")
+        failed.append(path)
+
+    start = time.perf_counter()
+    try:
+        exporter = export_reports(
+            args.paths,
+            args.output,
+            software=args.software,
+            workers=args.workers or os.cpu_count() or 1,
+            on_error=on_error,
+            row_group_size=args.row_group_size,
+            compression=args.compression,
+        )
+    except ImportError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"Exported {exporter.rows} testcases of {exporter.reports} reports into "
+        f"{len(exporter.files)} files in {args.output} ({elapsed:.1f}s)"
+    )
+    if failed:
+        print(f"{len(failed)} reports could not be read.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Module containing the grouping of reports into batches.
+
+A TOD build carries a list of reports in xunitResults, so shards of one workflow
+run can be submitted together. Reports are grouped by the build fields they share
+and a batch is released as soon as it reaches the configured count or size.
+
+Accepted reports are likewise collected into batches of keys so they can be
+removed from object storage with a single bulk delete request. Until its batch
+is deleted an accepted report stays in the bucket, and a run that dies in the
+meantime uploads it again unless the run journal recorded it, so delete batches
+are also released once their oldest report waited DEFAULT_DELETE_MAX_AGE
+seconds: bigger batches save requests, a shorter age narrows that window.
+"""
+
+import threading
+import time
+
+# Build fields that have to match for reports to share a submission. The tag holds
+# the GHA run, so reports of different workflow runs are never merged.
+BATCH_KEY_FIELDS = ("team", "softwareName", "semanticVersion", "branchName", "tag")
+
+DEFAULT_BATCH_SIZE = 1
+DEFAULT_BATCH_MAX_BYTES = 20 * 1024 * 1024
+
+# Seconds an accepted report waits for its delete batch to fill
+DEFAULT_DELETE_MAX_AGE = 5
+
+
+class ReportBatch:
+    """
+    Reports that are submitted to TOD as a single build.
+    """
+
+    def __init__(self, key):
+        """
+        Initialize ReportBatch with the build fields shared by its reports.
+        """
+        self.key = key
+        self.jobs = []
+        self.size = 0
+
+    @property
+    def file_name(self):
+        names = [job.file_name for job in self.jobs]
+        if len(names) <= 3:
+            return ", ".join(names)
+        return f"{', '.join(names[:3])} and {len(names) - 3} more"
+
+    @property
+    def data(self):
+        """
+        Build fields of the batch; it passes only if every report passed.
+        """
+        data = dict(self.jobs[0].data)
+        data["pass"] = all(job.data["pass"] for job in self.jobs)
+        return data
+
+    def add(self, job):
+        self.jobs.append(job)
+        self.size += len(job.content or b"")
+
+
+class ReportBatcher:
+    """
+    Thread-safe grouping of transformed reports into batches capped by count and size.
+    """
+
+    def __init__(
+        self, max_reports=DEFAULT_BATCH_SIZE, max_bytes=DEFAULT_BATCH_MAX_BYTES
+    ):
+        """
+        Initialize ReportBatcher with the maximum reports and report bytes per batch.
+        """
+        self.max_reports = max(1, int(max_reports))
+        self.max_bytes = max_bytes
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def add(self, job):
+        """
+        Add a report and return the batches that are ready to be submitted.
+
+        Reports that were already uploaded in an earlier run are released right away
+        in a batch of their own.
+        """
+        if job.uploaded:
+            batch = ReportBatch(None)
+            batch.jobs.append(job)
+            return [batch]
+
+        key = tuple(job.data.get(field) for field in BATCH_KEY_FIELDS)
+        ready = []
+
+        with self._lock:
+            batch = self._pending.get(key)
+            # A report that would push the batch over the size cap starts a new one
+            if batch is not None and batch.size + len(job.content) > self.max_bytes:
+                ready.append(self._pending.pop(key))
+                batch = None
+
+            if batch is None:
+                batch = self._pending[key] = ReportBatch(key)
+            batch.add(job)
+
+            if len(batch.jobs) >= self.max_reports or batch.size >= self.max_bytes:
+                ready.append(self._pending.pop(key))
+
+        return ready
+
+    def flush(self):
+        """
+        Return all batches that are still being filled.
+        """
+        with self._lock:
+            ready = list(self._pending.values())
+            self._pending.clear()
+        return ready
+
+
+class DeleteBatcher:
+    """
+    Thread-safe collection of accepted reports into batches for bulk deletes.
+    """
+
+    def __init__(self, max_reports, max_age=DEFAULT_DELETE_MAX_AGE):
+        """
+        Initialize DeleteBatcher with the maximum reports per delete request and
+        the seconds the first report of a batch waits at most.
+        """
+        self.max_reports = max(1, int(max_reports))
+        self.max_age = max_age
+        self._batch = ReportBatch(None)
+        self._started = None
+        self._lock = threading.Lock()
+
+    def add(self, job):
+        """
+        Add a report and return the batch to delete once it is full or its first
+        report is older than max_age.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if not self._batch.jobs:
+                self._started = now
+            self._batch.add(job)
+            if (
+                len(self._batch.jobs) < self.max_reports
+                and now - self._started < self.max_age
+            ):
+                return None
+            batch, self._batch = self._batch, ReportBatch(None)
+        return batch
+
+    def flush(self):
+        """
+        Return the batch that is still being filled, if any.
+        """
+        with self._lock:
+            batch, self._batch = self._batch, ReportBatch(None)
+        return [batch] if batch.jobs else None
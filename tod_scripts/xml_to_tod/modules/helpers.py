@@ -2,65 +2,101 @@
 Helper functions for various operations including HTTP requests, command execution, and others.
 """
 
+import mmap
+import os
 import subprocess
 
-import requests
+from tod_common.http_session import get_http_client
+from tod_common.release_resolver import DEFAULT_TTL, ReleaseResolver, find_product
 
-# Dictionary mapping file keywords to GitHub API URLs
-latest_release_urls = {
-    "cli": "https://api.github.com/repos/linode/linode-cli/releases/latest",
-    "sdk": "https://api.github.com/repos/linode/linode_api4-python/releases/latest",
-    "linodego": "https://api.github.com/repos/linode/linodego/releases/latest",
-    "terraform": "https://api.github.com/repos/linode/terraform-provider-linode/releases/latest",
-    "packer": "https://api.github.com/repos/linode/packer-plugin-linode/releases/latest",
-    "ansible": "https://api.github.com/repos/linode/ansible_linode/releases/latest",
-    "py-metadata": "https://api.github.com/repos/linode/py-metadata/releases/latest",
-    "go-metadata": "https://api.github.com/repos/linode/go-metadata/releases/latest",
-}
+from modules.run_metrics import get_run_metrics
+
+# Statuses TOD answers with when it refuses a payload (it cannot decode it or a
+# report in it is invalid), sending the same payload again would not help
+REJECTED_STATUSES = frozenset([400, 415, 422])
+
+# Release versions are cached next to the downloaded reports
+RELEASE_CACHE_DIR = os.path.join(os.getcwd(), "reports")
+
+_release_resolver = None
+
+
+def get_release_resolver():
+    """
+    Shared resolver so each product's release is looked up at most once per run.
+    """
+    global _release_resolver  # pylint: disable=global-statement
+    if _release_resolver is None:
+        _release_resolver = ReleaseResolver(
+            cache_dir=RELEASE_CACHE_DIR,
+            ttl=int(os.environ.get("RELEASE_CACHE_TTL", DEFAULT_TTL)),
+        )
+    return _release_resolver
 
 
 def get_release_version(file_name):
     """
     Get the latest release version from GitHub API based on the file name.
     """
-    url = latest_release_urls.get(file_name, "")
-    if not url:
+    if find_product(file_name) is None:
         print(f"Error: Unknown file type for '{file_name}'.")
         return None
 
-    try:
-        response = requests.get(
-            url, timeout=10
-        )  # Add timeout to prevent indefinite hang
-        response.raise_for_status()  # Check for HTTP errors
+    with get_run_metrics().timer("release_lookup", file_name):
+        return get_release_resolver().resolve_for_file(file_name)
 
-        release_info = response.json()
-        version = release_info["tag_name"]
 
-        # Remove 'v' prefix if it exists
-        if version.startswith("v"):
-            version = version[1:]
+def get_software_name(file_name):
+    """
+    Determine the software name based on the XML file name.
+    """
+    software_mapping = {
+        "cli": "linode-cli",
+        "sdk": "linode_api4",
+        "linodego": "linodego",
+        "terraform": "linode-terraform",
+        "packer": "packer",
+        "ansible": "ansible_linode",
+        "py_metadata": "py-metadata",
+        "go_metadata": "go-metadata",
+    }
 
-        return version
+    for key, software_name in software_mapping.items():
+        if key in file_name:
+            return software_name
 
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching {file_name} release information:", e)
-    except KeyError:
-        print(
-            f"Error: Unable to fetch release information from GitHub API for {file_name}."
-        )
+    return "unknown software type"
 
-    return None
 
+def map_file(f):
+    """
+    Read-only memory map of an open file, the content of a spilled report.
 
-def upload_encoded_xml_file(url, payload, headers):
+    The mapped pages are read from the file on demand and can be dropped again by
+    the OS, so a spilled report does not stay in memory while it waits in the
+    pipeline. The file can be closed (and deleted) once it is mapped.
+    """
+    f.flush()
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def upload_encoded_xml_file(url, payload, headers, limiter=None):
     """
     Upload encoded XML file to a specified URL using HTTP POST.
+
+    Returns the response, also for REJECTED_STATUSES so callers can react to a
+    refused payload, or None if the upload failed otherwise. With a limiter
+    (tod_common.adaptive_limit) the request waits for one of its slots.
     """
+    import requests  # pylint: disable=import-outside-toplevel
+
     try:
-        response = requests.post(
-            url, data=payload, headers=headers, timeout=10
+        # Pooled keep-alive session, retries transient failures with backoff
+        response = get_http_client().post(
+            url, data=payload, headers=headers, timeout=10, limiter=limiter
         )  # Add timeout to prevent indefinite hang
+        if response.status_code in REJECTED_STATUSES:
+            return response
         response.raise_for_status()  # Check for HTTP errors
         return response
     except requests.exceptions.RequestException as e:
@@ -81,3 +117,22 @@ def execute_command(args):
         print(f"Error executing command with args: {args}, with error: {e}")
         print(e.stderr.decode())
         raise  # Re-raise the exception to indicate failure
+
+
+def stream_command_lines(args):
+    """
+    Run a command and yield its stdout line by line while it is still running.
+    """
+    with subprocess.Popen(
+        args, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    ) as process:
+        for line in process.stdout:
+            yield line.decode().rstrip("\n")
+
+        stderr = process.stderr.read()
+        returncode = process.wait()
+
+    if returncode != 0:
+        print(f"Error executing command with args: {args}, exit code: {returncode}")
+        print(stderr.decode())
+        raise subprocess.CalledProcessError(returncode, args, stderr=stderr)
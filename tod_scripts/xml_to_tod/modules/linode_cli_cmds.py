@@ -19,7 +19,11 @@ class LinodeCommands:
 
     def get_list_command(self, cluster):
         """
-        Generate Linode CLI command for listing objects in a cluster.
+        Generate Linode CLI command for listing the objects of every bucket in a
+        cluster, one "date time size bucket/key" line per object.
+
+        Unlike `obj ls`, `obj la` prints every object rather than the first page and
+        lists keys under a prefix instead of collapsing them into directories.
         """
         return [
             self.cli_path,
@@ -0,0 +1,291 @@
+"""
+Module containing the object storage backends used by the TOD report uploader.
+
+S3ObjectStorage talks to Linode Object Storage in-process through a single boto3
+client with a pooled keep-alive connection, while LinodeCliObjectStorage keeps the
+original behaviour of spawning `linode-cli obj` for every operation.
+"""
+
+import datetime
+import os
+import shutil
+import tempfile
+
+from modules.helpers import execute_command, map_file, stream_command_lines
+from modules.linode_cli_cmds import LinodeCommands
+
+BACKENDS = ("s3", "cli")
+DEFAULT_BACKEND = "s3"
+
+# Most keys the S3 DeleteObjects call accepts per request
+MAX_DELETE_BATCH = 1000
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class S3ObjectStorage:
+    """
+    Object storage backend using the S3 compatible API of Linode Object Storage.
+    """
+
+    # Number of keys remove_many deletes with a single request
+    delete_batch_size = MAX_DELETE_BATCH
+
+    def __init__(
+        self,
+        cluster,
+        access_key=None,
+        secret_key=None,
+        endpoint_url=None,
+        max_connections=10,
+    ):
+        """
+        Initialize S3ObjectStorage with one client shared by all threads.
+        """
+        # Imported lazily so the CLI backend keeps working without boto3
+        import boto3
+        from botocore.config import Config
+
+        self.cluster = cluster
+        self.endpoint_url = endpoint_url or f"https://{cluster}.linodeobjects.com"
+
+        config = Config(
+            max_pool_connections=max_connections,
+            retries={"max_attempts": 3, "mode": "standard"},
+            request_checksum_calculation="when_required",
+            response_checksum_validation="when_required",
+        )
+        self.client = boto3.client(
+            "s3",
+            aws_access_key_id=access_key or os.environ.get("LINODE_CLI_OBJ_ACCESS_KEY"),
+            aws_secret_access_key=secret_key
+            or os.environ.get("LINODE_CLI_OBJ_SECRET_KEY"),
+            endpoint_url=self.endpoint_url,
+            config=config,
+        )
+
+    def list_objects(self, bucket, prefix="", suffix=".xml", page_size=1000):
+        """
+        Lazily yield the keys in a bucket that start with prefix and end with suffix.
+        """
+        for key, _ in self.list_entries(bucket, prefix, suffix, page_size):
+            yield key
+
+    def list_entries(self, bucket, prefix="", suffix=".xml", page_size=1000):
+        """
+        Lazily yield (key, etag) of the objects in a bucket matching prefix and suffix.
+        """
+        for key, etag, _ in self.list_modified(bucket, prefix, suffix, page_size):
+            yield key, etag
+
+    def list_modified(self, bucket, prefix="", suffix=".xml", page_size=1000):
+        """
+        Lazily yield (key, etag, last modified as a Unix time) of the matching objects.
+
+        The prefix is applied server-side and pages are fetched on demand, so the
+        first keys are available after one request and memory does not grow with
+        the size of the bucket. S3 has no suffix filter, it is applied per page.
+        """
+        paginator = self.client.get_paginator("list_objects_v2")
+        pages = paginator.paginate(
+            Bucket=bucket, Prefix=prefix, PaginationConfig={"PageSize": page_size}
+        )
+        for page in pages:
+            for obj in page.get("Contents", []):
+                if obj["Key"].endswith(suffix):
+                    yield (
+                        obj["Key"],
+                        obj.get("ETag", "").strip('"') or None,
+                        obj["LastModified"].timestamp(),
+                    )
+
+    def download(self, bucket, key, destination):
+        """
+        Download an object from a bucket to a local file.
+        """
+        self.client.download_file(Bucket=bucket, Key=key, Filename=destination)
+
+    def read(self, bucket, key, spill_size=None):
+        """
+        Read the content of an object into memory.
+
+        An object bigger than spill_size bytes is streamed into a temporary file
+        instead and returned as a read-only memory map of it, see helpers.map_file.
+        """
+        response = self.client.get_object(Bucket=bucket, Key=key)
+        with response["Body"] as body:
+            if spill_size is None or response["ContentLength"] <= spill_size:
+                return body.read()
+            with tempfile.TemporaryFile() as f:
+                shutil.copyfileobj(body, f, COPY_CHUNK_SIZE)
+                return map_file(f)
+
+    def remove(self, bucket, key):
+        """
+        Remove an object from a bucket.
+        """
+        self.client.delete_object(Bucket=bucket, Key=key)
+
+    def remove_many(self, bucket, keys):
+        """
+        Remove objects from a bucket with as few DeleteObjects requests as possible.
+
+        Returns a dict mapping every key that could not be removed to its error.
+        """
+        failed = {}
+        keys = list(keys)
+        for start in range(0, len(keys), MAX_DELETE_BATCH):
+            chunk = keys[start : start + MAX_DELETE_BATCH]
+            try:
+                response = self.client.delete_objects(
+                    Bucket=bucket,
+                    Delete={
+                        "Objects": [{"Key": key} for key in chunk],
+                        "Quiet": True,
+                    },
+                )
+            except Exception as e:
+                failed.update((key, str(e)) for key in chunk)
+                continue
+
+            for error in response.get("Errors", []):
+                failed[error["Key"]] = f"{error.get('Code')}: {error.get('Message')}"
+        return failed
+
+
+class LinodeCliObjectStorage:
+    """
+    Object storage backend running a `linode-cli obj` subprocess per operation.
+    """
+
+    # Every key is removed by its own process, bulk deletes would only serialize them
+    delete_batch_size = 1
+
+    def __init__(self, cluster, cli_path="/usr/local/bin/linode-cli"):
+        """
+        Initialize LinodeCliObjectStorage with the cluster and the Linode CLI path.
+        """
+        self.cluster = cluster
+        self.commands = LinodeCommands(cli_path=cli_path)
+
+    def _list_lines(self, bucket, prefix, suffix):
+        bucket_prefix = f"{bucket}/"
+        command = self.commands.get_list_command(cluster=self.cluster)
+        for line in stream_command_lines(command):
+            # Date, time, size and the bucket/key path, which may contain spaces
+            fields = line.split(maxsplit=3)
+            if len(fields) < 4 or not fields[3].startswith(bucket_prefix):
+                continue
+            key = fields[3][len(bucket_prefix) :]
+            if key.startswith(prefix) and key.endswith(suffix):
+                yield key, fields
+
+    def list_objects(self, bucket, prefix="", suffix=".xml"):
+        """
+        Lazily yield the names of objects in a bucket matching prefix and suffix.
+
+        `obj la` lists every bucket of the cluster, only lines of the given bucket
+        are kept and the CLI output is consumed line by line while the command is
+        still running.
+        """
+        for key, _ in self._list_lines(bucket, prefix, suffix):
+            yield key
+
+    def list_entries(self, bucket, prefix="", suffix=".xml"):
+        """
+        Lazily yield (key, None) of the matching objects, `obj la` shows no ETags.
+        """
+        for key in self.list_objects(bucket, prefix, suffix):
+            yield key, None
+
+    def list_modified(self, bucket, prefix="", suffix=".xml"):
+        """
+        Lazily yield (key, None, last modified as a Unix time) of the matching objects.
+
+        `obj la` prints the modification time to the minute in UTC; it is None for
+        lines without one.
+        """
+        for key, fields in self._list_lines(bucket, prefix, suffix):
+            try:
+                modified = datetime.datetime.strptime(
+                    f"{fields[0]} {fields[1]}", "%Y-%m-%d %H:%M"
+                ).replace(tzinfo=datetime.timezone.utc)
+            except (IndexError, ValueError):
+                yield key, None, None
+                continue
+            yield key, None, modified.timestamp()
+
+    def download(self, bucket, key, destination):
+        """
+        Download an object from a bucket to a local file.
+        """
+        execute_command(
+            self.commands.get_download_command(
+                cluster=self.cluster,
+                bucket=bucket,
+                file_name=key,
+                destination=destination,
+            )
+        )
+
+    def read(self, bucket, key, spill_size=None):
+        """
+        Read the content of an object into memory through a temporary file.
+
+        An object bigger than spill_size bytes is returned as a read-only memory
+        map of the temporary file instead, see helpers.map_file.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            destination = os.path.join(tmp_dir, os.path.basename(key))
+            self.download(bucket, key, destination)
+            with open(destination, "rb") as f:
+                if spill_size is not None and os.path.getsize(destination) > spill_size:
+                    return map_file(f)
+                return f.read()
+
+    def remove(self, bucket, key):
+        """
+        Remove an object from a bucket.
+        """
+        execute_command(
+            self.commands.get_remove_command(
+                cluster=self.cluster, bucket=bucket, file_name=key
+            )
+        )
+
+    def remove_many(self, bucket, keys):
+        """
+        Remove objects one `obj rm` call at a time, the CLI has no bulk delete.
+
+        Returns a dict mapping every key that could not be removed to its error.
+        """
+        failed = {}
+        for key in keys:
+            try:
+                self.remove(bucket, key)
+            except Exception as e:
+                failed[key] = str(e)
+        return failed
+
+
+def get_object_storage(cluster, backend=None, max_connections=10):
+    """
+    Create the object storage backend selected by name or the OBJ_BACKEND env variable.
+    """
+    backend = backend or os.environ.get("OBJ_BACKEND", DEFAULT_BACKEND)
+
+    if backend == "s3":
+        return S3ObjectStorage(
+            cluster,
+            endpoint_url=os.environ.get("OBJ_ENDPOINT_URL"),
+            max_connections=max_connections,
+        )
+    if backend == "cli":
+        return LinodeCliObjectStorage(
+            cluster,
+            cli_path=os.environ.get("LINODE_CLI_PATH", "/usr/local/bin/linode-cli"),
+        )
+
+    raise ValueError(
+        f"Unknown object storage backend '{backend}', expected one of: {', '.join(BACKENDS)}"
+    )
@@ -0,0 +1,136 @@
+"""
+Module containing a small bounded-concurrency pipeline for overlapping work.
+
+Every stage runs in its own pool of worker threads and hands its results to the
+next stage through a bounded queue, so a slow stage applies back-pressure
+instead of letting work pile up in memory.
+"""
+
+import queue
+import threading
+import time
+
+_SENTINEL = object()
+
+
+class Stage:
+    """
+    A named step of a pipeline with its own worker count.
+
+    The stage function receives one item and returns the item to pass on to the
+    next stage, None to drop it (e.g. when the item failed and was logged) or a
+    list to pass on several items. Stages that hold items back, like a batching
+    stage, provide a flush function returning the remaining items once their
+    input is exhausted.
+    """
+
+    def __init__(self, name, func, workers=1, flush=None):
+        """
+        Initialize Stage with a name, the function to run and the worker count.
+        """
+        self.name = name
+        self.func = func
+        self.workers = max(1, int(workers))
+        self.flush = flush
+
+
+def _emit(result, out_queue):
+    """
+    Pass a stage result on to the next queue.
+    """
+    if result is None:
+        return
+    if isinstance(result, list):
+        for item in result:
+            out_queue.put(item)
+    else:
+        out_queue.put(result)
+
+
+def _stage_worker(stage, in_queue, out_queue, on_error, observer):
+    """
+    Consume items from in_queue until the sentinel is seen.
+    """
+    while True:
+        item = in_queue.get()
+        if item is _SENTINEL:
+            return
+
+        start = time.perf_counter()
+        try:
+            result = stage.func(item)
+        except Exception as e:
+            if observer is not None:
+                observer(stage, item, time.perf_counter() - start, e)
+            if on_error is not None:
+                on_error(stage, item, e)
+            continue
+
+        if observer is not None:
+            observer(stage, item, time.perf_counter() - start, None)
+        _emit(result, out_queue)
+
+
+def run_pipeline(items, stages, queue_size=None, on_error=None, observer=None):
+    """
+    Push items through the given stages and return the items that left the last stage.
+
+    Stages run concurrently: while one item is being uploaded the next can already
+    be downloading. Queues between stages hold at most queue_size items (defaults
+    to twice the widest stage) which bounds the number of items in flight.
+
+    observer, if given, is called as observer(stage, item, seconds, error) after
+    every stage function call, with the exception it raised or None.
+
+    If iterating items raises, the items already fed are still finished and every
+    stage is shut down before the exception is re-raised.
+    """
+    if not stages:
+        return list(items)
+
+    if queue_size is None:
+        queue_size = 2 * max(stage.workers for stage in stages)
+
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    # The last stage writes into an unbounded queue that is drained at the end
+    queues.append(queue.Queue())
+
+    pools = []
+    for index, stage in enumerate(stages):
+        threads = [
+            threading.Thread(
+                target=_stage_worker,
+                args=(stage, queues[index], queues[index + 1], on_error, observer),
+                name=f"{stage.name}-{number}",
+                daemon=True,
+            )
+            for number in range(stage.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        pools.append(threads)
+
+    try:
+        for item in items:
+            queues[0].put(item)
+    finally:
+        # Shut the stages down in order so every item is flushed downstream first
+        for index, threads in enumerate(pools):
+            for _ in threads:
+                queues[index].put(_SENTINEL)
+            for thread in threads:
+                thread.join()
+
+            stage = stages[index]
+            if stage.flush is not None:
+                try:
+                    _emit(stage.flush(), queues[index + 1])
+                except Exception as e:
+                    if on_error is not None:
+                        on_error(stage, None, e)
+
+    results = []
+    while not queues[-1].empty():
+        results.append(queues[-1].get())
+
+    return results
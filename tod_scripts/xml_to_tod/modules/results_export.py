@@ -0,0 +1,351 @@
+"""
+Module exporting the testcases of JUnit reports to a partitioned Parquet dataset.
+
+Every testcase becomes one row holding its run (report, release, branch, GHA run
+and start time) and its suite, classname, name, status, time and failure message
+hash (see results_index.message_hash). Names, statuses and the run columns
+repeat on almost every row, so they are dictionary encoded: each distinct value
+is stored once per row group and every row only holds an index into it.
+
+Rows are written in hive style partitions by software and month of the run, e.g.
+software=linodego/month=2024-05/part-20240601120000-4242-0.parquet, so a scan of
+one software or time range only opens its files:
+
+    import pyarrow.dataset as ds
+    dataset = ds.dataset("results", format="parquet", partitioning="hive")
+    table = dataset.to_table(filter=ds.field("software") == "linodego")
+
+pyarrow is only needed to export and is imported when an exporter is created.
+"""
+
+import datetime
+import os
+import time
+from collections import OrderedDict
+from urllib.parse import quote
+
+from tod_common.junit_records import STATUSES, read_testcases
+
+from modules.helpers import get_software_name
+from modules.results_index import message_hash
+
+DEFAULT_ROW_GROUP_SIZE = 128 * 1024
+DEFAULT_COMPRESSION = "zstd"
+
+# Partitions with an open Parquet file, the least recently written one is closed
+# and continued in a new file when it is written again
+DEFAULT_MAX_OPEN_FILES = 64
+
+# Rows buffered over all partitions before the biggest buffer is written early
+DEFAULT_MAX_BUFFERED_ROWS = 4 * DEFAULT_ROW_GROUP_SIZE
+
+# Columns every row of a run shares, in schema order
+RUN_COLUMNS = ("report", "release", "branch", "gha_run_id", "gha_run_number")
+
+
+def import_pyarrow():
+    """
+    Import pyarrow and pyarrow.parquet, which are an optional dependency.
+    """
+    try:
+        # pylint: disable=import-outside-toplevel
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError(
+            "pyarrow is required to export test results, install it with "
+            "`pip install pyarrow`"
+        ) from e
+    return pyarrow, pyarrow.parquet
+
+
+def results_schema(pa):
+    """
+    Arrow schema of the exported rows, without the software and month partition keys.
+    """
+    text = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema(
+        [
+            ("report", text),
+            ("release", text),
+            ("branch", text),
+            ("gha_run_id", text),
+            ("gha_run_number", text),
+            ("run_time", pa.timestamp("s", tz="UTC")),
+            ("suite", text),
+            ("classname", text),
+            ("name", text),
+            ("time", pa.float64()),
+            ("status", text),
+            ("message_hash", pa.string()),
+        ]
+    )
+
+
+def find_reports(paths):
+    """
+    Yield (path, name) of the reports to export.
+
+    Files are taken as they are, directories are searched for .xml files which are
+    yielded in sorted order. name is the path relative to the searched directory.
+    """
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path, os.path.basename(path)
+            continue
+
+        found = []
+        for directory, _, files in os.walk(path):
+            found.extend(
+                os.path.join(directory, file) for file in files if file.endswith(".xml")
+            )
+        for report in sorted(found):
+            yield report, os.path.relpath(report, path)
+
+
+def report_time(reader, path):
+    """
+    Start of a run in seconds since the epoch.
+
+    Taken from the timestamp attribute of the root or the first suite that has
+    one, timestamps without a timezone are UTC. Falls back to the modification
+    time of the report.
+    """
+    for attrib in [reader.root_attrib] + [suite.attrib for suite in reader.suites]:
+        value = attrib.get("timestamp")
+        if not value:
+            continue
+        try:
+            moment = datetime.datetime.fromisoformat(value)
+        except ValueError:
+            continue
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=datetime.timezone.utc)
+        return int(moment.timestamp())
+    return int(os.path.getmtime(path))
+
+
+def read_report(path, name=None, software=None):
+    """
+    The run of a JUnit report and its testcases, a junit_records.TestcaseTable.
+
+    The run is a dict with the software (from the file name unless given), the
+    RUN_COLUMNS and run_time.
+    """
+    reader, testcases = read_testcases(path)
+    metadata = reader.metadata
+    run = {
+        "software": software or get_software_name(os.path.basename(path)),
+        "report": name or os.path.basename(path),
+        "release": metadata.get("release_tag") or None,
+        "branch": metadata.get("branch_name") or None,
+        "gha_run_id": metadata.get("gha_run_id") or None,
+        "gha_run_number": metadata.get("gha_run_number") or None,
+        "run_time": report_time(reader, path),
+    }
+    return run, testcases
+
+
+def _read_report(report, software):
+    # Process pool entry point, a report that cannot be read must not end the export
+    path, name = report
+    try:
+        return path, read_report(path, name, software), None
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        return path, None, e
+
+
+def read_reports(reports, software=None, workers=1):
+    """
+    Yield (path, (run, testcases), error) of every (path, name) report in order.
+
+    With more than one worker the reports are parsed in a process pool.
+    """
+    if workers <= 1 or len(reports) <= 1:
+        for report in reports:
+            yield _read_report(report, software)
+        return
+
+    # pylint: disable=import-outside-toplevel
+    from concurrent.futures import ProcessPoolExecutor
+    from functools import partial
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(
+            partial(_read_report, software=software), reports, chunksize=4
+        )
+
+
+class _Partition:
+    """
+    Buffered rows and the open Parquet file of a software and month.
+    """
+
+    __slots__ = ("directory", "columns", "rows", "writer", "files")
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.columns = {}
+        self.rows = 0
+        self.writer = None
+        self.files = 0
+
+
+class ResultsExporter:
+    """
+    Writer of testcase rows into a Parquet dataset partitioned by software and month.
+
+    Rows are buffered per partition and written as a row group whenever a
+    partition has row_group_size of them, and when the exporter is closed.
+    """
+
+    def __init__(
+        self,
+        output_dir,
+        row_group_size=DEFAULT_ROW_GROUP_SIZE,
+        compression=DEFAULT_COMPRESSION,
+        max_open_files=DEFAULT_MAX_OPEN_FILES,
+        max_buffered_rows=DEFAULT_MAX_BUFFERED_ROWS,
+    ):
+        """
+        Initialize ResultsExporter with the directory of the dataset.
+        """
+        self.pa, self.pq = import_pyarrow()
+        self.schema = results_schema(self.pa)
+        self.output_dir = output_dir
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.max_open_files = max_open_files
+        self.max_buffered_rows = max(max_buffered_rows, row_group_size)
+        # Files of every export get their own names, so exports add to a dataset
+        self._token = f"{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}"
+        self._partitions = {}
+        self._open = OrderedDict()
+        self._buffered = 0
+        self.files = []
+        self.reports = 0
+        self.rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add_report(self, run, testcases):
+        """
+        Add the testcases of a run as returned by read_report.
+        """
+        month = time.strftime("%Y-%m", time.gmtime(run["run_time"]))
+        directory = os.path.join(
+            self.output_dir,
+            f"software={quote(run['software'], safe='')}",
+            f"month={month}",
+        )
+        partition = self._partitions.get(directory)
+        if partition is None:
+            partition = self._partitions[directory] = _Partition(directory)
+            partition.columns = {field.name: [] for field in self.schema}
+
+        count = len(testcases)
+        columns = partition.columns
+        for column in RUN_COLUMNS:
+            columns[column].extend([run[column]] * count)
+        columns["run_time"].extend([run["run_time"]] * count)
+        columns["suite"].extend(testcases.suites)
+        columns["classname"].extend(testcases.classnames)
+        columns["name"].extend(testcases.names)
+        columns["time"].extend(testcases.times)
+        columns["status"].extend(testcases.statuses)
+        columns["message_hash"].extend(map(message_hash, testcases.messages))
+
+        partition.rows += count
+        self._buffered += count
+        self.reports += 1
+        self.rows += count
+
+        if partition.rows >= self.row_group_size:
+            self._flush(partition)
+        elif self._buffered > self.max_buffered_rows:
+            self._flush(max(self._partitions.values(), key=lambda p: p.rows))
+
+    def _arrays(self, columns):
+        pa = self.pa
+        arrays = []
+        for field in self.schema:
+            values = columns[field.name]
+            if field.name == "status":
+                # Statuses are already indexes into STATUSES
+                array = pa.DictionaryArray.from_arrays(
+                    pa.array(values, pa.int32()), pa.array(STATUSES)
+                )
+            elif pa.types.is_dictionary(field.type):
+                array = pa.array(values, pa.string()).dictionary_encode()
+            else:
+                # Times that are not a number are NaN, they are exported as null
+                array = pa.array(values, field.type, from_pandas=True)
+            arrays.append(array)
+        return arrays
+
+    def _writer(self, partition):
+        if partition.writer is None:
+            if len(self._open) >= self.max_open_files:
+                _, oldest = self._open.popitem(last=False)
+                oldest.writer.close()
+                oldest.writer = None
+
+            os.makedirs(partition.directory, exist_ok=True)
+            path = os.path.join(
+                partition.directory, f"part-{self._token}-{partition.files}.parquet"
+            )
+            partition.files += 1
+            partition.writer = self.pq.ParquetWriter(
+                path, self.schema, compression=self.compression
+            )
+            self.files.append(path)
+        self._open[partition.directory] = partition
+        self._open.move_to_end(partition.directory)
+        return partition.writer
+
+    def _flush(self, partition):
+        if not partition.rows:
+            return
+        table = self.pa.Table.from_arrays(
+            self._arrays(partition.columns), schema=self.schema
+        )
+        self._writer(partition).write_table(table, row_group_size=self.row_group_size)
+        self._buffered -= partition.rows
+        partition.rows = 0
+        partition.columns = {field.name: [] for field in self.schema}
+
+    def close(self):
+        """
+        Write the buffered rows and close all files.
+        """
+        for partition in self._partitions.values():
+            self._flush(partition)
+        for partition in self._open.values():
+            partition.writer.close()
+            partition.writer = None
+        self._open.clear()
+
+
+def export_reports(
+    paths, output_dir, software=None, workers=1, on_error=None, **options
+):
+    """
+    Export the testcases of the reports found in paths (see find_reports).
+
+    on_error is called with the path and the exception of every report that
+    cannot be read, those reports are skipped. Other keyword arguments are passed
+    to ResultsExporter. Returns the closed exporter with its counts.
+    """
+    reports = list(find_reports(paths))
+    with ResultsExporter(output_dir, **options) as exporter:
+        for path, report, error in read_reports(reports, software, workers):
+            if error is not None:
+                if on_error is not None:
+                    on_error(path, error)
+                continue
+            exporter.add_report(*report)
+    return exporter
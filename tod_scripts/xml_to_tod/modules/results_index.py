@@ -0,0 +1,292 @@
+"""
+Module containing the ResultsIndex that keeps the testcases of uploaded reports.
+
+Every indexed report is a run (software, release, branch and GHA run) with one
+result per testcase: its time, outcome and a hash of its failure message. The
+index is a SQLite database with indexes for the questions asked of it, so pass
+rates, duration trends and flaky tests of the last runs of a software are
+answered from it directly instead of downloading and parsing the reports again.
+query_test_results.py is the command line interface to it.
+
+Runs are ordered by the time they were indexed. A report indexed again, e.g.
+because its upload failed and it was picked up by a later run, replaces its
+earlier results.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+
+from tod_common.junit_records import STATUSES
+
+# Outcomes are stored as their index into STATUSES
+OUTCOMES = STATUSES
+
+# Characters of the hex SHA-1 kept as the failure message hash
+MESSAGE_HASH_LENGTH = 16
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    report TEXT NOT NULL,
+    version TEXT NOT NULL,
+    software TEXT NOT NULL,
+    release TEXT,
+    branch TEXT,
+    gha_run_id TEXT,
+    gha_run_number TEXT,
+    indexed_at REAL NOT NULL,
+    UNIQUE (report, version)
+);
+CREATE INDEX IF NOT EXISTS runs_by_software ON runs (software, branch, id);
+CREATE TABLE IF NOT EXISTS tests (
+    id INTEGER PRIMARY KEY,
+    classname TEXT NOT NULL,
+    name TEXT NOT NULL,
+    UNIQUE (classname, name)
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL,
+    test_id INTEGER NOT NULL,
+    time REAL,
+    outcome INTEGER NOT NULL,
+    message_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS results_by_test ON results (test_id, run_id);
+CREATE INDEX IF NOT EXISTS results_by_run ON results (run_id, test_id, outcome, time);
+"""
+
+# Ids of the last runs matching the software and branch filters. Queries over all
+# tests CROSS JOIN their results to it, which makes SQLite read only the results
+# of these runs instead of scanning all results in test order.
+_RECENT_RUNS = """
+SELECT id FROM runs
+WHERE (:software IS NULL OR software = :software)
+  AND (:branch IS NULL OR branch = :branch)
+ORDER BY id DESC LIMIT :runs
+"""
+
+
+def message_hash(message):
+    """
+    Hash of a failure message, or None if there is no message.
+    """
+    if not message:
+        return None
+    digest = hashlib.sha1(message.strip().encode("utf-8")).hexdigest()
+    return digest[:MESSAGE_HASH_LENGTH]
+
+
+class ResultsIndex:
+    """
+    Thread-safe index of testcase results kept in a SQLite database.
+    """
+
+    def __init__(self, path):
+        """
+        Initialize ResultsIndex with the path of its database file.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._test_ids = {}
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(_SCHEMA)
+
+    def _test_id(self, classname, name):
+        key = (classname, name)
+        test_id = self._test_ids.get(key)
+        if test_id is None:
+            self._connection.execute(
+                "INSERT OR IGNORE INTO tests (classname, name) VALUES (?, ?)", key
+            )
+            test_id = self._connection.execute(
+                "SELECT id FROM tests WHERE classname = ? AND name = ?", key
+            ).fetchone()[0]
+            self._test_ids[key] = test_id
+        return test_id
+
+    def add_report(self, report, version, run, testcases):
+        """
+        Index the testcases of a report, a junit_records.TestcaseTable, as one run.
+
+        run holds the software, release, branch, gha_run_id and gha_run_number of
+        the report. Returns the number of results indexed.
+        """
+        with self._lock:
+            connection = self._connection
+            connection.execute("BEGIN")
+            try:
+                connection.execute(
+                    "DELETE FROM results WHERE run_id IN "
+                    "(SELECT id FROM runs WHERE report = ? AND version = ?)",
+                    (report, version or ""),
+                )
+                connection.execute(
+                    "DELETE FROM runs WHERE report = ? AND version = ?",
+                    (report, version or ""),
+                )
+                run_id = connection.execute(
+                    "INSERT INTO runs (report, version, software, release, branch, "
+                    "gha_run_id, gha_run_number, indexed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        report,
+                        version or "",
+                        run.get("software") or "",
+                        run.get("release"),
+                        run.get("branch"),
+                        run.get("gha_run_id"),
+                        run.get("gha_run_number"),
+                        time.time(),
+                    ),
+                ).lastrowid
+                rows = [
+                    (
+                        run_id,
+                        self._test_id(classname, name),
+                        seconds,
+                        outcome,
+                        message_hash(message),
+                    )
+                    for classname, name, seconds, outcome, message in testcases.rows()
+                ]
+                connection.executemany(
+                    "INSERT INTO results (run_id, test_id, time, outcome, message_hash) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                # Ids cached during the transaction were rolled back with it
+                self._test_ids.clear()
+                raise
+        return len(rows)
+
+    def _query(self, sql, parameters):
+        with self._lock:
+            cursor = self._connection.execute(sql, parameters)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def runs(self, software=None, branch=None, runs=20):
+        """
+        The last runs, newest first, with their test and failure counts.
+        """
+        return self._query(
+            f"""
+            WITH recent AS ({_RECENT_RUNS})
+            SELECT runs.id, runs.report, runs.software, runs.release, runs.branch,
+                   runs.gha_run_id, runs.gha_run_number, runs.indexed_at,
+                   COUNT(results.test_id) AS tests,
+                   COALESCE(SUM(results.outcome IN (1, 2)), 0) AS failed
+            FROM runs JOIN recent ON recent.id = runs.id
+            LEFT JOIN results ON results.run_id = runs.id
+            GROUP BY runs.id ORDER BY runs.id DESC
+            """,
+            {"software": software, "branch": branch, "runs": runs},
+        )
+
+    def pass_rates(self, software=None, branch=None, runs=20, test=None, failed=False):
+        """
+        Pass rate of every test over the last runs, lowest first.
+
+        Skipped results are not counted. test is a LIKE pattern on the classname
+        and name joined by a dot; with failed only tests that failed are returned.
+        """
+        return self._query(
+            f"""
+            WITH recent AS ({_RECENT_RUNS})
+            SELECT tests.classname, tests.name,
+                   COUNT(*) AS runs,
+                   SUM(results.outcome = 0) AS passed,
+                   SUM(results.outcome IN (1, 2)) AS failed,
+                   ROUND(1.0 * SUM(results.outcome = 0) / COUNT(*), 4) AS pass_rate,
+                   ROUND(AVG(results.time), 3) AS avg_time
+            FROM recent
+            CROSS JOIN results ON results.run_id = recent.id
+            JOIN tests ON tests.id = results.test_id
+            WHERE results.outcome != 3
+              AND (:test IS NULL OR tests.classname || '.' || tests.name LIKE :test)
+            GROUP BY results.test_id
+            HAVING NOT :failed OR SUM(results.outcome IN (1, 2)) > 0
+            ORDER BY pass_rate, failed DESC, tests.classname, tests.name
+            """,
+            {
+                "software": software,
+                "branch": branch,
+                "runs": runs,
+                "test": test,
+                "failed": bool(failed),
+            },
+        )
+
+    def durations(self, test, software=None, branch=None, runs=20):
+        """
+        Time and outcome of the tests matching the LIKE pattern test in each of
+        the last runs, oldest first.
+        """
+        return self._query(
+            f"""
+            WITH recent AS ({_RECENT_RUNS})
+            SELECT tests.classname, tests.name, runs.release, runs.branch,
+                   runs.gha_run_id, runs.indexed_at, results.time,
+                   results.outcome
+            FROM results
+            JOIN recent ON recent.id = results.run_id
+            JOIN runs ON runs.id = results.run_id
+            JOIN tests ON tests.id = results.test_id
+            WHERE tests.classname || '.' || tests.name LIKE :test
+            ORDER BY tests.classname, tests.name, runs.id
+            """,
+            {"software": software, "branch": branch, "runs": runs, "test": test},
+        )
+
+    def flaky(self, software=None, branch=None, runs=20, min_flips=2):
+        """
+        Tests that both passed and failed in the last runs and flipped between
+        passing and failing at least min_flips times, most flips first.
+
+        The flip rate is the share of consecutive (not skipped) results that differ.
+        """
+        return self._query(
+            f"""
+            WITH recent AS ({_RECENT_RUNS}),
+            ordered AS (
+                SELECT results.test_id, results.outcome = 0 AS passed,
+                       LAG(results.outcome = 0) OVER (
+                           PARTITION BY results.test_id ORDER BY results.run_id
+                       ) AS previous
+                FROM recent CROSS JOIN results ON results.run_id = recent.id
+                WHERE results.outcome != 3
+            )
+            SELECT tests.classname, tests.name,
+                   COUNT(*) AS runs,
+                   SUM(passed) AS passed,
+                   SUM(previous IS NOT NULL AND passed != previous) AS flips,
+                   ROUND(
+                       1.0 * SUM(previous IS NOT NULL AND passed != previous)
+                       / MAX(COUNT(*) - 1, 1), 4
+                   ) AS flip_rate
+            FROM ordered JOIN tests ON tests.id = ordered.test_id
+            GROUP BY ordered.test_id
+            HAVING SUM(passed) > 0 AND SUM(passed) < COUNT(*) AND flips >= :min_flips
+            ORDER BY flips DESC, flip_rate DESC, tests.classname, tests.name
+            """,
+            {
+                "software": software,
+                "branch": branch,
+                "runs": runs,
+                "min_flips": min_flips,
+            },
+        )
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,90 @@
+"""
+Module containing the RunJournal that records how far each report got.
+
+Every report is identified by its bucket, key and version (the ETag from the
+listing, or the MD5 of its content when the backend lists no ETags, which is the
+same value for objects uploaded in a single part). Its state only moves forward
+through STATES, so a report whose TOD upload succeeded is never uploaded again,
+even if the run died before it was deleted from object storage.
+
+Reports are processed in memory, so a report that did not reach the uploaded
+state is downloaded and transformed again on the next run.
+"""
+
+import sqlite3
+import threading
+import time
+
+STATES = ("listed", "downloaded", "transformed", "uploaded", "deleted")
+
+# Reports in these states are not sent to TOD again
+UPLOADED_STATES = frozenset(["uploaded", "deleted"])
+
+# Deleted reports are forgotten after this many seconds
+DEFAULT_RETENTION = 30 * 24 * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    bucket TEXT NOT NULL,
+    key TEXT NOT NULL,
+    version TEXT NOT NULL,
+    state INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (bucket, key, version)
+)
+"""
+
+
+class RunJournal:
+    """
+    Thread-safe journal of the report states of one bucket kept in a SQLite database.
+    """
+
+    def __init__(self, path, bucket, retention=DEFAULT_RETENTION):
+        """
+        Initialize RunJournal with the path of its database file and the bucket.
+        """
+        self.path = path
+        self.bucket = bucket
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        with self._lock:
+            # WAL keeps the per-state writes cheap and readers never block
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(_SCHEMA)
+            self._connection.execute(
+                "DELETE FROM reports WHERE state = ? AND updated_at < ?",
+                (STATES.index("deleted"), time.time() - retention),
+            )
+
+    def state(self, key, version):
+        """
+        Last recorded state of a report, or None if it was never seen.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT state FROM reports WHERE bucket = ? AND key = ? AND version = ?",
+                (self.bucket, key, version),
+            ).fetchone()
+        return STATES[row[0]] if row else None
+
+    def record(self, key, version, state):
+        """
+        Record that a report reached a state; earlier states never overwrite later ones.
+        """
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO reports (bucket, key, version, state, updated_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (bucket, key, version) DO UPDATE SET "
+                "state = excluded.state, updated_at = excluded.updated_at "
+                "WHERE excluded.state > reports.state",
+                (self.bucket, key, version, STATES.index(state), time.time()),
+            )
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
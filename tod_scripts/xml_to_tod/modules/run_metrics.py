@@ -0,0 +1,275 @@
+"""
+Module containing the RunMetrics collected while the uploader drains a bucket.
+
+Durations are recorded per step (list, download, transform, release_lookup,
+encode, post, upload, delete) and, where the report is known, per file. Counters
+hold bytes moved, failures and outcomes, gauges the last value of a setting that
+changes during the run, like the adaptive upload concurrency limit. At the end
+of a run the metrics are written as a JSON run summary and optionally as a
+Prometheus textfile collector file of last_run_* gauges, so drain durations and
+bottlenecks can be trended across nightly runs.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+PERCENTILES = (50, 90, 99)
+
+# Prefix of the metric names in the Prometheus textfile
+METRIC_PREFIX = "tod_uploader"
+
+
+def percentile(sorted_values, value):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    rank = max(1, -(-value * len(sorted_values) // 100))
+    return sorted_values[rank - 1]
+
+
+class RunMetrics:
+    """
+    Thread-safe timings and counters of one uploader run.
+    """
+
+    def __init__(self):
+        """
+        Initialize RunMetrics, the run starts now.
+        """
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.finished_at = None
+        self.duration = None
+        self.timings = {}
+        self.files = {}
+        self.counters = Counter()
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, file_name=None):
+        """
+        Record a duration of step name, attributed to file_name if given.
+        """
+        with self._lock:
+            self.timings.setdefault(name, []).append(seconds)
+            if file_name is not None:
+                steps = self.files.setdefault(file_name, {})
+                steps[name] = steps.get(name, 0) + seconds
+
+    @contextmanager
+    def timer(self, name, file_name=None):
+        """
+        Record the duration of the with block as step name.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, file_name)
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def gauge(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+
+    def observe(self, stage, item, seconds, error):
+        """
+        Pipeline observer recording every stage call per report.
+
+        The duration of a stage call on a batch is attributed to all its reports.
+        """
+        jobs = getattr(item, "jobs", None) or [item]
+        with self._lock:
+            self.timings.setdefault(stage.name, []).append(seconds)
+            for job in jobs:
+                steps = self.files.setdefault(job.file_name, {})
+                steps[stage.name] = steps.get(stage.name, 0) + seconds
+        if error is not None:
+            self.count(f"{stage.name}_errors")
+
+    def finish(self):
+        """
+        Mark the end of the run.
+        """
+        self.finished_at = time.time()
+        self.duration = time.perf_counter() - self._start
+
+    def summary(self, http_stats=None):
+        """
+        JSON serializable summary of the run.
+        """
+        with self._lock:
+            timings = {name: sorted(values) for name, values in self.timings.items()}
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            files = {name: dict(steps) for name, steps in self.files.items()}
+
+        steps = {}
+        for name, values in timings.items():
+            step = {"count": len(values), "total_seconds": round(sum(values), 6)}
+            for value in PERCENTILES:
+                step[f"p{value}_seconds"] = round(percentile(values, value), 6)
+            step["max_seconds"] = round(values[-1], 6)
+            steps[name] = step
+
+        return {
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration_seconds": (
+                round(self.duration, 6) if self.duration is not None else None
+            ),
+            "steps": steps,
+            "counters": counters,
+            "gauges": gauges,
+            "http": dict(http_stats or {}),
+            "files": {
+                name: {step: round(seconds, 6) for step, seconds in file_steps.items()}
+                for name, file_steps in files.items()
+            },
+        }
+
+    def write_json(self, path, http_stats=None):
+        """
+        Write the run summary to a JSON file.
+        """
+        _write_atomically(
+            path, json.dumps(self.summary(http_stats), indent=2, sort_keys=True) + "\n"
+        )
+
+    def write_prometheus(self, path, http_stats=None):
+        """
+        Write the run summary in the Prometheus text format, for the node exporter
+        textfile collector. Per file timings are left out to bound the cardinality.
+
+        Every value covers the last run only and starts over with the next one, so
+        all of them are gauges named last_run_* rather than counters, which
+        rate() and increase() would read as counter resets.
+        """
+        summary = self.summary(http_stats)
+        lines = []
+
+        def metric(name, metric_type, help_text, samples):
+            name = f"{METRIC_PREFIX}_{name}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for suffix, labels, value in samples:
+                label_text = ",".join(
+                    f'{key}="{_escape_label(label)}"' for key, label in labels
+                )
+                lines.append(
+                    f"{name}{suffix}{{{label_text}}} {value}"
+                    if label_text
+                    else f"{name}{suffix} {value}"
+                )
+
+        metric(
+            "last_run_timestamp_seconds",
+            "gauge",
+            "Unix time the last run started.",
+            [("", (), summary["started_at"])],
+        )
+        if summary["duration_seconds"] is not None:
+            metric(
+                "last_run_duration_seconds",
+                "gauge",
+                "Wall time of the last run.",
+                [("", (), summary["duration_seconds"])],
+            )
+
+        steps = sorted(summary["steps"].items())
+        if steps:
+            metric(
+                "last_run_step_seconds",
+                "gauge",
+                "Duration percentiles of the steps of the last run.",
+                [
+                    (
+                        "",
+                        (("step", step), ("quantile", f"0.{value:02d}")),
+                        values[f"p{value}_seconds"],
+                    )
+                    for step, values in steps
+                    for value in PERCENTILES
+                ],
+            )
+            metric(
+                "last_run_step_total_seconds",
+                "gauge",
+                "Total duration of the steps of the last run.",
+                [
+                    ("", (("step", step),), values["total_seconds"])
+                    for step, values in steps
+                ],
+            )
+            metric(
+                "last_run_step_calls",
+                "gauge",
+                "Number of times the steps ran in the last run.",
+                [("", (("step", step),), values["count"]) for step, values in steps],
+            )
+
+        for name, value in sorted(summary["gauges"].items()):
+            metric(
+                _metric_name(name),
+                "gauge",
+                f"{name.replace('_', ' ').capitalize()} at the end of the last run.",
+                [("", (), value)],
+            )
+
+        counters = dict(summary["counters"])
+        counters.update(
+            (f"http_{name}", value) for name, value in summary["http"].items()
+        )
+        for name, value in sorted(counters.items()):
+            metric(
+                f"last_run_{_metric_name(name)}",
+                "gauge",
+                f"{name.replace('_', ' ').capitalize()} in the last run.",
+                [("", (), value)],
+            )
+
+        _write_atomically(path, "\n".join(lines) + "\n")
+
+
+def _metric_name(name):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _write_atomically(path, text):
+    # Collectors must never read a half written file
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+_run_metrics = RunMetrics()
+
+
+def get_run_metrics():
+    """
+    Metrics of the current run, shared by all modules of the uploader.
+    """
+    return _run_metrics
+
+
+def reset_run_metrics():
+    """
+    Start a new run and return its metrics.
+    """
+    global _run_metrics  # pylint: disable=global-statement
+    _run_metrics = RunMetrics()
+    return _run_metrics
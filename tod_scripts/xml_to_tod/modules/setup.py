@@ -1,14 +1,22 @@
 """
 This module provides functions to setup Linode configuration by loading environment variables,
 checking if required environment variables are set, and verifying the installation of Linode CLI.
+
+hvac and python-dotenv are only imported when they are needed, and the Linode CLI check
+is cached across runs, so short CI steps do not pay for them.
 """
 
+import json
 import os
+import shutil
 import subprocess
 import sys
-import hvac
+import tempfile
+
+from modules.obj_storage import DEFAULT_BACKEND
 
-from dotenv import load_dotenv
+# Linode CLI binaries that passed the installation check, by path and modification time
+PREFLIGHT_CACHE_PATH = os.path.join(tempfile.gettempdir(), "tod_scripts_preflight.json")
 
 
 def load_environment_variables():
@@ -16,11 +24,18 @@ def load_environment_variables():
     dotenv_path = os.path.join(
         os.path.dirname(__file__), "..", ".env"
     )  # Adjust the path as per your file location
+    if not os.path.exists(dotenv_path):
+        return
+
+    from dotenv import load_dotenv  # pylint: disable=import-outside-toplevel
+
     load_dotenv(dotenv_path=dotenv_path)
 
 
 def get_secret_from_vault(secret_path):
     """Retrieve secret from Vault."""
+    import hvac  # pylint: disable=import-outside-toplevel
+
     vault_client = hvac.Client(
         url=os.getenv("VAULT_ADDR", "http://127.0.0.1:8200"),
         token=os.getenv("VAULT_TOKEN")
@@ -65,11 +80,42 @@ def check_required_env_vars():
         sys.exit(1)
 
 
+def _load_preflight_cache():
+    try:
+        with open(PREFLIGHT_CACHE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _store_preflight_cache(cache):
+    try:
+        tmp_path = f"{PREFLIGHT_CACHE_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, PREFLIGHT_CACHE_PATH)
+    except OSError:
+        pass
+
+
 def check_linode_cli_installed():
-    """Check if Linode CLI is installed."""
+    """Check if Linode CLI is installed, skipping the check for a binary that already passed it."""
+    cli_path = shutil.which("linode-cli")
+    if cli_path is None:
+        print(
+            "linode-cli is not installed. Please make sure Linode CLI is installed..."
+        )
+        return False
+
+    stat = os.stat(cli_path)
+    fingerprint = [stat.st_mtime_ns, stat.st_size]
+    cache = _load_preflight_cache()
+    if cache.get(cli_path) == fingerprint:
+        return True
+
     try:
         subprocess.run(
-            ["linode-cli", "--version"],
+            [cli_path, "--version"],
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             check=True,
@@ -78,10 +124,17 @@ def check_linode_cli_installed():
         print(
             "linode-cli is not installed. Please make sure Linode CLI is installed..."
         )
+        return False
+
+    cache[cli_path] = fingerprint
+    _store_preflight_cache(cache)
+    return True
 
 
 def setup_linode_configuration():
     """Setup Linode configuration by checking environment variables and CLI installation."""
     load_environment_variables()
     check_required_env_vars()
-    check_linode_cli_installed()
+    # Only the cli object storage backend runs linode-cli
+    if os.environ.get("OBJ_BACKEND", DEFAULT_BACKEND) == "cli":
+        check_linode_cli_installed()
@@ -0,0 +1,180 @@
+"""
+Module containing the TodPayload class that builds and sends TOD build payloads.
+
+JUnit XML is very repetitive, so the payload can optionally be gzip compressed:
+- "xml": the report is gzipped before it is base64 encoded into xunitResults
+- "body": the JSON request body is sent with Content-Encoding: gzip
+- "both": both of the above
+- "none": the original uncompressed payload (default)
+
+The JSON body is not built in memory: JsonBody base64 encodes the reports chunk
+by chunk while the request is sent, so an upload holds the reports plus one
+encoded chunk instead of several full size copies of the payload.
+
+If TOD rejects a compressed payload the same reports are sent again uncompressed.
+When that retry is accepted the rejected compression is switched off for the
+rest of the run, so the extra round trip is paid at most once.
+
+Uploads can be limited by an AdaptiveLimiter, which adjusts the number of
+concurrent uploads to how TOD responds (see tod_common.adaptive_limit).
+"""
+
+import base64
+import gzip
+import json
+import threading
+import zlib
+
+from modules.helpers import REJECTED_STATUSES, upload_encoded_xml_file
+from modules.run_metrics import get_run_metrics
+
+COMPRESSION_MODES = ("none", "xml", "body", "both")
+
+# Bytes of a report encoded per chunk of the body, a multiple of 3 so the encoded
+# chunks concatenate to the base64 encoding of the whole report
+CHUNK_SIZE = 3 * 128 * 1024
+
+
+def gzip_bytes(data):
+    """
+    Gzip data reproducibly (no timestamp in the header).
+    """
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def gzip_chunks(chunks):
+    """
+    Gzip the concatenation of chunks without joining them first.
+    """
+    # wbits 31 writes a gzip header, with no timestamp
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    parts = [compressor.compress(chunk) for chunk in chunks]
+    parts.append(compressor.flush())
+    return b"".join(parts)
+
+
+class JsonBody:
+    """
+    JSON body of a TOD build, produced chunk by chunk while it is sent.
+
+    The reports can be anything supporting the buffer protocol (bytes, a
+    memoryview, an mmap of a file) and are not copied. Every iteration produces
+    the whole body again, so a retried request resends it, and its length is
+    known up front, so it is sent with a Content-Length.
+    """
+
+    def __init__(self, data, xml_contents):
+        """
+        Initialize JsonBody with the build fields and the reports for xunitResults.
+        """
+        fields = {key: value for key, value in data.items() if key != "xunitResults"}
+        # xunitResults is the last key, the document ends with its list
+        document = json.dumps(dict(fields, xunitResults=[])).encode("ascii")
+        self._head = document[:-2]
+        self._tail = document[-2:]
+        self._contents = [memoryview(content) for content in xml_contents]
+
+        encoded = sum(2 + 4 * -(-content.nbytes // 3) for content in self._contents)
+        separators = 2 * max(0, len(self._contents) - 1)
+        self._length = len(self._head) + encoded + separators + len(self._tail)
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        yield self._head
+        for index, content in enumerate(self._contents):
+            yield b', "' if index else b'"'
+            content = content.cast("B")
+            for start in range(0, len(content), CHUNK_SIZE):
+                yield base64.b64encode(content[start : start + CHUNK_SIZE])
+            yield b'"'
+        yield self._tail
+
+
+class TodPayload:
+    """
+    Encoder and sender of TOD payloads for one compression mode, shared by all threads.
+    """
+
+    def __init__(self, compression="none", limiter=None):
+        """
+        Initialize TodPayload with one of COMPRESSION_MODES and optionally an
+        AdaptiveLimiter for the uploads.
+        """
+        if compression not in COMPRESSION_MODES:
+            raise ValueError(
+                f"Unknown compression '{compression}', expected one of: {', '.join(COMPRESSION_MODES)}"
+            )
+        self.compress_xml = compression in ("xml", "both")
+        self.compress_body = compression in ("body", "both")
+        self.limiter = limiter
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def encode(data, xml_contents, compress_xml=False):
+        """
+        JSON body of a build with each report base64 encoded into xunitResults.
+
+        The reports are encoded while the body is sent, see JsonBody.
+        """
+        if compress_xml:
+            xml_contents = [gzip_bytes(xml_content) for xml_content in xml_contents]
+        return JsonBody(data, xml_contents)
+
+    def send(self, url, data, xml_contents):
+        """
+        POST a build with one or more reports to TOD and return the response, or
+        None if the upload failed.
+        """
+        headers = {"Content-Type": "application/json"}
+
+        with self._lock:
+            compress_xml = self.compress_xml
+            compress_body = self.compress_body
+
+        metrics = get_run_metrics()
+
+        if not (compress_xml or compress_body):
+            with metrics.timer("encode"):
+                payload = self.encode(data, xml_contents)
+            return self.post(upload_encoded_xml_file, url, payload, headers)
+
+        with metrics.timer("encode"):
+            payload = self.encode(data, xml_contents, compress_xml)
+            compressed_headers = dict(headers)
+            if compress_body:
+                payload = gzip_chunks(payload)
+                compressed_headers["Content-Encoding"] = "gzip"
+
+        response = self.post(upload_encoded_xml_file, url, payload, compressed_headers)
+        if response is None or response.status_code not in REJECTED_STATUSES:
+            return response
+
+        print(
+            f"TOD rejected compressed payload with status code {response.status_code}, "
+            "retrying uncompressed"
+        )
+        with metrics.timer("encode"):
+            payload = self.encode(data, xml_contents)
+        response = self.post(upload_encoded_xml_file, url, payload, headers)
+
+        if response is not None and response.status_code == 201:
+            with self._lock:
+                if compress_xml:
+                    self.compress_xml = False
+                if compress_body:
+                    self.compress_body = False
+        return response
+
+    def post(self, upload, url, payload, headers):
+        """
+        Send a payload with the given upload function, recording its time and size.
+        """
+        metrics = get_run_metrics()
+        with metrics.timer("post"):
+            response = upload(url, payload, headers, self.limiter)
+        metrics.count("bytes_uploaded", len(payload))
+        if self.limiter is not None:
+            metrics.gauge("upload_concurrency_limit", self.limiter.limit)
+        return response
@@ -0,0 +1,109 @@
+"""
+Module containing the WatchState that tracks which reports a watching uploader has
+already picked up.
+
+The state is a high-water mark on the LastModified time of the listed objects plus
+the keys (and versions) picked up within a lookback window below it. Objects older
+than the window are skipped without being looked at, newer ones are picked up once
+per version. The window covers late arrivals: S3 stamps a multipart upload with
+the time it was started, and the CLI backend only lists times to the minute.
+
+Reports that fail stay in the bucket and are picked up again by the periodic full
+scans of the watch loop. The state is kept in a JSON file so a restarted watcher
+continues where the previous one stopped.
+"""
+
+import json
+import os
+import time
+
+# Seconds below the high-water mark in which newly listed objects are still picked up
+DEFAULT_LOOKBACK = 300
+
+
+class WatchState:
+    """
+    High-water mark of the reports of a bucket and prefix handed to the pipeline.
+    """
+
+    def __init__(self, path, bucket, prefix="", lookback=DEFAULT_LOOKBACK):
+        """
+        Initialize WatchState from the state file at path, if there is one.
+        """
+        self.path = path
+        self.name = f"{bucket}/{prefix}"
+        self.lookback = lookback
+        self.high_water = None
+        # key -> [version, last modified (or time it was first picked up)]
+        self.seen = {}
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f).get(self.name, {})
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable watch state {self.path}:", e)
+            return
+        self.high_water = state.get("high_water")
+        self.seen = state.get("seen", {})
+
+    def save(self):
+        """
+        Write the state atomically, other buckets and prefixes in the file are kept.
+        """
+        if not self.path:
+            return
+
+        states = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    states = json.load(f)
+            except (OSError, ValueError):
+                states = {}
+        states[self.name] = {"high_water": self.high_water, "seen": self.seen}
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(states, f)
+        os.replace(tmp_path, self.path)
+
+    def select(self, entries):
+        """
+        The (key, etag, modified) entries that were not picked up before.
+        """
+        floor = self.high_water - self.lookback if self.high_water is not None else None
+        selected = []
+        for key, etag, modified in entries:
+            if floor is not None and modified is not None and modified < floor:
+                continue
+            seen = self.seen.get(key)
+            if seen is not None and seen[0] == (etag or modified):
+                continue
+            selected.append((key, etag, modified))
+        return selected
+
+    def advance(self, entries, now=None):
+        """
+        Remember the entries as picked up, move the mark and forget what fell below
+        the lookback window.
+        """
+        now = time.time() if now is None else now
+        for key, etag, modified in entries:
+            self.seen[key] = [etag or modified, now if modified is None else modified]
+            if modified is not None and (
+                self.high_water is None or modified > self.high_water
+            ):
+                self.high_water = modified
+
+        floor = (
+            self.high_water if self.high_water is not None else now
+        ) - self.lookback
+        self.seen = {
+            key: value for key, value in self.seen.items() if value[1] >= floor
+        }
+        self.save()
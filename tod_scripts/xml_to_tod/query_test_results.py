@@ -0,0 +1,133 @@
+"""
+Query the local results index the TOD uploader fills when RESULTS_INDEX is set.
+
+Subcommands:
+- runs: the last indexed runs with their test and failure counts
+- pass-rate: pass rate of every test over the last runs, lowest first
+- durations: time and outcome of matching tests in each of the last runs
+- flaky: tests flipping between passing and failing in the last runs
+
+Usage:
+    python query_test_results.py pass-rate --software linodego --runs 20 --failed
+    python query_test_results.py durations --test "%TestInstance_basic" --software linodego
+    python query_test_results.py flaky --software linode-cli --min-flips 3 --json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# pylint: disable=wrong-import-position
+from modules.results_index import OUTCOMES, ResultsIndex
+
+DEFAULT_INDEX = os.path.join("reports", "results_index.sqlite")
+
+# Columns printed per subcommand, all columns are in the JSON output
+COLUMNS = {
+    "runs": [
+        "id",
+        "software",
+        "release",
+        "branch",
+        "gha_run_id",
+        "tests",
+        "failed",
+        "report",
+    ],
+    "pass-rate": ["pass_rate", "runs", "passed", "failed", "avg_time", "test"],
+    "durations": ["test", "gha_run_id", "release", "time", "outcome"],
+    "flaky": ["flips", "flip_rate", "runs", "passed", "test"],
+}
+
+
+def query(index, args):
+    """
+    Rows answering the subcommand of args.
+    """
+    filters = {"software": args.software, "branch": args.branch, "runs": args.runs}
+    if args.command == "runs":
+        return index.runs(**filters)
+    if args.command == "pass-rate":
+        return index.pass_rates(test=args.test, failed=args.failed, **filters)
+    if args.command == "durations":
+        return index.durations(args.test, **filters)
+    return index.flaky(min_flips=args.min_flips, **filters)
+
+
+def print_table(rows, columns):
+    cells = [[str(row.get(column, "")) for column in columns] for row in rows]
+    widths = [
+        max([len(column)] + [len(row[i]) for row in cells])
+        for i, column in enumerate(columns)
+    ]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in cells:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)))
+
+
+def main():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--index",
+        default=os.environ.get("RESULTS_INDEX") or DEFAULT_INDEX,
+        help="Results index database, defaults to RESULTS_INDEX",
+    )
+    common.add_argument("--json", action="store_true", help="Print the rows as JSON")
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for command in COLUMNS:
+        subparser = subparsers.add_parser(command, parents=[common])
+        subparser.add_argument("--software")
+        subparser.add_argument("--branch")
+        subparser.add_argument(
+            "--runs", type=int, default=20, help="Number of last runs to look at"
+        )
+        if command in ("pass-rate", "durations"):
+            subparser.add_argument(
+                "--test",
+                required=command == "durations",
+                help="SQL LIKE pattern on classname.name, e.g. %%TestInstance%%",
+            )
+        if command == "pass-rate":
+            subparser.add_argument(
+                "--failed", action="store_true", help="Only tests that failed"
+            )
+        if command == "flaky":
+            subparser.add_argument("--min-flips", type=int, default=2)
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.index):
+        print(f"Error: results index '{args.index}' not found.")
+        sys.exit(1)
+
+    index = ResultsIndex(args.index)
+    try:
+        start = time.perf_counter()
+        rows = query(index, args)
+        elapsed = time.perf_counter() - start
+    finally:
+        index.close()
+
+    for row in rows:
+        if "classname" in row:
+            row["test"] = f"{row['classname']}.{row['name']}"
+        if "outcome" in row:
+            row["outcome"] = OUTCOMES[row["outcome"]]
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    print_table(rows, COLUMNS[args.command])
+    print(f"\n{len(rows)} rows in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,29 +5,87 @@ This script downloads XML files from Linode Object Storage, processes them,
 and uploads them to TOD.
 """
 
-import base64
 import datetime
-import json
+import hashlib
+import io
+import itertools
 import logging
+import mmap
 import os
-import xml.etree.ElementTree as ET
+import signal
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from functools import partial
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# pylint: disable=wrong-import-position
+from tod_common.adaptive_limit import AdaptiveLimiter
+from tod_common.http_session import (
+    DEFAULT_RETRIES,
+    configure_http_client,
+    get_http_client,
+)
+from tod_common.junit_records import TestcaseRecord, TestcaseTable
+from tod_common.junit_stream import (
+    JUnitReader,
+    SuiteTotals,
+    document_head,
+    document_tail,
+)
+
+from modules.batching import (
+    DEFAULT_BATCH_MAX_BYTES,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_DELETE_MAX_AGE,
+    DeleteBatcher,
+    ReportBatcher,
+)
 from modules.helpers import (
-    execute_command,
+    REJECTED_STATUSES,
+    get_release_resolver,
     get_release_version,
-    upload_encoded_xml_file,
+    get_software_name,
+    map_file,
 )
-from modules.linode_cli_cmds import LinodeCommands
+from modules.obj_storage import get_object_storage
+from modules.pipeline import Stage, run_pipeline
+from modules.results_index import ResultsIndex
+from modules.run_journal import UPLOADED_STATES, RunJournal
+from modules.run_metrics import get_run_metrics, reset_run_metrics
 from modules.setup import setup_linode_configuration
+from modules.tod_payload import TodPayload
+from modules.watch_state import WatchState
+
+# Number of reports each pipeline stage works on concurrently
+DEFAULT_WORKERS = 4
+
+# Reports bigger than this are kept in a temporary file instead of memory
+DEFAULT_SPILL_SIZE = 16 * 1024 * 1024
+
+# Watch mode: seconds between polls while reports arrive, while the bucket is idle,
+# and between scans that pick up all listed reports again
+DEFAULT_POLL_MIN = 2
+DEFAULT_POLL_MAX = 60
+DEFAULT_FULL_SCAN_INTERVAL = 600
 
-# Configure logging
 timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M")
 log_file_path = f"logs/{timestamp}_log.txt"
-logging.basicConfig(
-    filename=log_file_path,
-    level=logging.DEBUG,
-    format="%(asctime)s - %(levelname)s: %(message)s",
-)
+
+
+def configure_logging():
+    """
+    Log to a file of the logs directory, named after the start of the run.
+    """
+    os.makedirs(os.path.dirname(log_file_path), exist_ok=True)
+    logging.basicConfig(
+        filename=log_file_path,
+        level=logging.DEBUG,
+        format="%(asctime)s - %(levelname)s: %(message)s",
+    )
 
 
 def log_and_print(message, level=logging.INFO):
@@ -38,196 +96,895 @@ def log_and_print(message, level=logging.INFO):
     print(message)
 
 
-def get_software_name(file_name):
+# Metadata elements add_gha_info_to_xml.py appends to the root of every report
+METADATA_TAGS = ["branch_name", "gha_run_id", "gha_run_number", "release_tag"]
+
+
+def extract_tod_fields(testsuite_attrib, metadata):
     """
-    Determine the software name based on the XML file name.
+    Extract the fields TOD needs from the first suite and the root metadata of a report.
     """
-    software_mapping = {
-        "cli": "linode-cli",
-        "sdk": "linode_api4",
-        "linodego": "linodego",
-        "terraform": "linode-terraform",
-        "packer": "packer",
-        "ansible": "ansible_linode",
-        "py_metadata": "py-metadata",
-        "go_metadata": "go-metadata",
+    testsuite_failures = (
+        testsuite_attrib.get("failures") if testsuite_attrib is not None else 0
+    )
+    failures = metadata.get("failures", 0)
+
+    return {
+        "release_tag": metadata.get("release_tag"),
+        "has_release_tag": "release_tag" in metadata,
+        "gha_run_id": metadata.get("gha_run_id"),
+        "gha_run_number": metadata.get("gha_run_number"),
+        "branch_name": metadata.get("branch_name", "N/A"),
+        "pass": int(testsuite_failures or failures) == 0,
     }
 
-    for key, software_name in software_mapping.items():
-        if key in file_name:
-            return software_name
 
-    return "unknown software type"
+def _top_level_suites(reader):
+    return [suite for suite in reader.suites if suite.depth == 1]
+
+
+def convert_report_for_tod(source, output, on_testcase=None):
+    """
+    Stream a report and write a TOD acceptable version of it to output if needed.
+
+    Reports with several <testsuite> elements are collapsed into a single suite that
+    carries the totals of the root and is followed by the GHA metadata elements.
+    on_testcase is called with the TestcaseRecord of every testcase.
+    Returns whether the report was converted and the TOD fields of the result.
+
+    Nothing is written until a second top-level suite shows up, so reports that
+    need no conversion are only read. A report that does is read again from the
+    start (source is a path or a seekable binary file object) and written
+    straight to output, the testcases already seen are not passed to
+    on_testcase twice.
+    """
+    reader = JUnitReader(source)
+    seen = 0
+    for _, testcase in reader.testcases():
+        if len(_top_level_suites(reader)) > 1:
+            break
+        if on_testcase is not None:
+            on_testcase(TestcaseRecord.from_element(testcase))
+        seen += 1
+    else:
+        suites = _top_level_suites(reader)
+        if len(suites) <= 1:
+            testsuite_attrib = suites[0].attrib if suites else None
+            return False, extract_tod_fields(testsuite_attrib, reader.metadata)
+
+    if not isinstance(source, str):
+        source.seek(0)
+    reader = JUnitReader(source)
+    testcases = reader.testcases()
+    # The root attributes are known once the first testcase (or the end) is read
+    first = next(testcases, None)
+
+    # Aggregate total values
+    totals = SuiteTotals.from_attrib(reader.root_attrib)
+    output.write(document_head(reader.root_attrib, totals.as_attrib()))
+    if first is not None:
+        for index, (_, testcase) in enumerate(itertools.chain([first], testcases)):
+            record = TestcaseRecord.from_element(testcase, keep_xml=True)
+            if on_testcase is not None and index >= seen:
+                on_testcase(record)
+            output.write(record.to_xml())
+
+    # Copy essential metadata
+    metadata = {key: reader.metadata.get(key) or "" for key in METADATA_TAGS}
+    output.write(document_tail(list(metadata.items())))
+
+    # Empty metadata elements read back as None, like from the written file
+    metadata = {key: text or None for key, text in metadata.items()}
+    return True, extract_tod_fields(reader.root_attrib, metadata)
 
 
 def change_xml_report_to_tod_acceptable_version(file_path):
     """
     Modify XML report to be acceptable by TOD (Test Outcome Database).
     """
-    tree = ET.parse(file_path)
-    root = tree.getroot()
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, "wb") as output:
+        converted, _ = convert_report_for_tod(file_path, output)
+
+    if not converted:
+        os.remove(tmp_path)
+        return
+
+    # Save the modified XML back to the file
+    try:
+        os.replace(tmp_path, file_path)
+        log_and_print(
+            f"{timestamp}: XML content successfully overwritten to {file_path}"
+        )
+    except Exception as e:
+        log_and_print(
+            f"{timestamp}: Error writing XML content: {str(e)}", level=logging.ERROR
+        )
+
+
+class ReportJob:
+    """
+    State of a single XML report as it moves through the upload pipeline.
+    """
+
+    def __init__(self, file_name, file_path, version=None):
+        """
+        Initialize ReportJob with the object name, its local debug path and its
+        version (ETag) if the listing provided one.
+        """
+        self.file_name = file_name
+        self.file_path = file_path
+        self.version = version
+        self.content = None
+        self.data = None
+        # TestcaseTable and run fields for the results index, if there is one
+        self.testcases = None
+        self.run = None
+        # Set when the run journal shows TOD already accepted this report
+        self.uploaded = False
+
+
+def record_state(journal, job, state):
+    """
+    Record the state a report reached in the run journal, if there is one.
+    """
+    if journal is not None and job.version is not None:
+        journal.record(job.file_name, job.version, state)
+
+
+def resume_uploaded(journal, job):
+    """
+    Check the run journal for a report TOD already accepted in an earlier run.
+    """
+    if journal is None or job.version is None:
+        return False
+    if journal.state(job.file_name, job.version) not in UPLOADED_STATES:
+        return False
+
+    job.uploaded = True
+    log_and_print(
+        f"{timestamp}: {job.file_name} was already uploaded to TOD, resuming with delete."
+    )
+    return True
+
 
-    if len(root.findall("testsuite")) > 1:
-        testsuites_element = root
+def new_job(key, etag, report_dir, journal=None):
+    """
+    Create the ReportJob of a listed report.
+    """
+    job = ReportJob(key, os.path.join(report_dir, os.path.basename(key)), etag)
+    record_state(journal, job, "listed")
+    return job
 
-        # Aggregate total values
-        total_tests = int(testsuites_element.get("tests", 0))
-        total_failures = int(testsuites_element.get("failures", 0))
-        total_errors = int(testsuites_element.get("errors", 0))
-        total_skipped = int(testsuites_element.get("skipped", 0))
 
-        # Create a new <testsuites> element with aggregated values
-        new_testsuites = ET.Element("testsuites")
-        new_testsuites.set("tests", str(total_tests))
-        new_testsuites.set("failures", str(total_failures))
-        new_testsuites.set("errors", str(total_errors))
-        new_testsuites.set("skipped", str(total_skipped))
+def list_jobs(storage, bucket, prefix, report_dir, journal=None):
+    """
+    Lazily create a ReportJob for every XML report listed in the bucket.
 
-        # Create a new <testsuite> element under <testsuites>
-        new_testsuite = ET.SubElement(
-            new_testsuites, "testsuite", attrib=testsuites_element.attrib
+    The time spent waiting for the listing is recorded as the list step.
+    """
+    metrics = get_run_metrics()
+    listing = 0.0
+    start = time.perf_counter()
+    for key, etag in storage.list_entries(bucket, prefix=prefix, suffix=".xml"):
+        listing += time.perf_counter() - start
+        metrics.count("reports_listed")
+        yield new_job(key, etag, report_dir, journal)
+        start = time.perf_counter()
+    metrics.record("list", listing + time.perf_counter() - start)
+
+
+def write_debug_copy(job):
+    """
+    Write the current content of a report to its local path for debugging.
+    """
+    with open(job.file_path, "wb") as f:
+        f.write(job.content)
+
+
+def download_report(
+    job, bucket, storage, debug=False, journal=None, spill_size=DEFAULT_SPILL_SIZE
+):
+    """
+    Download a single XML report from Linode object storage into memory.
+
+    A report bigger than spill_size bytes is spilled to a temporary file and
+    memory mapped instead (see helpers.map_file), so big reports waiting in the
+    pipeline do not add up in memory. Reports the run journal shows as uploaded
+    are passed on without downloading.
+    """
+    if resume_uploaded(journal, job):
+        return job
+
+    metrics = get_run_metrics()
+    try:
+        job.content = storage.read(bucket, job.file_name, spill_size)
+    except Exception as e:
+        metrics.count("download_failures")
+        log_and_print(
+            f"{timestamp}: Error downloading {job.file_name} from object storage: {str(e)}",
+            level=logging.ERROR,
         )
+        return None
+    metrics.count("bytes_downloaded", len(job.content))
+    if isinstance(job.content, mmap.mmap):
+        metrics.count("reports_spilled")
 
-        # Move <testcase> elements under the new <testsuite>
-        for testcase in root.findall(".//testcase"):
-            new_testcase = ET.SubElement(
-                new_testsuite, "testcase", attrib=testcase.attrib
-            )
-            for child in testcase:
-                new_testcase.append(child)
+    if journal is not None and job.version is None:
+        # Without an ETag from the listing the content identifies the report
+        job.version = hashlib.md5(job.content).hexdigest()
+        if resume_uploaded(journal, job):
+            job.content = None
+            return job
 
-        # Copy essential metadata
-        for key in ["branch_name", "gha_run_id", "gha_run_number", "release_tag"]:
-            element = ET.SubElement(new_testsuites, key)
-            element.text = root.find(key).text if root.find(key) is not None else ""
+    if debug:
+        write_debug_copy(job)
 
-        # Save the modified XML back to the file
-        try:
-            new_tree = ET.ElementTree(new_testsuites)
-            new_tree.write(file_path, encoding="UTF-8", xml_declaration=True)
+    record_state(journal, job, "downloaded")
+    return job
+
+
+def transform_report(
+    job, team_name, debug=False, journal=None, collect_testcases=False
+):
+    """
+    Rewrite a downloaded XML report for TOD and collect the build fields for it.
+
+    The report is streamed once; the TOD fields (and with collect_testcases the
+    testcase records for the results index) are collected during the same pass
+    that writes the converted report. The converted version of a spilled report
+    is spilled as well.
+    """
+    if job.uploaded:
+        return job
+
+    file = job.file_name
+
+    on_testcase = None
+    if collect_testcases:
+        job.testcases = TestcaseTable()
+        on_testcase = job.testcases.append
+
+    if isinstance(job.content, mmap.mmap):
+        job.content.seek(0)
+        with tempfile.TemporaryFile() as output:
+            converted, fields = convert_report_for_tod(job.content, output, on_testcase)
+            if converted:
+                job.content = map_file(output)
+    else:
+        output = io.BytesIO()
+        converted, fields = convert_report_for_tod(
+            io.BytesIO(job.content), output, on_testcase
+        )
+        if converted:
+            # A view of the converted report, not a copy; the upload reads it from there
+            job.content = output.getbuffer()
+
+    if converted and debug:
+        write_debug_copy(job)
+        log_and_print(
+            f"{timestamp}: XML content successfully overwritten to {job.file_path}"
+        )
+
+    software_name = get_software_name(file_name=file)
+
+    release_version_value = (
+        fields["release_tag"]
+        if fields["has_release_tag"]
+        else get_release_version(file)
+    )
+
+    tag_value = (
+        f"GHA ID: {fields['gha_run_id']} Run ID: {fields['gha_run_number']}"
+        if fields["gha_run_id"] and fields["gha_run_number"]
+        else ""
+    )
+
+    # xunitResults is added from job.content when the payload is encoded for upload
+    job.data = {
+        "team": team_name,
+        "softwareName": software_name,
+        "semanticVersion": release_version_value,
+        "buildName": software_name,
+        "pass": fields["pass"],
+        "tag": tag_value,
+        "branchName": fields["branch_name"],
+    }
+    if collect_testcases:
+        job.run = {
+            "software": software_name,
+            "release": release_version_value,
+            "branch": fields["branch_name"],
+            "gha_run_id": fields["gha_run_id"],
+            "gha_run_number": fields["gha_run_number"],
+        }
+    record_state(journal, job, "transformed")
+    return job
+
+
+def index_report(job, results_index):
+    """
+    Add the testcases collected from a transformed report to the results index.
+
+    The index is only a local history, a report that cannot be indexed is still
+    uploaded.
+    """
+    if job.testcases is None:
+        return job
+
+    metrics = get_run_metrics()
+    try:
+        count = results_index.add_report(
+            job.file_name, job.version, job.run, job.testcases
+        )
+        metrics.count("testcases_indexed", count)
+    except sqlite3.Error as e:
+        metrics.count("index_failures")
+        log_and_print(
+            f"{timestamp}: Error indexing the testcases of {job.file_name}: {str(e)}",
+            level=logging.ERROR,
+        )
+    job.testcases = None
+    return job
+
+
+def upload_report(job, url, payload, journal=None):
+    """
+    POST a transformed report to TOD, passing it on only if TOD accepted it.
+    """
+    if job.uploaded:
+        return job
+
+    file = job.file_name
+
+    response = payload.send(url, job.data, [job.content])
+    # The report is not needed after the upload, free it before the delete stage
+    job.content = None
+    print(f"Response: {response}")
+
+    metrics = get_run_metrics()
+    if response is None:
+        metrics.count("upload_failures")
+        log_and_print(
+            f"{timestamp}: Upload failed for {file}. No response returned.",
+            level=logging.ERROR,
+        )
+        return None
+
+    if response.status_code != 201:
+        metrics.count("upload_failures")
+        log_and_print(
+            f"{timestamp}: POST request for file {file} failed with status code: {response.status_code}",
+            level=logging.ERROR,
+        )
+        return None
+
+    metrics.count("reports_uploaded")
+    record_state(journal, job, "uploaded")
+    log_and_print(f"{timestamp}: {file} uploaded to TOD successfully.")
+    return job
+
+
+def upload_batch(batch, url, payload, journal=None):
+    """
+    POST a batch of reports to TOD as one build, passing on the reports TOD accepted.
+
+    If TOD rejects the batch (one of helpers.REJECTED_STATUSES) its reports are
+    uploaded one by one, so a single bad report does not keep the others from being accepted
+    and deleted. Without a response (TOD may have ingested the batch) or on 429
+    and 5xx (TOD is overloaded and the client already retried) the batch fails
+    as a whole and its reports are left in the bucket for the next run.
+    """
+    if len(batch.jobs) == 1:
+        return upload_report(batch.jobs[0], url, payload, journal)
+
+    response = payload.send(url, batch.data, [job.content for job in batch.jobs])
+    print(f"Response: {response}")
+
+    metrics = get_run_metrics()
+    if response is None or response.status_code != 201:
+        metrics.count("batch_failures")
+        status = (
+            "No response returned"
+            if response is None
+            else f"Status code: {response.status_code}"
+        )
+        if response is not None and response.status_code in REJECTED_STATUSES:
             log_and_print(
-                f"{timestamp}: XML content successfully overwritten to {file_path}"
+                f"{timestamp}: Upload failed for batch {batch.file_name}. {status}. "
+                f"Uploading its {len(batch.jobs)} reports one by one.",
+                level=logging.ERROR,
             )
-        except Exception as e:
+            return [
+                job
+                for job in batch.jobs
+                if upload_report(job, url, payload, journal) is not None
+            ]
+
+        metrics.count("upload_failures", len(batch.jobs))
+        for job in batch.jobs:
+            job.content = None
+        log_and_print(
+            f"{timestamp}: Upload failed for batch {batch.file_name}. {status}. "
+            f"Its {len(batch.jobs)} reports are left for the next run.",
+            level=logging.ERROR,
+        )
+        return None
+
+    metrics.count("batches_uploaded")
+    metrics.count("reports_uploaded", len(batch.jobs))
+    for job in batch.jobs:
+        job.content = None
+        record_state(journal, job, "uploaded")
+        log_and_print(
+            f"{timestamp}: {job.file_name} uploaded to TOD successfully "
+            f"in a batch of {len(batch.jobs)}."
+        )
+    return list(batch.jobs)
+
+
+def delete_report(job, bucket, storage, journal=None):
+    """
+    Remove a report that TOD accepted from Linode object storage.
+    """
+    file = job.file_name
+
+    metrics = get_run_metrics()
+    try:
+        storage.remove(bucket, file)
+    except Exception as e:
+        metrics.count("delete_failures")
+        log_and_print(
+            f"{timestamp}: Error deleting {file} from object storage: {str(e)}",
+            level=logging.ERROR,
+        )
+        return None
+
+    metrics.count("reports_deleted")
+    record_state(journal, job, "deleted")
+    log_and_print(f"{timestamp}: {file} deleted from object storage.")
+    return job
+
+
+def delete_reports(batch, bucket, storage, journal=None):
+    """
+    Remove a batch of reports that TOD accepted from Linode object storage in bulk.
+
+    Keys that fail are retried once; keys that still fail are reported one by one
+    and left in the bucket, so the next run deletes them without uploading again.
+    """
+    jobs = {job.file_name: job for job in batch.jobs}
+
+    failed = storage.remove_many(bucket, list(jobs))
+    if failed:
+        failed = storage.remove_many(bucket, list(failed))
+
+    metrics = get_run_metrics()
+    deleted = []
+    for file, job in jobs.items():
+        if file in failed:
+            metrics.count("delete_failures")
             log_and_print(
-                f"{timestamp}: Error writing XML content: {str(e)}", level=logging.ERROR
+                f"{timestamp}: Error deleting {file} from object storage: {failed[file]}",
+                level=logging.ERROR,
             )
+            continue
+        metrics.count("reports_deleted")
+        record_state(journal, job, "deleted")
+        log_and_print(f"{timestamp}: {file} deleted from object storage.")
+        deleted.append(job)
+    return deleted
 
 
-def download_and_upload_xml_files(cluster, bucket, url):
+def log_stage_error(stage, job, error):
     """
-    Download XML test reports from Linode object storage, modify and upload them to TOD.
+    Log an unexpected exception raised while a report was in a pipeline stage.
     """
-    linode_commands = LinodeCommands()
-    list_process = execute_command(linode_commands.get_list_command(cluster=cluster))
-    lines_of_all_files = list_process.stdout.decode().split("\n")
+    # job is None when the error was raised while a stage flushed held back reports
+    target = job.file_name if job is not None else "pending reports"
+    log_and_print(
+        f"{timestamp}: Error in {stage.name} stage for {target}: {str(error)}",
+        level=logging.ERROR,
+    )
 
-    xml_files = [
-        line.split("/")[-1]
-        for line in lines_of_all_files
-        if bucket in line and line.endswith(".xml")
-    ]
 
+def log_concurrency_change(old, new, reason):
+    """
+    Log and record a change of the adaptive upload concurrency limit.
+    """
+    metrics = get_run_metrics()
+    metrics.count("concurrency_increases" if new > old else "concurrency_decreases")
+    metrics.gauge("upload_concurrency_limit", new)
+    log_and_print(f"{timestamp}: Upload concurrency limit {old} -> {new} ({reason}).")
+
+
+def new_payload(compression, workers, max_concurrency=None):
+    """
+    TodPayload sending the uploads, with an adaptive concurrency limit between 1
+    and max_concurrency if that is set.
+    """
+    if not max_concurrency:
+        return TodPayload(compression)
+
+    limiter = AdaptiveLimiter(
+        initial=workers, maximum=max_concurrency, on_change=log_concurrency_change
+    )
+    log_and_print(
+        f"{timestamp}: Adapting the number of concurrent uploads between "
+        f"{limiter.minimum} and {limiter.maximum}, starting at {limiter.limit}."
+    )
+    return TodPayload(compression, limiter)
+
+
+def open_journal(journal_path, bucket):
+    """
+    Open the run journal of a bucket, or return None without a journal_path.
+    """
+    if not journal_path:
+        return None
+    os.makedirs(os.path.dirname(os.path.abspath(journal_path)), exist_ok=True)
+    return RunJournal(journal_path, bucket)
+
+
+def open_results_index(results_index_path):
+    """
+    Open the results index, or return None without a results_index_path.
+    """
+    if not results_index_path:
+        return None
+    os.makedirs(os.path.dirname(os.path.abspath(results_index_path)), exist_ok=True)
+    return ResultsIndex(results_index_path)
+
+
+def build_stages(
+    storage,
+    bucket,
+    url,
+    payload,
+    workers=DEFAULT_WORKERS,
+    debug=False,
+    batch_size=DEFAULT_BATCH_SIZE,
+    batch_max_bytes=DEFAULT_BATCH_MAX_BYTES,
+    journal=None,
+    delete_batch_size=None,
+    results_index=None,
+    spill_size=DEFAULT_SPILL_SIZE,
+    delete_max_age=DEFAULT_DELETE_MAX_AGE,
+):
+    """
+    Pipeline stages that download, transform, upload and delete the reports of a bucket.
+
+    With a results_index the testcases of every report are added to it after the
+    transform stage, by a single writer.
+    """
     team_name = os.environ.get("TEAM_NAME", "default_team_name")
-    current_dir = os.getcwd()
-    report_dir = os.path.join(current_dir, "reports")
-
-    for file in xml_files:
-        file_path = os.path.join(report_dir, file)
-        result = execute_command(
-            linode_commands.get_download_command(
-                cluster=cluster, bucket=bucket, file_name=file, destination=file_path
-            )
+    # An adaptive limit decides how many of the upload workers send at a time
+    upload_workers = workers if payload.limiter is None else payload.limiter.maximum
+
+    stages = [
+        Stage(
+            "download",
+            partial(
+                download_report,
+                bucket=bucket,
+                storage=storage,
+                debug=debug,
+                journal=journal,
+                spill_size=spill_size,
+            ),
+            workers,
+        ),
+        Stage(
+            "transform",
+            partial(
+                transform_report,
+                team_name=team_name,
+                debug=debug,
+                journal=journal,
+                collect_testcases=results_index is not None,
+            ),
+            workers,
+        ),
+    ]
+
+    if results_index is not None:
+        stages.append(
+            Stage("index", partial(index_report, results_index=results_index), 1)
         )
 
-        if result.returncode == 0:
-            change_xml_report_to_tod_acceptable_version(file_path)
+    if batch_size > 1:
+        batcher = ReportBatcher(batch_size, batch_max_bytes)
+        upload = partial(upload_batch, url=url, payload=payload, journal=journal)
+        stages += [
+            Stage("batch", batcher.add, 1, flush=batcher.flush),
+            Stage("upload", upload, upload_workers),
+        ]
+    else:
+        upload = partial(upload_report, url=url, payload=payload, journal=journal)
+        stages.append(Stage("upload", upload, upload_workers))
 
-            with open(file_path, "r", encoding="utf-8") as f:
-                encoded_file = str(
-                    base64.b64encode(f.read().encode("utf-8")).decode("utf-8")
-                )
+    if delete_batch_size is None:
+        delete_batch_size = storage.delete_batch_size
 
-            software_name = get_software_name(file_name=file)
+    if delete_batch_size > 1:
+        deleter = DeleteBatcher(delete_batch_size, delete_max_age)
+        delete = partial(
+            delete_reports, bucket=bucket, storage=storage, journal=journal
+        )
+        stages += [
+            Stage("delete-batch", deleter.add, 1, flush=deleter.flush),
+            Stage("delete", delete, workers),
+        ]
+    else:
+        delete = partial(delete_report, bucket=bucket, storage=storage, journal=journal)
+        stages.append(Stage("delete", delete, workers))
 
-            tree = ET.parse(file_path)
-            root = tree.getroot()
+    return stages
 
-            release_version_value = (
-                root.find("release_tag").text
-                if root.find("release_tag") is not None
-                else get_release_version(file)
-            )
 
-            testsuite_failures = (
-                root.find("testsuite").get("failures")
-                if root.find("testsuite") is not None
-                else 0
-            )
-            failures = (
-                root.find("failures").text if root.find("failures") is not None else 0
-            )
-            pass_value = int(testsuite_failures or failures) == 0
+def run_jobs(jobs, stages, metrics, observer=None):
+    """
+    Push jobs through the stages, recording every stage call in metrics.
+    """
 
-            tag_value = (
-                f"GHA ID: {root.find('gha_run_id').text} Run ID: {root.find('gha_run_number').text}"
-                if root.find("gha_run_id").text and root.find("gha_run_number").text
-                else ""
-            )
+    def observe(stage, item, seconds, error):
+        metrics.observe(stage, item, seconds, error)
+        if observer is not None:
+            observer(stage, item, seconds, error)
+
+    try:
+        return run_pipeline(jobs, stages, on_error=log_stage_error, observer=observe)
+    finally:
+        metrics.finish()
 
-            data = {
-                "team": team_name,
-                "softwareName": software_name,
-                "semanticVersion": release_version_value,
-                "buildName": software_name,
-                "pass": pass_value,
-                "xunitResults": [encoded_file],
-                "tag": tag_value,
-                "branchName": (
-                    root.find("branch_name").text
-                    if root.find("branch_name") is not None
-                    else "N/A"
-                ),
-            }
 
-            headers = {"Content-Type": "application/json"}
-            data_json = json.dumps(data)
+def download_and_upload_xml_files(
+    cluster,
+    bucket,
+    url,
+    workers=DEFAULT_WORKERS,
+    prefix="",
+    debug=False,
+    compression="none",
+    batch_size=DEFAULT_BATCH_SIZE,
+    batch_max_bytes=DEFAULT_BATCH_MAX_BYTES,
+    journal_path=None,
+    delete_batch_size=None,
+    max_concurrency=None,
+    results_index_path=None,
+    observer=None,
+    spill_size=DEFAULT_SPILL_SIZE,
+    delete_max_age=DEFAULT_DELETE_MAX_AGE,
+):
+    """
+    Download XML test reports from Linode object storage, modify and upload them to TOD.
 
-            response = upload_encoded_xml_file(url, data_json, headers)
-            print(f"Response: {response}")
+    Only objects of the given bucket whose key starts with prefix are listed. Keys
+    are listed page by page while earlier reports are already being processed.
+    Reports flow through download, transform, upload and delete stages that run
+    concurrently, each with up to `workers` reports in progress. Reports are kept
+    in memory, except for reports bigger than spill_size bytes which are memory
+    mapped temporary files, so the reports in flight take at most about
+    spill_size each; with debug enabled the downloaded and transformed versions
+    are also written to the reports directory. compression selects how the TOD
+    payload is compressed, see modules.tod_payload.
 
-            if response is None:
-                log_and_print(
-                    f"{timestamp}: Upload failed for {file}. No response returned.",
-                    level=logging.ERROR,
-                )
-                continue
+    With batch_size above 1, reports of the same build (team, software, version,
+    branch and GHA run) are submitted together, up to batch_size reports or
+    batch_max_bytes of XML per submission. Only the reports of accepted
+    submissions are deleted.
 
-            if response.status_code == 201:
-                log_and_print(f"{timestamp}: {file} uploaded to TOD successfully.")
-                result = execute_command(
-                    linode_commands.get_remove_command(
-                        cluster=cluster, bucket=bucket, file_name=file
-                    )
-                )
+    With a journal_path the state of every report is recorded in a run journal,
+    and reports an earlier run already uploaded to TOD are only deleted.
+
+    Accepted reports are deleted in bulk, delete_batch_size keys per request
+    (defaults to what the object storage backend supports), or fewer once the
+    first of them waited delete_max_age seconds. Reports stay in the bucket
+    until their batch is deleted and are uploaded again if the run dies before,
+    unless the journal recorded them.
+
+    With max_concurrency the number of concurrent uploads is not fixed to workers
+    but adapts to the response times and 429/5xx responses of TOD, between 1 and
+    max_concurrency, starting at workers (see new_payload).
+
+    With a results_index_path the testcases of every report are kept in a local
+    results index, see modules.results_index.
+
+    Every call starts a new run in modules.run_metrics, which records the timings
+    of all stages per report. observer is additionally called for every stage call,
+    see run_pipeline.
+    """
+    metrics = reset_run_metrics()
+
+    storage = get_object_storage(cluster, max_connections=2 * workers)
+    payload = new_payload(compression, workers, max_concurrency)
+    report_dir = os.path.join(os.getcwd(), "reports")
+    journal = open_journal(journal_path, bucket)
+    results_index = open_results_index(results_index_path)
+
+    jobs = list_jobs(storage, bucket, prefix, report_dir, journal)
+    stages = build_stages(
+        storage,
+        bucket,
+        url,
+        payload,
+        workers,
+        debug,
+        batch_size,
+        batch_max_bytes,
+        journal,
+        delete_batch_size,
+        results_index,
+        spill_size,
+        delete_max_age,
+    )
 
-                if result.returncode == 0:
-                    log_and_print(f"{timestamp}: {file} deleted from object storage.")
-                else:
-                    log_and_print(
-                        f"{timestamp}: Error deleting {file} from object storage. "
-                        f"Command returned non-zero exit code: {result.returncode}",
-                        level=logging.ERROR,
+    try:
+        return run_jobs(jobs, stages, metrics, observer)
+    finally:
+        if journal is not None:
+            journal.close()
+        if results_index is not None:
+            results_index.close()
+
+
+def watch_and_upload(
+    cluster,
+    bucket,
+    url,
+    workers=DEFAULT_WORKERS,
+    prefix="",
+    debug=False,
+    compression="none",
+    batch_size=DEFAULT_BATCH_SIZE,
+    batch_max_bytes=DEFAULT_BATCH_MAX_BYTES,
+    journal_path=None,
+    delete_batch_size=None,
+    max_concurrency=None,
+    results_index_path=None,
+    spill_size=DEFAULT_SPILL_SIZE,
+    delete_max_age=DEFAULT_DELETE_MAX_AGE,
+    state_path=None,
+    poll_min=DEFAULT_POLL_MIN,
+    poll_max=DEFAULT_POLL_MAX,
+    full_scan_interval=DEFAULT_FULL_SCAN_INTERVAL,
+    stop_event=None,
+    on_run=None,
+):
+    """
+    Keep uploading the reports of a bucket as they arrive until stop_event is set.
+
+    One object storage client, TOD payload, run journal, results index and HTTP
+    session serve all polls, so connections stay open between them and an adaptive
+    upload concurrency limit (max_concurrency) carries over from one poll to the
+    next. Every poll lists the bucket and sends the reports not picked up before
+    (see modules.watch_state, persisted at state_path) through the stages
+    download_and_upload_xml_files uses; every poll that finds reports is a run of
+    its own in modules.run_metrics and the HTTP stats, and on_run is called after
+    it.
+
+    The bucket is polled every poll_min seconds while reports keep arriving; the
+    interval doubles with every idle poll up to poll_max. Every full_scan_interval
+    seconds all listed reports are picked up again, which retries failed ones.
+    """
+    stop_event = stop_event or threading.Event()
+
+    storage = get_object_storage(cluster, max_connections=2 * workers)
+    payload = new_payload(compression, workers, max_concurrency)
+    report_dir = os.path.join(os.getcwd(), "reports")
+    journal = open_journal(journal_path, bucket)
+    results_index = open_results_index(results_index_path)
+    state = WatchState(state_path, bucket, prefix)
+
+    log_and_print(
+        f"{timestamp}: Watching {bucket}/{prefix} for reports, "
+        f"polling every {poll_min}s to {poll_max}s."
+    )
+
+    interval = poll_min
+    last_full_scan = None
+    try:
+        while not stop_event.is_set():
+            metrics = reset_run_metrics()
+            get_http_client().reset_stats()
+            full_scan = (
+                last_full_scan is None
+                or time.monotonic() - last_full_scan >= full_scan_interval
+            )
+
+            try:
+                with metrics.timer("list"):
+                    entries = list(
+                        storage.list_modified(bucket, prefix=prefix, suffix=".xml")
                     )
-            else:
+            except Exception as e:
                 log_and_print(
-                    f"{timestamp}: POST request for file {file} failed with status code: {response.status_code}",
+                    f"{timestamp}: Error listing {bucket}/{prefix}: {str(e)}",
                     level=logging.ERROR,
                 )
-        else:
+                interval = min(poll_max, interval * 2)
+                stop_event.wait(interval)
+                continue
+
+            if full_scan:
+                last_full_scan = time.monotonic()
+            selected = entries if full_scan else state.select(entries)
+
+            if not selected:
+                interval = min(poll_max, interval * 2)
+                stop_event.wait(interval)
+                continue
+
+            # New releases are picked up once the cached version expires
+            get_release_resolver().forget()
+
+            metrics.count("reports_listed", len(selected))
+            jobs = [
+                new_job(key, etag, report_dir, journal) for key, etag, _ in selected
+            ]
+            stages = build_stages(
+                storage,
+                bucket,
+                url,
+                payload,
+                workers,
+                debug,
+                batch_size,
+                batch_max_bytes,
+                journal,
+                delete_batch_size,
+                results_index,
+                spill_size,
+                delete_max_age,
+            )
+            run_jobs(jobs, stages, metrics)
+            state.advance(selected)
+
+            if on_run is not None:
+                on_run()
+
+            interval = poll_min
+            stop_event.wait(interval)
+    finally:
+        if journal is not None:
+            journal.close()
+        if results_index is not None:
+            results_index.close()
+
+    log_and_print(f"{timestamp}: Stopped watching {bucket}/{prefix}.")
+
+
+def write_run_report(summary_path=None, prometheus_path=None):
+    """
+    Log the outcome of the last run and write its metrics to the given files.
+    """
+    metrics = get_run_metrics()
+    http_stats = get_http_client().stats
+    counters = metrics.counters
+    log_and_print(
+        f"{timestamp}: Run finished in {metrics.duration or 0:.1f}s: "
+        f"{counters['reports_listed']} listed, {counters['reports_uploaded']} uploaded, "
+        f"{counters['reports_deleted']} deleted, {http_stats['retries']} HTTP retries."
+    )
+    if "upload_concurrency_limit" in metrics.gauges:
+        log_and_print(
+            f"{timestamp}: Upload concurrency limit at "
+            f"{metrics.gauges['upload_concurrency_limit']}, "
+            f"{counters['concurrency_increases']} increases, "
+            f"{counters['concurrency_decreases']} decreases."
+        )
+
+    for path, write in (
+        (summary_path, metrics.write_json),
+        (prometheus_path, metrics.write_prometheus),
+    ):
+        if not path:
+            continue
+        try:
+            write(path, http_stats)
+        except OSError as e:
             log_and_print(
-                f"{timestamp}: Error downloading {file} from object storage. "
-                f"Command returned non-zero exit code: {result.returncode}",
+                f"{timestamp}: Error writing run metrics to {path}: {str(e)}",
                 level=logging.ERROR,
             )
 
@@ -236,14 +993,85 @@ def main():
     """
     Main function to orchestrate the download, modification, and upload of XML test reports.
     """
+    configure_logging()
+
     try:
         setup_linode_configuration()
 
         cluster = os.environ.get("CLUSTER")
         bucket = os.environ.get("BUCKET")
         url = os.environ.get("URL")
+        workers = int(os.environ.get("UPLOAD_WORKERS", DEFAULT_WORKERS))
+        max_concurrency = int(os.environ.get("TOD_MAX_CONCURRENCY") or 0) or None
+        connections = max(workers, max_concurrency or 0)
+        configure_http_client(
+            retries=int(os.environ.get("HTTP_RETRIES", DEFAULT_RETRIES)),
+            pool_size=2 * connections,
+            max_per_host=int(os.environ.get("HTTP_MAX_PER_HOST", connections)),
+        )
+        prefix = os.environ.get("REPORT_PREFIX", "")
+        debug = os.environ.get("DEBUG_REPORTS", "").lower() in ("1", "true", "yes")
+        compression = os.environ.get("TOD_COMPRESSION", "none")
+        batch_size = int(os.environ.get("TOD_BATCH_SIZE", DEFAULT_BATCH_SIZE))
+        batch_max_bytes = int(
+            os.environ.get("TOD_BATCH_MAX_BYTES", DEFAULT_BATCH_MAX_BYTES)
+        )
+        delete_batch_size = os.environ.get("DELETE_BATCH_SIZE")
+        journal_path = os.environ.get(
+            "RUN_JOURNAL", os.path.join(os.getcwd(), "reports", ".run_journal.sqlite")
+        )
+        summary_path = os.environ.get(
+            "RUN_SUMMARY", os.path.join(os.getcwd(), "reports", "run_summary.json")
+        )
+        prometheus_path = os.environ.get("PROMETHEUS_TEXTFILE")
+        watch = os.environ.get("WATCH", "").lower() in ("1", "true", "yes")
 
-        download_and_upload_xml_files(cluster, bucket, url)
+        options = {
+            "workers": workers,
+            "prefix": prefix,
+            "debug": debug,
+            "compression": compression,
+            "batch_size": batch_size,
+            "batch_max_bytes": batch_max_bytes,
+            "journal_path": journal_path,
+            "delete_batch_size": (
+                int(delete_batch_size) if delete_batch_size else None
+            ),
+            "max_concurrency": max_concurrency,
+            "results_index_path": os.environ.get("RESULTS_INDEX"),
+            "spill_size": int(os.environ.get("REPORT_SPILL_SIZE", DEFAULT_SPILL_SIZE)),
+            "delete_max_age": float(
+                os.environ.get("DELETE_BATCH_MAX_AGE", DEFAULT_DELETE_MAX_AGE)
+            ),
+        }
+
+        if watch:
+            stop_event = threading.Event()
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *_: stop_event.set())
+
+            watch_and_upload(
+                cluster,
+                bucket,
+                url,
+                state_path=os.environ.get(
+                    "WATCH_STATE",
+                    os.path.join(os.getcwd(), "reports", ".watch_state.json"),
+                ),
+                poll_min=float(os.environ.get("WATCH_POLL_MIN", DEFAULT_POLL_MIN)),
+                poll_max=float(os.environ.get("WATCH_POLL_MAX", DEFAULT_POLL_MAX)),
+                full_scan_interval=float(
+                    os.environ.get(
+                        "WATCH_FULL_SCAN_INTERVAL", DEFAULT_FULL_SCAN_INTERVAL
+                    )
+                ),
+                stop_event=stop_event,
+                on_run=partial(write_run_report, summary_path, prometheus_path),
+                **options,
+            )
+        else:
+            download_and_upload_xml_files(cluster, bucket, url, **options)
+            write_run_report(summary_path, prometheus_path)
 
     except Exception as e:
         log_and_print(